@@ -0,0 +1,267 @@
+"""
+Headless crash-recovery check and benchmark for AppStore's journal mode
+
+Runs tox/haxlib/data/AppStore.py outside TouchDesigner, with stand-ins for the
+table DAT, component parameters and `tdu.Dependency`. Each scenario writes to a
+fresh temp folder, simulates a crash (the store is dropped without closing its
+journal, and files are edited the way an interrupted write leaves them), then
+reloads and compares the store with what was set before the crash. It also times
+SetValue's journal append against a full-table rewrite. Exits non-zero if any
+scenario reloads different contents.
+
+Usage:
+    python python/benchmarks/appstore_journal_harness.py
+    python python/benchmarks/appstore_journal_harness.py --keys 5000 --sets 20000
+"""
+
+import argparse
+import builtins
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+APPSTORE_PATH = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tox', 'haxlib', 'data'))
+
+
+###################################################
+# TouchDesigner stand-ins
+###################################################
+
+class HeadlessDependency:
+    """Stand-in for `tdu.Dependency`: just holds `.val`."""
+
+    def __init__(self, val):
+        self.val = val
+
+
+class HeadlessCell:
+    def __init__(self, val):
+        self.val = '' if val is None else str(val)
+
+
+class HeadlessTable:
+    """Table DAT stand-in: rows of cells addressed by index or by first-column key."""
+
+    def __init__(self):
+        self.cells = []
+        self.index = {}
+
+    @property
+    def numRows(self):
+        return len(self.cells)
+
+    def rows(self):
+        return list(self.cells)
+
+    def row(self, key):
+        return self.index.get(key)
+
+    def __getitem__(self, address):
+        return self.index[address[0]][address[1]]
+
+    def __setitem__(self, address, val):
+        self.index[address[0]][address[1]] = HeadlessCell(val)
+
+    def appendRow(self, vals):
+        row = [HeadlessCell(v) for v in vals]
+        self.cells.append(row)
+        self.index[row[0].val] = row
+
+    def deleteRow(self, key):
+        self.cells.remove(self.index.pop(key))
+
+    def clear(self):
+        self.cells = []
+        self.index = {}
+
+
+class HeadlessPar:
+    def __init__(self, val):
+        self.val = val
+
+    def eval(self):
+        return self.val
+
+
+class HeadlessComp:
+    """AppStore's ownerComp: its tables and the parameters AppStore reads."""
+
+    def __init__(self, backup_file):
+        self.ops = {'table_store_dictionary': HeadlessTable(), 'filein_backup': HeadlessTable(), 'in_default_values': HeadlessTable()}
+        self.par = types.SimpleNamespace(Backupfile=HeadlessPar(backup_file), Senderid=HeadlessPar('harness'),
+                                         Journalmode=HeadlessPar(True))
+
+    def op(self, name):
+        return self.ops.get(name)
+
+
+def install_td_stand_ins():
+    sys.modules['tdu'] = types.SimpleNamespace(Dependency=HeadlessDependency)
+    for name in ('baseCOMP', 'containerCOMP', 'tableDAT', 'dattoCHOP', 'websocketDAT'):
+        setattr(builtins, name, object)
+    builtins.absTime = types.SimpleNamespace(seconds=100)
+    if APPSTORE_PATH not in sys.path:
+        sys.path.insert(0, APPSTORE_PATH)
+    app_store_class = __import__('AppStore').AppStore
+    # No websocket or indicator operators headless
+    return type('HeadlessAppStore', (app_store_class,), {'initWebSocket': lambda self: None})
+
+
+###################################################
+# Scenarios
+###################################################
+
+def open_store(app_store_class, backup_file):
+    store = app_store_class(HeadlessComp(backup_file))
+    store.LoadFile()
+    store.waitForCompaction()  # Deterministic: the load's own compaction never overlaps a scenario's
+    return store
+
+
+def contents(store):
+    return {row[0].val: row[1].val for row in store.storeTable.rows()}
+
+
+def crash(store):
+    """Drop the store like a killed process: let compaction finish, leave the journal as it is on disk."""
+    store.waitForCompaction()
+    store.journalFile.flush()
+    store.journalFile = None
+
+
+def scenario_reload(app_store_class, backup_file):
+    store = open_store(app_store_class, backup_file)
+    for i in range(50):
+        store.SetFloat(f'key{i}', i)
+    store.SetString('name', 'tab\tand\nnewline')
+    store.SetBoolean('flag', True)
+    store.RemoveValue('key3')
+    expected = contents(store)
+    crash(store)
+    return expected, contents(open_store(app_store_class, backup_file))
+
+
+def scenario_torn_line(app_store_class, backup_file):
+    """A crash mid-append leaves a partial last line; later appends must not be joined onto it."""
+    store = open_store(app_store_class, backup_file)
+    store.SetString('x', '1')
+    store.SaveFile()
+    crash(store)
+    with open(store.journalPaths(backup_file)['journal'], 'a', encoding='utf-8') as f:
+        f.write('{"op": "set", "row": ["torn", "1"')
+    store = open_store(app_store_class, backup_file)
+    store.SetString('z', '2')
+    expected = contents(store)
+    crash(store)
+    return expected, contents(open_store(app_store_class, backup_file))
+
+
+def scenario_interrupted_compaction(app_store_class, backup_file):
+    """A crash after the journal was rotated aside, before the new snapshot replaced the old one."""
+    store = open_store(app_store_class, backup_file)
+    store.SetString('a', '1')
+    store.SaveFile()
+    store.SetString('b', '2')
+    expected = contents(store)
+    crash(store)
+    paths = store.journalPaths(backup_file)
+    os.replace(paths['journal'], paths['compacting'])
+    with open(f"{paths['snapshot']}.tmp", 'w', encoding='utf-8') as f:
+        f.write('{"version": 1, "se')  # The temp snapshot it was writing
+    return expected, contents(open_store(app_store_class, backup_file))
+
+
+def scenario_snapshot_without_cleanup(app_store_class, backup_file):
+    """A crash after the new snapshot landed, before its journal segment was deleted."""
+    store = open_store(app_store_class, backup_file)
+    store.SetString('a', '1')
+    store.RemoveValue('a')
+    store.SetString('b', '2')
+    paths = store.journalPaths(backup_file)
+    store.closeJournal()
+    os.replace(paths['journal'], paths['compacting'])
+    store.openJournal()
+    store.writeFileAtomic(paths['snapshot'], json.dumps({'version': 1, 'seq': store.journalSeq, 'rows': list(store.journalRows.values())}))
+    store.SetString('c', '3')
+    expected = contents(store)
+    crash(store)
+    return expected, contents(open_store(app_store_class, backup_file))
+
+
+def scenario_clear(app_store_class, backup_file):
+    store = open_store(app_store_class, backup_file)
+    store.SetString('a', '1')
+    store.SaveFile()
+    store.ClearData()
+    store.SetString('b', '2')
+    expected = contents(store)
+    crash(store)
+    return expected, contents(open_store(app_store_class, backup_file))
+
+
+SCENARIOS = {
+    'reload': scenario_reload,
+    'torn_line': scenario_torn_line,
+    'interrupted_compaction': scenario_interrupted_compaction,
+    'snapshot_without_cleanup': scenario_snapshot_without_cleanup,
+    'clear': scenario_clear,
+}
+
+
+###################################################
+# Benchmark
+###################################################
+
+def run_benchmark(app_store_class, folder, keys, sets):
+    """Per-change cost of a journaled SetValue vs. one full-table save, in ms."""
+    store = open_store(app_store_class, os.path.join(folder, 'bench', 'store.txt'))
+    for i in range(keys):
+        store.SetFloat(f'key{i}', i)
+    store.waitForCompaction()
+
+    start = time.perf_counter()
+    for i in range(sets):
+        store.SetFloat(f'key{i % keys}', i)
+    set_ms = (time.perf_counter() - start) * 1000 / sets
+
+    start = time.perf_counter()
+    store.writeFileAtomic(os.path.join(folder, 'bench', 'full.txt'), '\n'.join('\t'.join(row) for row in store.journalRows.values()))
+    full_save_ms = (time.perf_counter() - start) * 1000
+    store.waitForCompaction()
+    store.closeJournal()
+    return set_ms, full_save_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check AppStore journal crash recovery and time journal writes")
+    parser.add_argument('--keys', type=int, default=3000)
+    parser.add_argument('--sets', type=int, default=10000)
+    args = parser.parse_args()
+
+    app_store_class = install_td_stand_ins()
+    folder = tempfile.mkdtemp(prefix='appstore_journal_')
+    failures = []
+    try:
+        for name, scenario in SCENARIOS.items():
+            expected, loaded = scenario(app_store_class, os.path.join(folder, name, 'store.txt'))
+            ok = expected == loaded
+            print(f"[Harness] {name:<26} {'ok' if ok else 'FAIL'} ({len(loaded)} keys)")
+            if not ok:
+                failures.append(f"{name}: expected {sorted(expected)}, loaded {sorted(loaded)}")
+        set_ms, full_save_ms = run_benchmark(app_store_class, folder, args.keys, args.sets)
+        print(f"[Harness] {args.keys} keys | journaled SetValue {set_ms:.4f} ms | full-table save {full_save_ms:.2f} ms")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    for failure in failures:
+        print(f"[Harness] FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
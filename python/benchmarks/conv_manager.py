@@ -0,0 +1,24 @@
+"""
+Minimal NCHW ONNXInferenceManager around the conv model generated by onnx_iobinding_benchmark.
+onnx_harness's default manager; it lives in its own file so the process backend's worker can load it.
+"""
+
+import os
+import tempfile
+import numpy
+
+oim = mod(f'{op.PyUtils}/onnx_inference_manager')
+
+MODEL_PATH = os.path.join(tempfile.gettempdir(), 'haxlib_harness.onnx')
+
+
+class ConvManager(oim.ONNXInferenceManager):
+    def get_model_path(self):
+        return MODEL_PATH
+
+    def preprocess(self, nA):
+        nA = self.npu.resize_image(nA, 256, 256)
+        return numpy.ascontiguousarray(nA[None, :, :, :3].transpose(0, 3, 1, 2))
+
+    def postprocess(self, outputs):
+        return outputs[0][0, :4].transpose(1, 2, 0)
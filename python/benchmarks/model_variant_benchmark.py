@@ -0,0 +1,45 @@
+"""
+Model variant benchmark (fp32 vs. int8 vs. fp16)
+
+Runs onnx_util.resolve_model_variant() with a fresh benchmark: times the model and its
+int8/fp16 siblings on this machine's providers, measures each one's output error against
+the fp32 model, and saves the choice beside the model, where ONNXInferenceManager
+(USE_MODEL_VARIANTS = True) picks it up on its next launch.
+
+Runs outside TouchDesigner:
+    python python/benchmarks/model_variant_benchmark.py --model path/to/model.onnx --make
+Without --model, the generated conv model from onnx_iobinding_benchmark is used
+(requires the `onnx` package, as does --make).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'util'))
+import onnx_util
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pick the fastest accurate fp32/int8/fp16 model variant on this machine')
+    parser.add_argument('--model', help='fp32 ONNX model path (default: generated conv model)')
+    parser.add_argument('--make', action='store_true', help='Generate missing int8/fp16 variants first')
+    parser.add_argument('--tolerance', type=float, default=0.05, help='Max output error relative to the fp32 peak')
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--cpu', action='store_true', help='Benchmark on CPUExecutionProvider only')
+    args = parser.parse_args()
+
+    model_path = args.model
+    if model_path is None:
+        from onnx_iobinding_benchmark import build_test_model
+        model_path = build_test_model(os.path.join(tempfile.gettempdir(), 'haxlib_variant_benchmark.onnx'))
+
+    providers = ['CPUExecutionProvider'] if args.cpu else onnx_util.providers()
+    print(f"[Benchmark] model: {model_path}")
+    print(f"[Benchmark] providers: {providers} | runs: {args.runs} | tolerance: {args.tolerance}")
+    onnx_util.resolve_model_variant(model_path, providers, args.tolerance, args.make, runs=args.runs, refresh=True)
+
+
+if __name__ == '__main__':
+    main()
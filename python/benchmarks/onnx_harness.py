@@ -0,0 +1,560 @@
+"""
+Headless benchmark harness for ONNXInferenceManager subclasses
+
+Runs a manager outside TouchDesigner. The harness installs stand-ins for the TD
+globals the manager needs (`op.PyUtils`, `mod`), then drives `onCook` at a fixed
+rate with a stand-in Script TOP whose input TOP serves synthetic or on-disk frames.
+It reports achieved result fps, skipped frames, end-to-end latency (capture to
+output) and memory growth. Sessions run on CPUExecutionProvider.
+
+Like TD, the input TOP hands back the same buffer every capture and overwrites it
+on the next one, so a frame the manager fails to copy shows up as torn (its two
+frame-id corners disagree by the time the worker reads it). The harness also counts
+frame copies: ring copies per capture, plus any .copy() of the TD array in onCook.
+Calls the manager queues with TD's run() execute on the harness's main loop while it
+waits for the next cook, like TD running them between frames, and a forced cook
+(RESULT_DELIVERY = DELIVERY_COOK) outputs its result right away.
+--check exits non-zero unless every mode made exactly one copy per captured frame
+and saw no torn frames. It first checks FrameRing and SharedFrameRing on their own:
+frames written while a reader holds a slot must never land in that slot.
+
+Usage:
+    python python/benchmarks/onnx_harness.py
+    python python/benchmarks/onnx_harness.py --manager my_pose.py:MoveNetManager --frames captures/ --fps 30
+    python python/benchmarks/onnx_harness.py --modes serial,pipelined,iobinding --duration 20
+    python python/benchmarks/onnx_harness.py --duration 3 --check
+    python python/benchmarks/onnx_harness.py --modes serial,motion_gated --static
+    python python/benchmarks/onnx_harness.py --frames captures/ --save-frames captures.frames
+    python python/benchmarks/onnx_harness.py --frames captures.frames
+
+Without --manager, conv_manager.py runs a generated conv model (requires `onnx`).
+The process mode loads the manager class from its file in a worker process, so it
+needs a --manager defined at module level in a .py file.
+Synthetic frames use a fixed seed, so repeated runs see identical input; for real
+footage, --save-frames converts it once into a numpy_util raw frame file, which later
+runs memory-map with no decoding.
+"""
+
+import argparse
+import builtins
+import collections
+import importlib
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy
+
+UTIL_PATH = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'util'))
+if UTIL_PATH not in sys.path:
+    sys.path.insert(0, UTIL_PATH)
+
+# The inference process installs the same TD stand-ins
+from onnx_process_worker import HeadlessOp, headless_mod, load_class
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+FRAME_FILE_EXT = '.frames'
+
+
+def cook_on_result(self, result, info):
+    """on_result for the deliver_callback mode: cooks the Script TOP from the callback, as TD scripts do."""
+    if self.script_op is not None:
+        self.script_op.cook(force=True)
+
+
+# Class attribute overrides for each benchmark mode
+MODES = {
+    'serial': {},
+    'pipelined': {'PIPELINED': True},
+    'iobinding': {'USE_IO_BINDING': True},
+    'pipelined_iobinding': {'PIPELINED': True, 'USE_IO_BINDING': True},
+    'scheduled_30fps': {'TARGET_FPS': 30},
+    'adaptive_20ms': {'LATENCY_BUDGET_MS': 20, 'ADAPTIVE_RESOLUTION': True},
+    'process': {'USE_PROCESS_WORKER': True},
+    'motion_gated': {'MOTION_GATE': True},
+    'deliver_cook': {'RESULT_DELIVERY': 'cook'},
+    'pipelined_deliver_cook': {'PIPELINED': True, 'RESULT_DELIVERY': 'cook'},
+    'deliver_callback': {'RESULT_DELIVERY': 'callback', 'on_result': cook_on_result},
+}
+
+
+###################################################
+# TouchDesigner stand-ins
+###################################################
+
+class HeadlessMainThread:
+    """Stand-in for TD's `run()`: queues calls from any thread for the harness's main loop."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.calls = collections.deque()
+
+    def run(self, script, *args, **kwargs):
+        with self.cond:
+            self.calls.append((script, args))
+            self.cond.notify()
+
+    def wait_until(self, deadline):
+        """Sleep until `deadline` (perf_counter), running queued calls as they arrive."""
+        while True:
+            with self.cond:
+                while not self.calls:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        return
+                    self.cond.wait(remaining)
+                script, args = self.calls.popleft()
+            script(*args)
+
+    def clear(self):
+        with self.cond:
+            self.calls.clear()
+
+
+MAIN_THREAD = HeadlessMainThread()
+
+
+def install_td_stand_ins(util_path=UTIL_PATH):
+    if util_path not in sys.path:
+        sys.path.insert(0, util_path)
+    builtins.op = HeadlessOp(util_path)
+    builtins.mod = headless_mod
+    builtins.run = MAIN_THREAD.run
+
+
+class HeadlessPar:
+    """Holds parameter values like `scriptOp.par`."""
+
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+class CountingArray(numpy.ndarray):
+    """ndarray that counts .copy() calls, to catch extra copies of the TD-owned frame."""
+    copies = 0
+
+    def copy(self, *args, **kwargs):
+        CountingArray.copies += 1
+        return super().copy(*args, **kwargs)
+
+
+class HeadlessTOP:
+    """
+    Input TOP stand-in: numpyArray() cycles through frames and logs capture times.
+    Every call overwrites and returns the same buffer, like TD reusing its download buffer.
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.buffer = numpy.empty(frames[0].shape, dtype=frames[0].dtype)
+        self.index = 0
+        self.capture_times = {}  # frame id -> perf_counter when captured
+        self.last_frame_id = None
+
+    def numpyArray(self, delayed=False):
+        numpy.copyto(self.buffer, self.frames[self.index % len(self.frames)])
+        self.last_frame_id = self.index
+        self.capture_times[self.index] = time.perf_counter()
+        # Frame id rides along in opposite corners so it can be followed through the
+        # worker threads, and a frame overwritten mid-flight shows up as mismatched ids
+        self.buffer[0, 0, 0] = self.index
+        self.buffer[-1, -1, 0] = self.index
+        self.index += 1
+        return self.buffer.view(CountingArray)
+
+    def begin_next_download(self):
+        """Called after each cook: TD starts refilling the buffer, starting with one corner."""
+        self.buffer[0, 0, 0] = -1
+
+
+class HeadlessScriptOp:
+    """Script TOP stand-in: records every copyNumpyArray() call; cook() runs `on_cook`."""
+
+    def __init__(self, input_top, path='/headless/script1'):
+        self.path = path
+        self.inputs = [input_top]
+        self.par = HeadlessPar(Loadstatus='')
+        self.outputs = []  # (perf_counter, shape)
+        self.on_cook = None
+        self.forced_cooks = 0
+
+    def copyNumpyArray(self, nA):
+        self.outputs.append((time.perf_counter(), nA.shape))
+
+    def cook(self, force=False):
+        self.forced_cooks += force
+        if self.on_cook is not None:
+            self.on_cook()
+
+
+###################################################
+# Frame sources
+###################################################
+
+def synthetic_frames(width, height, count=8, seed=0):
+    """RGBA float32 frames in 0-1, like TOP.numpyArray()."""
+    rng = numpy.random.default_rng(seed)
+    return [rng.random((height, width, 4), dtype=numpy.float32) for _ in range(count)]
+
+
+def frames_from_disk(path, width=None, height=None):
+    """
+    Load images (or a single image) as bottom-up RGBA float32 frames, like TOP.numpyArray().
+    A numpy_util raw frame file (.frames) is memory-mapped as is: no decoding, and
+    `width` / `height` are ignored.
+    """
+    if path.lower().endswith(FRAME_FILE_EXT):
+        numpy_util = importlib.import_module('numpy_util')
+        frames, _ = numpy_util.read_frames(path)
+        if len(frames) == 0:
+            raise ValueError(f"No frames in {path}")
+        return frames
+    import cv2
+    files = [path] if os.path.isfile(path) else sorted(
+        os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')))
+    frames = []
+    for file in files:
+        image = cv2.imread(file, cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        if width and height:
+            image = cv2.resize(image, (width, height))
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGBA)
+        frames.append(numpy.ascontiguousarray(numpy.flipud(image)).astype(numpy.float32) / 255)
+    if not frames:
+        raise ValueError(f"No images found at {path}")
+    return frames
+
+
+def default_manager_class():
+    """conv_manager.ConvManager, with its conv model generated by onnx_iobinding_benchmark."""
+    if BENCHMARKS_PATH not in sys.path:
+        sys.path.insert(0, BENCHMARKS_PATH)
+    from onnx_iobinding_benchmark import build_test_model
+    manager_class = load_class(os.path.join(BENCHMARKS_PATH, 'conv_manager.py:ConvManager'))
+    build_test_model(sys.modules['conv_manager'].MODEL_PATH)
+    return manager_class
+
+
+def tracked_class(manager_class, overrides):
+    """
+    Subclass with mode overrides that follows each frame id (stored in pixel [0, 0, 0])
+    from preprocess through postprocess, via attributes on the tensors in flight, and
+    counts torn frames (corner ids that disagree when the worker reads the frame).
+    In process mode, only the parent-side hand-off (_process_frame) can be followed.
+    """
+
+    class TaggedTensor(numpy.ndarray):
+        frame_id = None
+
+    class TaggedOutputs(list):
+        frame_id = None
+
+    class TaggedDict(dict):
+        # Model graph inputs and contexts
+        frame_id = None
+
+    def tag(value, frame_id):
+        if isinstance(value, numpy.ndarray):
+            value = value.view(TaggedTensor)
+        elif isinstance(value, dict):
+            value = TaggedDict(value)
+        else:
+            value = TaggedOutputs(value)
+        value.frame_id = frame_id
+        return value
+
+    def read_frame_id(self, nA):
+        # Read the id before any input scaling blends the first pixel
+        frame_id = int(nA[0, 0, 0])
+        if frame_id != int(nA[-1, -1, 0]):
+            self.harness_torn_frames += 1
+        return frame_id
+
+    def _preprocess_input(self, nA):
+        frame_id = read_frame_id(self, nA)
+        return tag(manager_class._preprocess_input(self, nA), frame_id)
+
+    def _run_session(self, session, input_tensor):
+        return tag(manager_class._run_session(self, session, input_tensor), getattr(input_tensor, 'frame_id', None))
+
+    def postprocess(self, outputs):
+        result = manager_class.postprocess(self, outputs)
+        self.harness_published_id = getattr(outputs, 'frame_id', None)
+        return result
+
+    def _process_frame(self, client, frame_name, nA):
+        frame_id = read_frame_id(self, nA)
+        result = manager_class._process_frame(self, client, frame_name, nA)
+        self.harness_published_id = frame_id
+        return result
+
+    attributes = dict(overrides, _preprocess_input=_preprocess_input, _run_session=_run_session, postprocess=postprocess,
+                      _process_frame=_process_frame)
+    return type(f"Headless{manager_class.__name__}", (manager_class,), attributes)
+
+
+###################################################
+# Benchmark
+###################################################
+
+def rss_bytes():
+    """Current resident set size on Linux, or None elsewhere."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def run_benchmark(manager_class, frames, fps=60, duration=10.0, overrides=None, load_timeout=60.0):
+    """
+    Cook `manager_class` at `fps` for `duration` seconds after the model loads.
+
+    Returns a dict of results: cooks (plus forced cooks), results, fps, skipped, latency and onCook
+    time percentiles (ms), the median latency the manager reported in its ResultInfo, this
+    process's CPU time as a percentage of one core (the process backend's worker isn't included),
+    Python (tracemalloc) and RSS memory growth in MB, frame copies per capture,
+    extra copies of the TD array, stale ring slots, torn frames and motion-gated captures
+    (which are never copied, so they don't count towards copies per capture).
+    """
+    install_td_stand_ins()
+    onnx_util = importlib.import_module('onnx_util')
+    onnx_util.providers = lambda: ['CPUExecutionProvider']
+
+    manager = tracked_class(manager_class, overrides or {})()
+    manager.harness_published_id = None
+    manager.harness_torn_frames = 0
+    top = HeadlessTOP(frames)
+    script_op = HeadlessScriptOp(top)
+
+    # Load (and warm up) the model outside the measured window
+    deadline = time.perf_counter() + load_timeout
+    while manager.session is None:
+        manager.onCook(script_op)
+        if manager.load_error:
+            raise RuntimeError(manager.load_error)
+        if time.perf_counter() > deadline:
+            raise TimeoutError('Model did not load in time')
+        time.sleep(0.01)
+
+    top.capture_times.clear()
+    script_op.outputs.clear()
+    captures_start = top.index
+    gate = manager.motion_gate
+    gated_start = gate.gated_count if gate is not None else 0
+    ring = manager.frame_ring
+    ring_writes_start = ring.write_count if ring is not None else 0
+    CountingArray.copies = 0
+    latencies = []
+    info_latencies = []  # ResultInfo.latency_ms, as reported by the manager
+    cook_times = []
+    tracemalloc.start()
+    python_start = tracemalloc.get_traced_memory()[0]
+    cpu_start = time.process_time()
+    rss_start = rss_bytes()
+
+    def cook():
+        outputs_before = len(script_op.outputs)
+        published_id = manager.harness_published_id
+        cook_start = time.perf_counter()
+        manager.onCook(script_op)
+        cook_times.append(time.perf_counter() - cook_start)
+        top.begin_next_download()
+        if len(script_op.outputs) > outputs_before:
+            if published_id in top.capture_times:
+                latencies.append(script_op.outputs[-1][0] - top.capture_times[published_id])
+            info = manager.get_result_info()
+            if info is not None and info.latency_ms is not None:
+                info_latencies.append(info.latency_ms)
+
+    MAIN_THREAD.clear()
+    script_op.on_cook = cook
+    script_op.forced_cooks = 0
+    interval = 1.0 / fps
+    start = time.perf_counter()
+    next_cook = start
+    cooks = 0
+    while next_cook - start < duration:
+        MAIN_THREAD.wait_until(next_cook)
+        cook()
+        cooks += 1
+        next_cook += interval
+    elapsed = time.perf_counter() - start
+    cpu_time = time.process_time() - cpu_start
+    script_op.on_cook = None
+
+    python_growth = tracemalloc.get_traced_memory()[0] - python_start
+    tracemalloc.stop()
+    rss_end = rss_bytes()
+    captures = top.index - captures_start
+    gated = gate.gated_count - gated_start if gate is not None else 0
+    copied_captures = captures - gated
+    ring_copies = ring.write_count - ring_writes_start if ring is not None else 0
+    manager._stop_workers()
+
+    results = len(script_op.outputs)
+    latency_ms = numpy.array(latencies) * 1000 if latencies else numpy.zeros(1)
+    info_latency_ms = numpy.array(info_latencies) if info_latencies else numpy.zeros(1)
+    cook_ms = numpy.array(cook_times) * 1000
+    return {
+        'cooks': cooks,
+        'forced_cooks': script_op.forced_cooks,
+        'results': results,
+        'fps': results / elapsed,
+        'skipped': cooks - results,
+        'latency_p50': float(numpy.percentile(latency_ms, 50)),
+        'latency_p95': float(numpy.percentile(latency_ms, 95)),
+        'latency_max': float(latency_ms.max()),
+        'info_latency_p50': float(numpy.percentile(info_latency_ms, 50)),
+        'cook_p50': float(numpy.percentile(cook_ms, 50)),
+        'cook_p95': float(numpy.percentile(cook_ms, 95)),
+        'cpu_percent': 100 * cpu_time / elapsed,
+        'python_mb': python_growth / 1e6,
+        'rss_mb': (rss_end - rss_start) / 1e6 if rss_start is not None and rss_end is not None else float('nan'),
+        'captures': captures,
+        'gated': gated,
+        'copies_per_capture': (ring_copies + CountingArray.copies) / copied_captures if copied_captures else 0.0,
+        'extra_copies': CountingArray.copies,
+        'stale': ring.stale_count if ring is not None else 0,
+        'torn': manager.harness_torn_frames,
+    }
+
+
+def print_results(rows):
+    print(f"[Harness] {'mode':<20} {'cooks':>6} {'results':>8} {'fps':>7} {'skipped':>8} {'lat p50':>8} {'lat p95':>8} {'lat max':>8} {'info p50':>8} {'forced':>6} {'cook p50':>8} {'cook p95':>8} {'cpu %':>6} {'py MB':>7} {'rss MB':>7} "
+          f"{'copies':>7} {'gated':>6} {'stale':>6} {'torn':>5}")
+    for mode, r in rows:
+        print(f"[Harness] {mode:<20} {r['cooks']:>6} {r['results']:>8} {r['fps']:>7.1f} {r['skipped']:>8} "
+              f"{r['latency_p50']:>8.2f} {r['latency_p95']:>8.2f} {r['latency_max']:>8.2f} {r['info_latency_p50']:>8.2f} {r['forced_cooks']:>6} {r['cook_p50']:>8.2f} {r['cook_p95']:>8.2f} {r['cpu_percent']:>6.0f} {r['python_mb']:>7.2f} {r['rss_mb']:>7.2f} "
+              f"{r['copies_per_capture']:>7.2f} {r['gated']:>6} {r['stale']:>6} {r['torn']:>5}")
+
+
+def check_results(rows):
+    """Frame hand-off regression check: exactly one copy per captured frame and no torn frames."""
+    failures = []
+    for mode, r in rows:
+        if r['captures'] == 0:
+            failures.append(f"{mode}: no frames captured")
+        if r['copies_per_capture'] != 1.0 or r['extra_copies']:
+            failures.append(f"{mode}: {r['copies_per_capture']:.2f} copies per capture ({r['extra_copies']} extra)")
+        if r['torn']:
+            failures.append(f"{mode}: {r['torn']} torn frames")
+    for failure in failures:
+        print(f"[Harness] FAIL {failure}")
+    return not failures
+
+
+def check_frame_ring(ring_class, frame_count=2000, shape=(48, 64, 4)):
+    """
+    FrameRing check with no model: a slot pinned by a reader must keep its frame while
+    newer frames are written. Every frame is filled with its own id, so an overwrite of a
+    pinned slot shows up as a mismatch. Returns a list of failures.
+    """
+    name = ring_class.__name__
+    failures = []
+    frames = [numpy.full(shape, i, dtype=numpy.float32) for i in range(frame_count)]
+    ring = ring_class(2)
+    try:
+        # Pin frame 0 and keep writing: every write must land in the other slot
+        pinned_ref = ring.write(frames[0])
+        pinned = ring.acquire(pinned_ref)
+        refused = 0
+        for i in range(1, 50):
+            if ring.write(frames[i]) is None:
+                refused += 1
+            if not (pinned == 0).all():
+                failures.append(f"{name}: pinned slot overwritten by frame {i}")
+                break
+        if refused or ring.acquire(pinned_ref) is None:
+            failures.append(f"{name}: {refused} writes refused next to one pinned slot, or the pinned frame went stale")
+        else:
+            ring.release(pinned_ref)
+
+        # Pin the other slot too: with every slot being read, writes must be refused
+        other_ref = ring.write(frames[50])
+        ring.acquire(other_ref)
+        if ring.write(frames[51]) is not None:
+            failures.append(f"{name}: wrote into a ring whose slots were all pinned")
+        ring.release(pinned_ref)
+        ring.release(other_ref)
+
+        # Threaded: a reader pins the newest frame and checks it while the writer keeps going
+        frame_ids = {}  # FrameRef.sequence -> frame id written with it
+        latest = [None]
+        done = threading.Event()
+        mismatches = []
+
+        def reader():
+            while not done.is_set():
+                ref = latest[0]
+                frame = ring.acquire(ref) if ref is not None else None
+                if frame is None:
+                    continue
+                expected = frame_ids[ref.sequence]
+                for _ in range(3):
+                    if not (frame == expected).all():
+                        mismatches.append(expected)
+                ring.release(ref)
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        for i in range(52, frame_count):
+            ref = ring.write(frames[i])
+            if ref is not None:
+                frame_ids[ref.sequence] = i
+                latest[0] = ref
+        done.set()
+        thread.join()
+        if mismatches:
+            failures.append(f"{name}: {len(mismatches)} reads saw a pinned slot change (frames {mismatches[:5]})")
+    finally:
+        ring.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark an ONNXInferenceManager subclass without TouchDesigner')
+    parser.add_argument('--manager', help='path/to/file.py:ClassName (default: built-in conv model manager)')
+    parser.add_argument('--frames', help=f"Image file, folder of images or raw {FRAME_FILE_EXT} file (default: synthetic frames)")
+    parser.add_argument('--save-frames', help=f"Write the frames to a raw {FRAME_FILE_EXT} file for fast replay, then run")
+    parser.add_argument('--size', default='640x480', help='Frame size WxH for synthetic or resized disk frames')
+    parser.add_argument('--static', action='store_true', help='Repeat a single frame, like an empty room')
+    parser.add_argument('--fps', type=float, default=60)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--modes', default='serial,pipelined', help=f"Comma-separated: {', '.join(MODES)}")
+    parser.add_argument('--check', action='store_true', help='Exit non-zero unless every mode made one copy per frame with none torn')
+    args = parser.parse_args()
+
+    install_td_stand_ins()
+    if args.check:
+        frame_ring_util = importlib.import_module('frame_ring_util')
+        ring_failures = check_frame_ring(frame_ring_util.FrameRing) + check_frame_ring(frame_ring_util.SharedFrameRing)
+        for failure in ring_failures:
+            print(f"[Harness] FAIL {failure}")
+        print(f"[Harness] FrameRing pinned-slot check: {'FAIL' if ring_failures else 'ok'}")
+        if ring_failures:
+            sys.exit(1)
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    frames = frames_from_disk(args.frames, width, height) if args.frames else synthetic_frames(width, height)
+    if args.static:
+        frames = frames[:1]
+    if args.save_frames:
+        count = importlib.import_module('numpy_util').write_frames(args.save_frames, frames, args.fps)
+        print(f"[Harness] saved {count} frames to {args.save_frames}")
+
+    manager_class = load_class(args.manager) if args.manager else default_manager_class()
+
+    print(f"[Harness] {manager_class.__name__} | {len(frames)} frames at {width}x{height} | {args.fps} fps for {args.duration}s")
+    rows = []
+    for mode in args.modes.split(','):
+        rows.append((mode, run_benchmark(manager_class, frames, args.fps, args.duration, MODES[mode.strip()])))
+    print_results(rows)
+    if args.check and not check_results(rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+IOBinding vs. session.run benchmark (CPUExecutionProvider)
+
+Compares the default `session.run(None, {...})` path used by ONNXInferenceManager
+with onnx_util.IOBindingRunner, reporting time per call, how often each path's output
+memory moves between calls (the first output's data pointer, which a reused buffer
+keeps), and the runner's own counters: input copies and buffer (re)allocations per run.
+The speed ratio is reported as measured; on CPU, IOBinding is often no faster.
+
+Runs outside TouchDesigner:
+    python python/benchmarks/onnx_iobinding_benchmark.py --model path/to/model.onnx
+Without --model, a small conv model is generated (requires the `onnx` package).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy
+import onnxruntime as ort
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'util'))
+import onnx_util
+
+
+def build_test_model(path, size=256, channels=16):
+    """Write a single-conv NCHW float32 model with a full-resolution output."""
+    import onnx
+    from onnx import helper, TensorProto, numpy_helper
+    weights = numpy.random.rand(channels, 3, 3, 3).astype(numpy.float32)
+    graph = helper.make_graph(
+        [
+            helper.make_node('Conv', ['input', 'weights'], ['conv'], pads=[1, 1, 1, 1]),
+            helper.make_node('Relu', ['conv'], ['output']),
+        ],
+        'iobinding_benchmark',
+        [helper.make_tensor_value_info('input', TensorProto.FLOAT, [1, 3, size, size])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, [1, channels, size, size])],
+        [numpy_helper.from_array(weights, 'weights')],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8  # Loadable by older onnxruntime builds than the installed onnx defaults to
+    onnx.save(model, path)
+    return path
+
+
+def random_input(session):
+    shape = [d if isinstance(d, int) else 1 for d in session.get_inputs()[0].shape]
+    return numpy.random.rand(*shape).astype(numpy.float32)
+
+
+def measure(label, run, frames, warmup=5):
+    """
+    Time `run(frame)` and count the calls whose first output isn't at the previous
+    call's address. The previous outputs are kept alive (as a pipeline holding them
+    for postprocess would), so a fresh allocation can't land on the same address.
+    """
+    for frame in frames[:warmup]:
+        run(frame)
+    times = []
+    moved = 0
+    previous_address = None
+    previous = None
+    for frame in frames:
+        start = time.perf_counter()
+        outputs = run(frame)
+        times.append(time.perf_counter() - start)
+        address = outputs[0].ctypes.data
+        moved += previous_address is not None and address != previous_address
+        previous_address = address
+        previous = outputs
+    ms = numpy.array(times) * 1000
+    print(f"[Benchmark] {label:<12} mean {ms.mean():7.3f} ms | p95 {numpy.percentile(ms, 95):7.3f} ms | "
+          f"output moved {moved}/{len(frames) - 1} calls")
+    return ms
+
+
+def measure_copy(frames):
+    """Time one frame-sized host copy: the extra work an input upload into a preallocated buffer does."""
+    buffer = numpy.empty_like(frames[0])
+    times = []
+    for frame in frames:
+        start = time.perf_counter()
+        numpy.copyto(buffer, frame)
+        times.append(time.perf_counter() - start)
+    return numpy.mean(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare session.run and IOBinding on CPUExecutionProvider')
+    parser.add_argument('--model', help='ONNX model path (default: generated conv model)')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    model_path = args.model
+    if model_path is None:
+        model_path = build_test_model(os.path.join(tempfile.gettempdir(), 'haxlib_iobinding_benchmark.onnx'))
+
+    session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+    frames = [random_input(session) for _ in range(4)]
+    frames = [frames[i % len(frames)] for i in range(args.iterations)]
+
+    print(f"[Benchmark] model: {model_path}")
+    print(f"[Benchmark] providers: {session.get_providers()} | iterations: {args.iterations}")
+    run_ms = measure('session.run', lambda frame: session.run(None, {input_name: frame}), frames)
+    runner = onnx_util.IOBindingRunner(session, num_output_sets=1)  # Same as the serial worker
+    bind_ms = measure('IOBinding', runner.run, frames)
+    print(f"[Benchmark] IOBinding on {runner.device}: {runner.input_copy_count} input copies and "
+          f"{runner.bind_count} buffer allocations for {runner.run_count} runs")
+    print(f"[Benchmark] frame copy alone: {measure_copy(frames):.3f} ms")
+    ratio = run_ms.mean() / bind_ms.mean()
+    print(f"[Benchmark] IOBinding runs at {ratio:.2f}x the speed of session.run ({'faster' if ratio > 1 else 'slower'})")
+
+
+if __name__ == '__main__':
+    main()
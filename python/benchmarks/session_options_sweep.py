@@ -0,0 +1,57 @@
+"""
+SessionOptions sweep
+
+Times a model under every combination of intra-op thread count, execution mode and
+graph optimization level on this machine, prints the table and saves the results
+beside the model. ONNXInferenceManager's default get_session_options() then loads the
+fastest config, so run this once per install machine (and again after model changes).
+
+Runs outside TouchDesigner:
+    python python/benchmarks/session_options_sweep.py --model path/to/model.onnx
+    python python/benchmarks/session_options_sweep.py --model path/to/model.onnx --threads 1,2,4 --levels all
+Without --model, the generated conv model from onnx_iobinding_benchmark is used
+(requires the `onnx` package).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'util'))
+import onnx_util
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep ONNX Runtime SessionOptions and save the fastest config for this machine')
+    parser.add_argument('--model', help='ONNX model path (default: generated conv model)')
+    parser.add_argument('--threads', help=f"Comma-separated intra-op thread counts (default: {','.join(map(str, onnx_util.default_thread_counts()))})")
+    parser.add_argument('--modes', default='sequential,parallel', help=f"Comma-separated: {', '.join(onnx_util.EXECUTION_MODES)}")
+    parser.add_argument('--levels', default='basic,extended,all', help=f"Comma-separated: {', '.join(onnx_util.OPTIMIZATION_LEVELS)}")
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--cpu', action='store_true', help='Sweep on CPUExecutionProvider only')
+    args = parser.parse_args()
+
+    model_path = args.model
+    if model_path is None:
+        from onnx_iobinding_benchmark import build_test_model
+        model_path = build_test_model(os.path.join(tempfile.gettempdir(), 'haxlib_sweep_benchmark.onnx'))
+
+    providers = ['CPUExecutionProvider'] if args.cpu else onnx_util.providers()
+    thread_counts = [int(t) for t in args.threads.split(',')] if args.threads else None
+    print(f"[Sweep] model: {model_path}")
+    print(f"[Sweep] providers: {providers} | cpus: {os.cpu_count()} | runs: {args.runs}")
+    results = onnx_util.sweep_session_options(model_path, providers, thread_counts, args.modes.split(','),
+                                              args.levels.split(','), args.runs)
+    if not results:
+        sys.exit('[Sweep] every config failed')
+
+    print(f"[Sweep] {'threads':>7} {'mode':<10} {'level':<8} {'median ms':>9} {'p95 ms':>8}")
+    for r in results:
+        c = r['config']
+        print(f"[Sweep] {c['intra_op_num_threads']:>7} {c['execution_mode']:<10} {c['graph_optimization_level']:<8} {r['ms']:>9.3f} {r['p95']:>8.3f}")
+    print(f"[Sweep] saved: {onnx_util.save_tuned_config(model_path, providers, results)}")
+
+
+if __name__ == '__main__':
+    main()
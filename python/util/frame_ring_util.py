@@ -0,0 +1,221 @@
+"""
+Frame hand-off between onCook and ONNXInferenceManager's workers: bounded StageQueues
+between pipeline stages, and FrameRings of preallocated slots that captured frames are
+copied into once (SharedFrameRing keeps them in shared memory for the process backend).
+"""
+
+import threading
+import collections
+import numpy
+
+onnx_process_worker = mod(f'{op.PyUtils}/onnx_process_worker')
+
+
+class StageQueue:
+    """
+    Bounded hand-off queue between pipeline stages.
+
+    When full, a 'newest' queue drops its oldest item to make room, so
+    downstream stages always see the freshest frame. A 'fifo' queue keeps
+    every item and applies back-pressure instead: non-blocking puts are
+    rejected and blocking puts wait for space.
+    """
+
+    POLICY_NEWEST = 'newest'
+    POLICY_FIFO = 'fifo'
+
+    def __init__(self, depth=1, policy=POLICY_NEWEST):
+        if policy not in (self.POLICY_NEWEST, self.POLICY_FIFO):
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.depth = max(1, int(depth))
+        self.policy = policy
+        self.items = collections.deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item, block=False):
+        """
+        Add an item to the queue.
+
+        Returns:
+            True if the item was queued, False if it was rejected
+            (FIFO queue full and not blocking, or queue closed).
+        """
+        with self.cond:
+            while len(self.items) >= self.depth and not self.closed:
+                if self.policy == self.POLICY_NEWEST:
+                    self.items.popleft()
+                    self.dropped += 1
+                elif block:
+                    self.cond.wait()
+                else:
+                    return False
+            if self.closed:
+                return False
+            self.items.append(item)
+            self.cond.notify_all()
+            return True
+
+    def get(self):
+        """Block until an item is available. Returns None once the queue is closed."""
+        with self.cond:
+            while not self.items and not self.closed:
+                self.cond.wait()
+            if self.closed:
+                return None
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def is_full(self):
+        with self.cond:
+            return len(self.items) >= self.depth
+
+    def close(self):
+        """Wake all waiting threads and reject further items."""
+        with self.cond:
+            self.closed = True
+            self.items.clear()
+            self.cond.notify_all()
+
+
+class FrameRef:
+    """
+    Handle to a frame written into a FrameRing: the slot index and the sequence it was
+    written with, which doubles as the frame's id, plus when its capture started.
+    """
+
+    __slots__ = ('index', 'sequence', 'capture_ns')
+
+    def __init__(self, index, sequence, capture_ns=0):
+        self.index = index
+        self.sequence = sequence
+        self.capture_ns = capture_ns
+
+
+class FrameRing:
+    """
+    Ring of preallocated frame slots between onCook and the inference worker(s).
+
+    onCook copies each captured frame into the next free slot exactly once and
+    passes a FrameRef downstream; the worker acquires the slot and reads the frame
+    in place, with no further copies. Every write stamps the slot with a new
+    sequence number (-1 while the copy is in progress), so a reader holding a stale
+    FrameRef can tell that its slot was torn (still being written) or reused
+    (overwritten by a newer frame) and drop it. Acquired slots are never written
+    until they are released, so a frame can't change underneath preprocess.
+    """
+
+    WRITING = -1
+
+    def __init__(self, num_slots=2):
+        self.num_slots = max(2, int(num_slots))
+        self.lock = threading.Lock()
+        self.buffers = [None] * self.num_slots
+        self.sequences = [0] * self.num_slots  # 0 = never written
+        self.readers = [0] * self.num_slots
+        self.next_index = 0
+        self.sequence = 0
+        self.write_count = 0  # Frames copied in
+        self.full_count = 0  # Writes rejected because every slot was being read
+        self.stale_count = 0  # Acquires rejected because the slot was torn or reused
+
+    def _slot_buffer(self, index, nA):
+        """Slot buffer matching nA's shape and dtype, (re)allocated and touched on first use."""
+        buffer = self.buffers[index]
+        if buffer is None or buffer.shape != nA.shape or buffer.dtype != nA.dtype:
+            # numpy.zeros rather than numpy.empty so the pages are committed before the first copy
+            buffer = numpy.zeros(nA.shape, dtype=nA.dtype)
+            self.buffers[index] = buffer
+        return buffer
+
+    def write(self, nA):
+        """
+        Copy a frame into the next free slot.
+
+        Returns:
+            A FrameRef for the worker, or None if every slot is being read.
+        """
+        with self.lock:
+            for offset in range(self.num_slots):
+                index = (self.next_index + offset) % self.num_slots
+                if self.readers[index] == 0:
+                    break
+            else:
+                self.full_count += 1
+                return None
+            self.next_index = (index + 1) % self.num_slots
+            self.sequence += 1
+            sequence = self.sequence
+            self.sequences[index] = self.WRITING
+            buffer = self._slot_buffer(index, nA)
+
+        # The single copy from TD-owned memory, outside the lock
+        numpy.copyto(buffer, nA)
+
+        with self.lock:
+            self.sequences[index] = sequence
+            self.write_count += 1
+        return FrameRef(index, sequence)
+
+    def acquire(self, ref):
+        """Pin a slot for reading. Returns its frame, or None if the slot was torn or reused."""
+        with self.lock:
+            if self.sequences[ref.index] != ref.sequence:
+                self.stale_count += 1
+                return None
+            self.readers[ref.index] += 1
+            return self.buffers[ref.index]
+
+    def release(self, ref):
+        with self.lock:
+            self.readers[ref.index] = max(0, self.readers[ref.index] - 1)
+
+    def owns(self, array):
+        """True if `array` may be a view into one of the slots."""
+        return any(buffer is not None and numpy.may_share_memory(array, buffer) for buffer in self.buffers)
+
+    def close(self):
+        """Drop the slot buffers. Call once no worker can read them."""
+        with self.lock:
+            self.buffers = [None] * self.num_slots
+
+
+class SharedFrameRing(FrameRing):
+    """FrameRing whose slots live in shared memory, so a worker process can read frames in place."""
+
+    def __init__(self, num_slots=2):
+        super().__init__(num_slots)
+        self.blocks = [None] * self.num_slots  # SharedMemory behind each slot
+        self.generation = 0  # Bumped whenever a slot's block is reallocated
+        self.retired = []  # Replaced blocks whose close() waits for a live view to go
+
+    def _slot_buffer(self, index, nA):
+        buffer = self.buffers[index]
+        if buffer is None or buffer.shape != nA.shape or buffer.dtype != nA.dtype:
+            old_block = self.blocks[index]
+            self.blocks[index], buffer = onnx_process_worker.create_shared_array(nA.shape, nA.dtype)
+            buffer.fill(0)  # Commit the pages before the first copy
+            self.buffers[index] = buffer
+            self.generation += 1
+            if old_block is not None:
+                self.retired.append(old_block)
+            self.retired = [block for block in self.retired if not onnx_process_worker.release_shared_memory(block, unlink=True)]
+        return buffer
+
+    def slot_name(self, index):
+        return self.blocks[index].name
+
+    def slot_set(self):
+        """(generation, block names) for the worker process, which keeps exactly these blocks attached."""
+        with self.lock:
+            return self.generation, [block.name for block in self.blocks if block is not None]
+
+    def close(self):
+        super().close()
+        for block in self.blocks:
+            if block is not None:
+                self.retired.append(block)
+        self.blocks = [None] * self.num_slots
+        self.retired = [block for block in self.retired if not onnx_process_worker.release_shared_memory(block, unlink=True)]
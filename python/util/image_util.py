@@ -1,32 +1,460 @@
+import os
+import mmap
 import numpy
 import cv2
 import base64
+import hashlib
+import time
+import threading
+import collections
+import concurrent.futures
 
-def base64_from_top(top, ext='.jpg'):
+def base64_from_top(top, ext='.jpg', quality=None):
     # From TDcomfyEXT.py
-    # get the image data from the TOP in 255 range from normalized
-    image = top.numpyArray(delayed=False) * 255
-    image = numpy.flipud(image).astype(numpy.uint8)
+    # get the image data from the TOP in 255 range from normalized, flipped upright
+    image = capture_uint8(top.numpyArray(delayed=False))
+    return base64_from_uint8(image, ext, quality)
 
-    # Check if the image has an alpha channel
-    if image.shape[2] == 4:
-        image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+
+# Frame -> base64 steps shared by base64_from_top and ImageEncoder.
+# capture_uint8 is the only pass over the TD array: the flip rides along with the
+# float -> uint8 multiply (or with a plain copy when the TOP is already 8-bit), so
+# the result is upright, owned by us and a quarter of the float frame's size.
+
+def encode_params(ext, quality=None):
+    """cv2.imencode params: `quality` is 0-100 for .jpg / .webp and the 0-9 compression level for .png."""
+    if quality is None:
+        return []
+    if ext in ('.jpg', '.jpeg'):
+        return [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    if ext == '.webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+    if ext == '.png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, int(quality)]
+    return []
+
+def capture_uint8(nA, out=None):
+    """Copy a TOP's numpyArray() into an upright uint8 array (into `out` when it matches)."""
+    if out is None or out.shape != nA.shape:
+        out = numpy.empty(nA.shape, dtype=numpy.uint8)
+    flipped = numpy.flipud(nA)
+    if nA.dtype == numpy.uint8:
+        numpy.copyto(out, flipped)
+    elif numpy.issubdtype(nA.dtype, numpy.integer):
+        numpy.multiply(flipped, 255 / numpy.iinfo(nA.dtype).max, out=out, casting='unsafe')
     else:
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        numpy.multiply(flipped, 255, out=out, casting='unsafe')
+    return out
+
+def capture_upright(nA, out=None):
+    """Copy a TOP's numpyArray() upright, keeping its dtype (into `out` when it matches)."""
+    if out is None or out.shape != nA.shape or out.dtype != nA.dtype:
+        out = numpy.empty(nA.shape, dtype=nA.dtype)
+    numpy.copyto(out, numpy.flipud(nA))
+    return out
+
+def swap_red_blue(image):
+    """RGB(A) <-> BGR(A) in place, for OpenCV's channel order."""
+    # Check if the image has an alpha channel
+    if image.ndim == 3 and image.shape[2] == 4:
+        cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA, dst=image)
+    elif image.ndim == 3 and image.shape[2] == 3:
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    return image
+
+def base64_from_uint8(image, ext='.jpg', quality=None):
+    """Encode an upright RGB(A) uint8 image. Swaps the channels to OpenCV's BGR(A) in place."""
+    swap_red_blue(image)
 
     # ask for jpg encoding
-    imageData = cv2.imencode(ext, image)[1].tobytes()
+    ok, imageData = cv2.imencode(ext, image, encode_params(ext, quality))
+    if not ok:
+        raise ValueError(f"Could not encode image as {ext}")
     return str(base64.b64encode(imageData), "utf-8")
 
 
-def base64_from_image_file(imagePath):
+class ImageEncoder:
+    """
+    Encodes TOPs to base64 JPEG/PNG/WebP strings on a worker pool.
+
+    submit() captures the frame on the calling thread (one pass into a reused uint8
+    buffer, see capture_uint8) and returns a concurrent.futures.Future of the base64
+    string; the channel swap, imencode and base64 happen on a worker. At most
+    `max_in_flight` jobs run or wait at once: past that, submit() returns None (and
+    counts a drop) unless `block` is set, so a slow encoder can't pile up 4K frames.
+    Done-callbacks run on the worker thread; use TD's run() from them to get back
+    onto the main thread.
+
+    Example:
+        image_util = mod(f'{op.PyUtils}/image_util')
+        self.encoder = image_util.ImageEncoder(ext='.jpg', quality=85)
+        future = self.encoder.submit(op('render1'))
+        if future is not None:
+            future.add_done_callback(lambda f: run(self.send_image, f.result()))
+    """
+
+    def __init__(self, ext='.jpg', quality=None, workers=2, max_in_flight=4):
+        self.ext = ext
+        self.quality = quality
+        self.max_in_flight = max_in_flight
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ImageEncoder')
+        self.cond = threading.Condition()
+        self.in_flight = 0
+        self.free_buffers = []  # uint8 capture buffers returned by finished jobs
+        self.submitted_count = 0
+        self.dropped_count = 0
+
+    def submit(self, top, ext=None, quality=None, block=False):
+        """Capture `top` now and encode it in the background. Returns a Future, or None if dropped."""
+        return self.submit_array(top.numpyArray(delayed=False), ext, quality, block)
+
+    def submit_array(self, nA, ext=None, quality=None, block=False):
+        """Like submit() for a numpyArray()-style array (bottom-up RGB(A), float or 8-bit)."""
+        with self.cond:
+            while self.in_flight >= self.max_in_flight:
+                if not block:
+                    self.dropped_count += 1
+                    return None
+                self.cond.wait()
+            self.in_flight += 1
+            self.submitted_count += 1
+            buffer = self._take_buffer(nA.shape)
+        try:
+            image = capture_uint8(nA, buffer)
+            return self.executor.submit(self._encode, image, ext or self.ext, self.quality if quality is None else quality)
+        except Exception:
+            self._finish(None)
+            raise
+
+    def _take_buffer(self, shape):
+        for i, buffer in enumerate(self.free_buffers):
+            if buffer.shape == shape:
+                return self.free_buffers.pop(i)
+        return None
+
+    def _encode(self, image, ext, quality):
+        try:
+            return base64_from_uint8(image, ext, quality)
+        finally:
+            self._finish(image)
+
+    def _finish(self, image):
+        with self.cond:
+            self.in_flight -= 1
+            # Keep one buffer per job that can be in flight; older sizes age out
+            if image is not None:
+                self.free_buffers.append(image)
+                del self.free_buffers[:-self.max_in_flight]
+            self.cond.notify()
+
+    def stats(self):
+        with self.cond:
+            return {'submitted': self.submitted_count, 'dropped': self.dropped_count, 'in_flight': self.in_flight}
+
+    def close(self, wait=True):
+        """Stop accepting jobs; with `wait`, finish the queued ones first."""
+        self.executor.shutdown(wait=wait)
+
+
+class FrameRecorder:
+    """
+    Writes numbered frames (PNG / JPEG / raw .npy) to a folder from worker threads,
+    for dataset capture without stalling the script that records them.
+
+    record() copies the frame on the calling thread (upright; converted to uint8 for
+    images, kept as-is for .npy) into a pooled buffer and queues it. The queue holds
+    at most `queue_size` frames; when it's full, POLICY_DROP_OLDEST discards the oldest
+    waiting frame to make room, and POLICY_BLOCK waits for a writer (up to
+    `block_timeout` seconds, then drops the new frame). Frames are numbered when
+    recorded, so drops show up as gaps in the file names. stats() reports dropped
+    frames and write throughput, for sizing disks and `workers`.
+
+    Example:
+        image_util = mod(f'{op.PyUtils}/image_util')
+        self.recorder = image_util.FrameRecorder(project.folder + '/capture', ext='.jpg', quality=95)
+        self.recorder.record(scriptOp.inputs[0].numpyArray())  # every cook
+        self.recorder.stop()  # writes what's queued
+    """
+
+    POLICY_DROP_OLDEST = 'drop_oldest'
+    POLICY_BLOCK = 'block'
+
+    def __init__(self, folder, ext='.png', quality=None, workers=2, queue_size=8, policy=POLICY_DROP_OLDEST,
+                 block_timeout=None, prefix='frame_', start_index=0):
+        self.folder = folder
+        self.ext = ext
+        self.params = encode_params(ext, quality)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.queue_size = queue_size
+        self.prefix = prefix
+        self.next_index = start_index
+        self.cond = threading.Condition()
+        self.queue = collections.deque()  # (index, frame)
+        self.free_buffers = []
+        self.stopped = False
+        self.recorded_count = 0
+        self.written_count = 0
+        self.dropped_count = 0
+        self.error_count = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0  # Summed across writers
+        self.start_time = time.perf_counter()
+        os.makedirs(folder, exist_ok=True)
+        self.threads = [threading.Thread(target=self._write_loop, name=f'FrameRecorder{i}', daemon=True) for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def frame_path(self, index):
+        return os.path.join(self.folder, f"{self.prefix}{index:06d}{self.ext}")
+
+    def record(self, nA):
+        """Queue a frame (a TOP's numpyArray(): bottom-up, float or 8-bit). Returns its index, or None if dropped."""
+        with self.cond:
+            if self.stopped:
+                raise RuntimeError('FrameRecorder is stopped')
+            index = self.next_index
+            self.next_index += 1
+            self.recorded_count += 1
+            buffer = self._take_buffer(nA.shape)
+
+        # Copy outside the lock so writers keep draining the queue meanwhile
+        frame = capture_upright(nA, buffer) if self.ext == '.npy' else capture_uint8(nA, buffer)
+
+        with self.cond:
+            if len(self.queue) >= self.queue_size and self.policy == self.POLICY_BLOCK:
+                deadline = None if self.block_timeout is None else time.perf_counter() + self.block_timeout
+                while len(self.queue) >= self.queue_size and not self.stopped:
+                    remaining = None if deadline is None else deadline - time.perf_counter()
+                    if remaining is not None and remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+            if self.stopped:
+                self._drop(frame)
+                return None
+            if len(self.queue) >= self.queue_size:
+                if self.policy != self.POLICY_DROP_OLDEST:
+                    self._drop(frame)
+                    return None
+                _, oldest = self.queue.popleft()
+                self._drop(oldest)
+            self.queue.append((index, frame))
+            self.cond.notify_all()
+        return index
+
+    def _take_buffer(self, shape):
+        for i, buffer in enumerate(self.free_buffers):
+            if buffer.shape == shape:
+                return self.free_buffers.pop(i)
+        return None
+
+    def _recycle(self, frame):
+        """Return a frame's buffer to the pool. Call with cond held."""
+        self.free_buffers.append(frame)
+        del self.free_buffers[:-(self.queue_size + len(self.threads))]
+
+    def _drop(self, frame):
+        self.dropped_count += 1
+        self._recycle(frame)
+
+    def _write_loop(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self.stopped:
+                    self.cond.wait()
+                if not self.queue:
+                    return
+                index, frame = self.queue.popleft()
+                self.cond.notify_all()
+            start = time.perf_counter()
+            size = 0
+            try:
+                size = self._write(self.frame_path(index), frame)
+            except Exception as e:
+                print('[ImageUtil] Error writing frame:', index, e)
+            with self.cond:
+                if size:
+                    self.written_count += 1
+                    self.bytes_written += size
+                else:
+                    self.error_count += 1
+                self.write_seconds += time.perf_counter() - start
+                self._recycle(frame)
+                self.cond.notify_all()
+
+    def _write(self, path, frame):
+        """Write one frame. Returns the bytes written (0 on failure)."""
+        if self.ext == '.npy':
+            numpy.save(path, frame)
+        elif not cv2.imwrite(path, swap_red_blue(frame), self.params):
+            return 0
+        return os.path.getsize(path)
+
+    def stats(self):
+        """Frame counts, queue depth and write throughput (frames/s and MB/s since start, and per writer)."""
+        with self.cond:
+            elapsed = max(time.perf_counter() - self.start_time, 1e-9)
+            return {
+                'recorded': self.recorded_count,
+                'written': self.written_count,
+                'dropped': self.dropped_count,
+                'errors': self.error_count,
+                'queued': len(self.queue),
+                'fps': self.written_count / elapsed,
+                'mb_per_sec': self.bytes_written / 1e6 / elapsed,
+                'ms_per_frame': 1000 * self.write_seconds / self.written_count if self.written_count else 0.0,
+            }
+
+    def stop(self, wait=True):
+        """Stop recording. With `wait`, the queued frames are written first; otherwise they're dropped."""
+        with self.cond:
+            self.stopped = True
+            if not wait:
+                while self.queue:
+                    self._drop(self.queue.popleft()[1])
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join()
+        return self.stats()
+
+
+def base64_from_image_file(imagePath, cache=None):
     # check whether file exists
     if not os.path.exists(imagePath):
         print('[ImageUtil] Error: Image file not found:', imagePath)
         return "Error: Image file not found"
 
-    # convert image to base64 string
-    with open(imagePath, "rb") as imageFile:
-        base64Str = base64.b64encode(imageFile.read())
-        base64Str = base64Str.decode('utf-8')
-        return base64Str
+    # convert image to base64 string, streamed so the file is never held in memory whole
+    if cache is not None:
+        return cache.base64_from_file(imagePath)
+    return ''.join(iter_base64_file(imagePath))
+
+
+# Streaming base64 for large files: the file is read in blocks whose size is a
+# multiple of 3 bytes, so each block encodes to complete base64 quads with no padding
+# until the last one, and the concatenated chunks equal base64 of the whole file.
+# Peak memory is about one block plus its encoding, whatever the file size.
+
+BASE64_CHUNK_SIZE = 3 * 256 * 1024  # 768 KB read -> 1 MB of base64 per chunk
+
+def iter_base64_file(path, chunk_size=BASE64_CHUNK_SIZE, use_mmap=False):
+    """
+    Yield the base64 encoding of a file as str chunks.
+    Reads into one reused buffer, or slices an mmap of the file with `use_mmap`
+    (no read copies; the OS pages the file in and out as needed).
+    """
+    chunk_size = max(3, chunk_size - chunk_size % 3)
+    with open(path, 'rb') as file:
+        if use_mmap and os.fstat(file.fileno()).st_size > 0:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for start in range(0, len(mapped), chunk_size):
+                        yield base64.b64encode(view[start:start + chunk_size]).decode('ascii')
+                finally:
+                    view.release()
+            return
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while True:
+            count = file.readinto(buffer)
+            if not count:
+                break
+            yield base64.b64encode(view[:count]).decode('ascii')
+
+def write_base64_file(path, writer, chunk_size=BASE64_CHUNK_SIZE, use_mmap=False):
+    """
+    Stream a file's base64 encoding to `writer`: a text file-like object (anything with
+    .write) or a callable taking each str chunk. Returns the number of characters written.
+    """
+    write = writer.write if hasattr(writer, 'write') else writer
+    written = 0
+    for chunk in iter_base64_file(path, chunk_size, use_mmap):
+        write(chunk)
+        written += len(chunk)
+    return written
+
+def file_content_hash(path, chunk_size=BASE64_CHUNK_SIZE):
+    """blake2b hex digest of a file's content, read in blocks."""
+    digest = hashlib.blake2b(digest_size=20)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, 'rb') as file:
+        while True:
+            count = file.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+
+class Base64Cache:
+    """
+    LRU cache of base64 strings keyed by file content hash, for images that get sent
+    over and over (e.g. the same reference image in every ComfyUI / Ollama request).
+
+    A file is only re-hashed when its path, size or mtime changes; identical content
+    under different paths shares one entry. Entries are evicted least recently used
+    first once there are more than `max_entries` or their strings exceed `max_chars`.
+
+    Example:
+        image_util = mod(f'{op.PyUtils}/image_util')
+        self.base64_cache = image_util.Base64Cache()
+        payload['images'] = [image_util.base64_from_image_file(path, self.base64_cache)]
+    """
+
+    def __init__(self, max_entries=32, max_chars=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # content hash -> base64 str
+        self.hashes = {}  # path -> ((size, mtime_ns), content hash)
+        self.total_chars = 0
+        self.hits = 0
+        self.misses = 0
+
+    def content_hash(self, path):
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            known = self.hashes.get(path)
+        if known is not None and known[0] == signature:
+            return known[1]
+        content_hash = file_content_hash(path)
+        with self.lock:
+            self.hashes[path] = (signature, content_hash)
+        return content_hash
+
+    def base64_from_file(self, path):
+        content_hash = self.content_hash(path)
+        with self.lock:
+            encoded = self.entries.get(content_hash)
+            if encoded is not None:
+                self.entries.move_to_end(content_hash)
+                self.hits += 1
+                return encoded
+            self.misses += 1
+        encoded = ''.join(iter_base64_file(path))
+        self.put(content_hash, encoded)
+        return encoded
+
+    def put(self, content_hash, encoded):
+        with self.lock:
+            previous = self.entries.pop(content_hash, None)
+            if previous is not None:
+                self.total_chars -= len(previous)
+            self.entries[content_hash] = encoded
+            self.total_chars += len(encoded)
+            while self.entries and (len(self.entries) > self.max_entries or self.total_chars > self.max_chars):
+                _, evicted = self.entries.popitem(last=False)
+                self.total_chars -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hashes.clear()
+            self.total_chars = 0
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'chars': self.total_chars, 'hits': self.hits, 'misses': self.misses}
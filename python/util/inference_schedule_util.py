@@ -0,0 +1,231 @@
+"""
+Timing helpers for ONNXInferenceManager: per-stage telemetry ring buffers, the
+CaptureScheduler that paces captures from those timings, and the MotionGate that
+skips inference while the input is static.
+"""
+
+import numpy
+
+
+class InferenceTelemetry:
+    """
+    Fixed-size ring buffers of per-stage durations (perf_counter_ns), plus result
+    timestamps for throughput. Recording is a list store and an index bump, so it
+    stays well under a microsecond per sample; percentiles are only computed on request.
+    """
+
+    STAGES = ('capture', 'preprocess', 'run', 'postprocess', 'handoff')
+
+    def __init__(self, capacity=512, stages=STAGES):
+        self.capacity = capacity
+        self.stages = tuple(stages)
+        self.samples = {stage: [0] * capacity for stage in self.stages}
+        self.counts = {stage: 0 for stage in self.stages}
+        self.errors = {stage: 0 for stage in self.stages}
+        self.dropped = {stage: 0 for stage in self.stages}  # Frames a stage had no room for
+        self.result_times = [0] * capacity
+        self.result_count = 0
+
+    def record(self, stage, duration_ns):
+        count = self.counts[stage]
+        self.samples[stage][count % self.capacity] = duration_ns
+        self.counts[stage] = count + 1
+
+    def record_error(self, stage):
+        self.errors[stage] += 1
+
+    def record_drop(self, stage):
+        self.dropped[stage] += 1
+
+    def record_result(self, timestamp_ns):
+        self.result_times[self.result_count % self.capacity] = timestamp_ns
+        self.result_count += 1
+
+    def reset(self):
+        for stage in self.stages:
+            self.counts[stage] = 0
+            self.errors[stage] = 0
+            self.dropped[stage] = 0
+        self.result_count = 0
+
+    def throughput(self):
+        """Results per second over the buffered window."""
+        count = min(self.result_count, self.capacity)
+        if count < 2:
+            return 0.0
+        newest = self.result_times[(self.result_count - 1) % self.capacity]
+        oldest = self.result_times[(self.result_count - count) % self.capacity]
+        if newest <= oldest:
+            return 0.0
+        return (count - 1) * 1e9 / (newest - oldest)
+
+    def stats(self):
+        """Returns {stage: {count, errors, dropped, mean, p50, p95, p99}} in milliseconds, plus 'throughput'."""
+        result = {}
+        for stage in self.stages:
+            count = min(self.counts[stage], self.capacity)
+            entry = {'count': self.counts[stage], 'errors': self.errors[stage], 'dropped': self.dropped[stage]}
+            if count > 0:
+                ms = numpy.array(self.samples[stage][:count], dtype=numpy.float64) / 1e6
+                p50, p95, p99 = numpy.percentile(ms, [50, 95, 99])
+                entry.update(mean=float(ms.mean()), p50=float(p50), p95=float(p95), p99=float(p99))
+            result[stage] = entry
+        result['throughput'] = self.throughput()
+        return result
+
+    def write_table(self, table):
+        """Write stats to a Table DAT: one row per stage."""
+        stats = self.stats()
+        table.clear()
+        table.appendRow(['stage', 'count', 'errors', 'mean', 'p50', 'p95', 'p99'])
+        for stage in self.stages:
+            entry = stats[stage]
+            table.appendRow([stage, entry['count'], entry['errors']] + [f"{entry.get(k, 0):.3f}" for k in ('mean', 'p50', 'p95', 'p99')])
+        table.appendRow(['throughput', '', '', f"{stats['throughput']:.2f}", '', '', ''])
+
+    def write_chop(self, constantChop):
+        """Write stats to a Constant CHOP: <stage>_p50/_p95/_p99 channels plus throughput."""
+        stats = self.stats()
+        values = []
+        for stage in self.stages:
+            for key in ('p50', 'p95', 'p99'):
+                values.append((f"{stage}_{key}", stats[stage].get(key, 0)))
+        values.append(('throughput', stats['throughput']))
+        for i, (name, value) in enumerate(values):
+            setattr(constantChop.par, f"const{i}name", name)
+            setattr(constantChop.par, f"const{i}value", value)
+
+
+class CaptureScheduler:
+    """
+    Decides when to capture the next frame from recent stage times.
+
+    Stage durations are smoothed with an EMA. The capture interval is the expected
+    time to produce a result (sum of stages, or the slowest stage when pipelined),
+    never shorter than 1 / target_fps. Captures are spaced from the previous slot
+    rather than from "now", so results stay evenly spaced while the worker keeps up.
+
+    With adaptive resolution, the input scale drops by `scale_step` while the
+    expected latency is over budget and recovers once it is under `headroom` of it,
+    at most once every `adapt_every` captures so the averages can settle.
+    """
+
+    STAGES = ('preprocess', 'run', 'postprocess')
+
+    def __init__(self, target_fps=None, latency_budget_ms=None, pipelined=False, adaptive_resolution=False,
+            min_scale=0.5, scale_step=0.85, headroom=0.6, smoothing=0.2, adapt_every=10):
+        self.target_interval_ns = int(1e9 / target_fps) if target_fps else 0
+        self.latency_budget_ns = int(latency_budget_ms * 1e6) if latency_budget_ms else self.target_interval_ns
+        self.pipelined = pipelined
+        self.adaptive_resolution = adaptive_resolution
+        self.min_scale = min_scale
+        self.scale_step = scale_step
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.adapt_every = adapt_every
+        self.stage_ema = {stage: 0.0 for stage in self.STAGES}
+        self.next_capture_ns = 0
+        self.captures_since_adapt = 0
+        self.input_scale = 1.0
+
+    def observe(self, stage, duration_ns):
+        if stage in self.stage_ema:
+            ema = self.stage_ema[stage]
+            self.stage_ema[stage] = duration_ns if ema == 0 else ema + self.smoothing * (duration_ns - ema)
+
+    def expected_latency_ns(self):
+        return sum(self.stage_ema.values())
+
+    def capture_interval_ns(self):
+        if self.pipelined:
+            processing = max(self.stage_ema.values())
+        else:
+            processing = self.expected_latency_ns()
+        return max(processing, self.target_interval_ns)
+
+    def should_capture(self, now_ns):
+        return now_ns >= self.next_capture_ns
+
+    def on_capture(self, now_ns):
+        interval = self.capture_interval_ns()
+        # Keep the cadence from the previous slot unless we've fallen a whole interval behind
+        base = self.next_capture_ns if now_ns - self.next_capture_ns < interval else now_ns
+        self.next_capture_ns = base + interval
+        self.captures_since_adapt += 1
+        if self.adaptive_resolution and self.latency_budget_ns and self.captures_since_adapt >= self.adapt_every:
+            self.adapt_resolution()
+
+    def adapt_resolution(self):
+        latency = self.expected_latency_ns()
+        scale = self.input_scale
+        if latency > self.latency_budget_ns:
+            scale = max(self.min_scale, scale * self.scale_step)
+        elif latency < self.latency_budget_ns * self.headroom:
+            scale = min(1.0, scale / self.scale_step)
+        if scale != self.input_scale:
+            self.input_scale = scale
+            self.captures_since_adapt = 0
+
+
+class MotionGate:
+    """
+    Cheap change detector that lets inference skip frames while the scene is static.
+
+    Each captured frame is sampled into a tiny float32 thumbnail (a strided read of
+    `thumbnail_size` cell centers along the longer side, so a 1080p frame costs a few
+    thousand reads) and compared with the thumbnail of the last frame that was let
+    through: below `threshold` mean absolute difference (in 0-1 units, integer frames
+    are scaled) the frame is gated and the last result stays up. Comparing against the
+    last frame let through, rather than the previous frame, means slow drift still adds
+    up to a run, and `max_stale_ms` forces one anyway once the last result is that old.
+    """
+
+    def __init__(self, threshold=0.01, max_stale_ms=1000, thumbnail_size=32):
+        self.threshold = threshold
+        self.max_stale_ns = int(max_stale_ms * 1e6) if max_stale_ms else 0
+        self.thumbnail_size = thumbnail_size
+        self.thumbnail = None
+        self.reference = None  # Thumbnail of the last frame let through
+        self.has_reference = False
+        self.last_pass_ns = 0
+        self.difference = 0.0  # Last measured mean absolute difference
+        self.passed_count = 0
+        self.gated_count = 0
+
+    def reset(self):
+        """Let the next frame through (e.g. after a reload)."""
+        self.has_reference = False
+
+    def sample(self, nA):
+        """Sample nA's color channels into the preallocated thumbnail."""
+        height, width = nA.shape[:2]
+        step = max(1, max(height, width) // self.thumbnail_size)
+        samples = nA[step // 2::step, step // 2::step, :3] if nA.ndim == 3 else nA[step // 2::step, step // 2::step]
+        if self.thumbnail is None or self.thumbnail.shape != samples.shape:
+            self.thumbnail = numpy.empty(samples.shape, dtype=numpy.float32)
+            self.reference = numpy.empty(samples.shape, dtype=numpy.float32)
+            self.has_reference = False
+        numpy.copyto(self.thumbnail, samples, casting='unsafe')
+        if numpy.issubdtype(nA.dtype, numpy.integer):
+            self.thumbnail *= 1.0 / numpy.iinfo(nA.dtype).max
+        return self.thumbnail
+
+    def should_run(self, nA, now_ns):
+        """True if the frame changed enough (or the last result is too old) to run inference."""
+        thumbnail = self.sample(nA)
+        stale = self.max_stale_ns and now_ns - self.last_pass_ns >= self.max_stale_ns
+        if self.has_reference and not stale:
+            self.difference = float(numpy.abs(thumbnail - self.reference).mean())
+            if self.difference < self.threshold:
+                self.gated_count += 1
+                return False
+        self.thumbnail, self.reference = self.reference, thumbnail
+        self.has_reference = True
+        self.last_pass_ns = now_ns
+        self.passed_count += 1
+        return True
+
+    def stats(self):
+        total = self.passed_count + self.gated_count
+        return {'passed': self.passed_count, 'gated': self.gated_count,
+            'gated_ratio': self.gated_count / total if total else 0.0, 'difference': self.difference}
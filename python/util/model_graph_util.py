@@ -0,0 +1,143 @@
+"""
+ModelGraph: several ONNX models and the NumPy steps between them, run back to back
+on one ONNXInferenceManager worker.
+"""
+
+import time
+import numpy
+
+onnx_util = mod(f'{op.PyUtils}/onnx_util')
+inference_schedule_util = mod(f'{op.PyUtils}/inference_schedule_util')
+
+
+class GraphNode:
+    """One ModelGraph node: an ONNX model or a NumPy step."""
+
+    def __init__(self, name, inputs=None, model_path=None, step=None):
+        self.name = name
+        self.inputs = inputs  # context -> input tensor (model nodes)
+        self.model_path = model_path
+        self.step = step  # context -> any value (step nodes)
+        self.session = None
+        self.input_spec = None
+        self.batched_outputs = True  # Every output has the input's batch on axis 0
+
+
+class ModelGraph:
+    """
+    Several ONNX models, and the NumPy steps between them, run back to back on the
+    inference worker, so a chain like detector -> crop -> keypoints is one hand-off
+    instead of a frame of latency per TOP hop, and crops never leave memory.
+
+    Nodes run in the order they're added and share a context dict: 'input' holds what
+    preprocess() returned, and each node's result is stored under its name (a model's
+    list of outputs, or whatever a step returns); postprocess() receives the context.
+    A model with a fixed batch dim runs a larger batch in slices of that size (the
+    last one zero-padded) and concatenates the outputs, so a batch of crops works with
+    either kind of export. Slicing needs every output to carry the batch on axis 0,
+    which load() checks against the output shapes: a model whose outputs don't (per-batch
+    scalars, batch on another axis) runs one frame at a time instead, its outputs
+    stacked on a new axis 0, and a fixed batch above 1 can't be split at all.
+    Every node is timed into an InferenceTelemetry keyed by node name: stats() and
+    bottleneck() show which model is holding the chain back.
+
+    Example (in an ONNXInferenceManager subclass):
+        def get_model_graph(self):
+            graph = ModelGraph()
+            graph.add_model('detector', detector_path, lambda ctx: ctx['input']['tensor'])
+            graph.add_step('crops', lambda ctx: npu.crop_and_resize(ctx['input']['frame'], boxes_from(ctx['detector']), (192, 192), out=self.crops))
+            graph.add_model('pose', pose_path, lambda ctx: to_nchw(ctx['crops']))
+            return graph
+    """
+
+    def __init__(self, timing_samples=512):
+        self.nodes = []
+        self.timing_samples = timing_samples
+        self.telemetry = inference_schedule_util.InferenceTelemetry(timing_samples, ())
+
+    def add_model(self, name, model_path, inputs=None):
+        """Add an ONNX model. `inputs(context)` returns its input tensor (default: the previous node's result)."""
+        self.nodes.append(GraphNode(name, inputs or self._previous_result(), model_path=model_path))
+        return self
+
+    def add_step(self, name, step):
+        """Add a NumPy step: `step(context)` returns the value stored under `name`."""
+        self.nodes.append(GraphNode(name, step=step))
+        return self
+
+    def _previous_result(self):
+        key = self.nodes[-1].name if self.nodes else 'input'
+        if self.nodes and self.nodes[-1].model_path is not None:
+            return lambda context: context[key][0]
+        return lambda context: context[key]
+
+    @property
+    def model_nodes(self):
+        return [node for node in self.nodes if node.model_path is not None]
+
+    def load(self, load_session):
+        """Create every model's session with `load_session(model_path)` and reset the node timings."""
+        for node in self.model_nodes:
+            node.session = load_session(node.model_path)
+            node.input_spec = onnx_util.InputSpec.from_session(node.session)
+            node.batched_outputs = node.input_spec.outputs_follow_batch(node.session)
+            if not node.batched_outputs:
+                onnx_util.printONNX(f"Graph model '{node.name}': outputs don't carry the batch on axis 0, larger batches run one frame at a time")
+        self.telemetry = inference_schedule_util.InferenceTelemetry(self.timing_samples, [node.name for node in self.nodes])
+
+    def _run_model(self, node, tensor):
+        spec = node.input_spec
+        count = tensor.shape[0]
+        if count == spec.batch_size or (spec.dynamic_batch and (node.batched_outputs or count == 1)):
+            return node.session.run(None, {spec.name: tensor})
+        if not node.batched_outputs:
+            if not spec.dynamic_batch and spec.batch_size != 1:
+                raise ValueError(f"Graph model '{node.name}' has a fixed batch of {spec.batch_size} and outputs without a batch axis, "
+                    f"so a batch of {count} can't be split across runs")
+            # Single-frame runs, outputs stacked on a new batch axis
+            runs = [node.session.run(None, {spec.name: tensor[i:i + 1]}) for i in range(count)]
+            if not runs:
+                return [numpy.zeros([0] + [d if isinstance(d, int) else 0 for d in output.shape], numpy.float32) for output in node.session.get_outputs()]
+            return [numpy.stack(outputs, axis=0) for outputs in zip(*runs)]
+        # Fixed batch size: run it a slice at a time (zero-padding the last) and stitch the outputs back together
+        batch_size = spec.batch_size
+        runs = []
+        for start in range(0, count, batch_size):
+            chunk = tensor[start:start + batch_size]
+            rows = chunk.shape[0]
+            if rows < batch_size:
+                padded = numpy.zeros((batch_size,) + chunk.shape[1:], dtype=chunk.dtype)
+                padded[:rows] = chunk
+                chunk = padded
+            runs.append([output[:rows] for output in node.session.run(None, {spec.name: chunk})])
+        if not runs:
+            return [numpy.zeros([0] + [d if isinstance(d, int) else 0 for d in output.shape[1:]], numpy.float32) for output in node.session.get_outputs()]
+        return [numpy.concatenate(outputs, axis=0) for outputs in zip(*runs)]
+
+    def run(self, graph_input):
+        """Run every node on one input. Returns the context dict."""
+        context = {'input': graph_input}
+        for node in self.nodes:
+            start = time.perf_counter_ns()
+            try:
+                if node.step is not None:
+                    context[node.name] = node.step(context)
+                else:
+                    context[node.name] = self._run_model(node, node.inputs(context))
+            except Exception:
+                self.telemetry.record_error(node.name)
+                raise
+            self.telemetry.record(node.name, time.perf_counter_ns() - start)
+        return context
+
+    def stats(self):
+        """Returns {node: {count, errors, mean, p50, p95, p99}} in milliseconds."""
+        stats = self.telemetry.stats()
+        del stats['throughput']
+        return stats
+
+    def bottleneck(self):
+        """Name of the node with the highest median time, or None before the first run."""
+        stats = self.stats()
+        timed = [name for name, entry in stats.items() if 'p50' in entry]
+        return max(timed, key=lambda name: stats[name]['p50']) if timed else None
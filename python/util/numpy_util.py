@@ -1,6 +1,14 @@
+import os
+import json
 import numpy
-import mediapipe as mp
 import cv2
+try:
+    import mediapipe as mp
+except ImportError:
+    mp = None  # Only needed by na_to_mediapipe_image(); keeps the rest usable headless
+
+IMAGENET_MEAN = numpy.array([0.485, 0.456, 0.406], dtype=numpy.float32)
+IMAGENET_STD = numpy.array([0.229, 0.224, 0.225], dtype=numpy.float32)
 
 def flip_v(nA):
     return cv2.flip(nA, 0)
@@ -31,13 +39,248 @@ def denormalize_td_image(nA):
         return (nA * 255).astype(numpy.uint8)
     return nA
 
+# Range-aware variants of normalize_td_image / denormalize_td_image.
+# The source range (the value that maps to 1.0) comes from, in order: the declared
+# `src_range`, the cached decision for `key` (e.g. the input TOP's path), the dtype
+# for integer data, and only then a one-time max() scan that is cached under `key`.
+# Normalize and denormalize cache separately, so one key can be used for both directions.
+# Conversion is a single multiply into a new array, or into `out` (which may be `nA` itself).
+
+RANGE_UNIT = 1.0
+RANGE_BYTE = 255.0
+source_ranges = {}  # (direction, key) -> source range, decided once per input operator
+
+def source_range(nA, src_range=None, key=None, direction='normalize'):
+    cache_key = (direction, key)
+    if src_range is not None:
+        if key is not None:
+            source_ranges[cache_key] = src_range
+        return src_range
+    if key is not None and cache_key in source_ranges:
+        return source_ranges[cache_key]
+    if numpy.issubdtype(nA.dtype, numpy.integer):
+        src_range = float(numpy.iinfo(nA.dtype).max)
+    else:
+        src_range = RANGE_BYTE if nA.max() > 1.0 else RANGE_UNIT
+    if key is not None:
+        source_ranges[cache_key] = src_range
+    return src_range
+
+def clear_source_ranges(key=None):
+    if key is None:
+        source_ranges.clear()
+    else:
+        for direction in ('normalize', 'denormalize'):
+            source_ranges.pop((direction, key), None)
+
+def normalize_range(nA, src_range=None, key=None, out=None):
+    """Return float32 data in 0-1, written into `out` when given (pass `out=nA` to scale in place)."""
+    src_range = source_range(nA, src_range, key, 'normalize')
+    if out is None:
+        if nA.dtype == numpy.float32 and src_range == RANGE_UNIT:
+            return nA
+        out = numpy.empty(nA.shape, dtype=numpy.float32)
+    if src_range == RANGE_UNIT:
+        numpy.copyto(out, nA, casting='unsafe')
+        return out
+    return numpy.multiply(nA, numpy.float32(1.0 / src_range), out=out, casting='unsafe')
+
+def denormalize_range(nA, src_range=None, key=None, out=None):
+    """Return uint8 data in 0-255, written into `out` when given."""
+    src_range = source_range(nA, src_range, key, 'denormalize')
+    if nA.dtype == numpy.uint8 and src_range == RANGE_BYTE and out is None:
+        return nA
+    if out is None:
+        out = numpy.empty(nA.shape, dtype=numpy.uint8)
+    return numpy.multiply(nA, numpy.float32(RANGE_BYTE / src_range), out=out, casting='unsafe')
+
 def ensure_dtype(nA, dtype=numpy.uint8):
     if nA.dtype != dtype:
         return nA.astype(dtype)
     return nA
 
-def resize_image(nA, width, height):
-    return cv2.resize(nA, (width, height))
+def resize_image(nA, width, height, out=None):
+    """Resize with cv2, into `out` (height, width, channels) when given so steady-state calls don't allocate."""
+    return cv2.resize(nA, (width, height), dst=out)
+
+class LetterboxTransform:
+    """
+    Maps coordinates between a letterboxed model input and the source frame.
+
+    Model space is pixels (or 0-1 with `normalized=True`) of the padded model input.
+    Source space is pixels of the frame in the orientation the model saw it (upright
+    when the letterbox flipped TD's bottom-up rows). UV space is TD texture UV with a
+    bottom-left origin. Points are (..., 2) arrays in (x, y) order, or (y, x) with
+    `yx=True` as MoveNet outputs them; boxes are (..., 4) arrays of (x1, y1, x2, y2).
+    """
+
+    def __init__(self, src_width, src_height, dst_width, dst_height, scale, pad_x, pad_y, flip_v):
+        self.src_width = src_width
+        self.src_height = src_height
+        self.dst_width = dst_width
+        self.dst_height = dst_height
+        self.scale = scale
+        self.pad_x = pad_x
+        self.pad_y = pad_y
+        self.flip_v = flip_v
+
+    def to_source(self, points, normalized=False, yx=False, out=None):
+        points = numpy.asarray(points, dtype=numpy.float32)
+        out = numpy.array(points, copy=True) if out is None else out
+        xi, yi = (1, 0) if yx else (0, 1)
+        x = out[..., xi]
+        y = out[..., yi]
+        if normalized:
+            numpy.multiply(points[..., xi], self.dst_width, out=x)
+            numpy.multiply(points[..., yi], self.dst_height, out=y)
+        else:
+            numpy.copyto(x, points[..., xi])
+            numpy.copyto(y, points[..., yi])
+        numpy.subtract(x, self.pad_x, out=x)
+        numpy.subtract(y, self.pad_y, out=y)
+        numpy.multiply(x, 1.0 / self.scale, out=x)
+        numpy.multiply(y, 1.0 / self.scale, out=y)
+        return out
+
+    def to_uv(self, points, normalized=False, yx=False, out=None):
+        out = self.to_source(points, normalized, yx, out)
+        xi, yi = (1, 0) if yx else (0, 1)
+        x = out[..., xi]
+        y = out[..., yi]
+        numpy.multiply(x, 1.0 / self.src_width, out=x)
+        numpy.multiply(y, 1.0 / self.src_height, out=y)
+        if self.flip_v:
+            # The model saw an upright image, TD UVs start at the bottom
+            numpy.subtract(1.0, y, out=y)
+        return out
+
+    def boxes_to_source(self, boxes, normalized=False, yx=False, out=None):
+        boxes = numpy.asarray(boxes, dtype=numpy.float32)
+        corners = self.to_source(boxes.reshape(boxes.shape[:-1] + (2, 2)), normalized, yx)
+        out = numpy.empty(boxes.shape, dtype=numpy.float32) if out is None else out
+        out[...] = corners.reshape(boxes.shape)
+        return out
+
+    def boxes_to_uv(self, boxes, normalized=False, yx=False, out=None):
+        boxes = numpy.asarray(boxes, dtype=numpy.float32)
+        corners = self.to_uv(boxes.reshape(boxes.shape[:-1] + (2, 2)), normalized, yx)
+        out = numpy.empty(boxes.shape, dtype=numpy.float32) if out is None else out
+        out[...] = corners.reshape(boxes.shape)
+        if self.flip_v:
+            # Keep y1 < y2 after the flip
+            yi = 0 if yx else 1
+            low = numpy.minimum(out[..., yi], out[..., yi + 2])
+            numpy.maximum(out[..., yi], out[..., yi + 2], out=out[..., yi + 2])
+            out[..., yi] = low
+        return out
+
+
+class Letterbox:
+    """
+    Aspect-preserving resize into a reusable padded buffer.
+
+    The padding is filled once when the buffer is allocated; each frame is one
+    cv2.resize straight into the centered region, plus an in-place flip of that
+    (model-sized) region when `flip_v` is set, which replaces a separate flip_v()
+    of the full TD frame.
+
+    Example:
+        letterbox = npu.Letterbox(256, 256, flip_v=True)
+        padded, transform = letterbox(nA)
+        keypoints_uv = transform.to_uv(keypoints_yx, normalized=True, yx=True)
+
+    Returned buffers rotate through `num_buffers`, like PreprocessPlan.
+    """
+
+    def __init__(self, width, height, flip_v=False, pad_value=0, interpolation=cv2.INTER_LINEAR, num_buffers=2):
+        self.width = width
+        self.height = height
+        self.flip_v = flip_v
+        self.pad_value = pad_value
+        self.interpolation = interpolation
+        self.num_buffers = max(1, num_buffers)
+        self.input_key = None
+        self.buffers = []
+        self.regions = []  # Centered resize target inside each buffer
+        self.buffer_index = 0
+        self.transform = None
+
+    def compile(self, nA):
+        src_h, src_w = nA.shape[:2]
+        scale = min(self.width / src_w, self.height / src_h)
+        new_w = max(1, int(round(src_w * scale)))
+        new_h = max(1, int(round(src_h * scale)))
+        pad_x = (self.width - new_w) // 2
+        pad_y = (self.height - new_h) // 2
+        self.transform = LetterboxTransform(src_w, src_h, self.width, self.height, scale, pad_x, pad_y, self.flip_v)
+        self.buffers = [numpy.full((self.height, self.width) + nA.shape[2:], self.pad_value, dtype=nA.dtype)
+                        for _ in range(self.num_buffers)]
+        self.regions = [buffer[pad_y:pad_y + new_h, pad_x:pad_x + new_w] for buffer in self.buffers]
+        self.buffer_index = 0
+        self.input_key = (nA.shape, nA.dtype)
+
+    def __call__(self, nA):
+        return self.run(nA)
+
+    def run(self, nA):
+        """Returns (padded buffer, LetterboxTransform)."""
+        if self.input_key != (nA.shape, nA.dtype):
+            self.compile(nA)
+        buffer = self.buffers[self.buffer_index]
+        region = self.regions[self.buffer_index]
+        self.buffer_index = (self.buffer_index + 1) % self.num_buffers
+        cv2.resize(nA, (region.shape[1], region.shape[0]), dst=region, interpolation=self.interpolation)
+        if self.flip_v:
+            cv2.flip(region, 0, dst=region)
+        return buffer, self.transform
+
+def letterbox_resize(nA, width, height, flip_v=False, pad_value=0):
+    """One-off letterbox; use a Letterbox instance per stream to reuse its buffer."""
+    return Letterbox(width, height, flip_v, pad_value, num_buffers=1).run(nA)
+
+def crop_and_resize(nA, boxes, size, normalized=True, extrapolation_value=0, interpolation=cv2.INTER_LINEAR, out=None):
+    """
+    Crop every box out of one image and resize them all to `size` (width, height) into
+    one (N, height, width, C) batch, like tf.image.crop_and_resize: boxes can have
+    sub-pixel edges and reach outside the image. Useful for feeding detector boxes into
+    a second-stage model as a single batch.
+
+    Each crop is one cv2.warpAffine straight into its slot of the batch, which measured
+    several times faster than a vectorized NumPy bilinear gather over all boxes.
+
+    Args:
+        nA: (H, W) or (H, W, C) image
+        boxes: (N, 4) boxes as (x1, y1, x2, y2), 0-1 with `normalized`, otherwise pixels,
+            in the image's own row order
+        extrapolation_value: Fill for samples that fall outside the image
+        out: Optional (N, height, width, C) output in the image's dtype to reuse
+
+    Returns:
+        (N, height, width, C) crops in the image's dtype (or `out`)
+    """
+    image = nA if nA.ndim == 3 else nA[:, :, None]
+    in_h, in_w, channels = image.shape
+    width, height = size
+    boxes = numpy.asarray(boxes, dtype=numpy.float32).reshape(-1, 4)
+    if normalized:
+        boxes = boxes * numpy.array([in_w, in_h, in_w, in_h], dtype=numpy.float32)
+    if out is None:
+        out = numpy.empty((len(boxes), height, width, channels), dtype=image.dtype)
+    src = image if channels > 1 else image[:, :, 0]
+
+    # Output pixel centers map to box-relative source positions (pixel centers at +0.5)
+    matrix = numpy.zeros((2, 3), dtype=numpy.float32)
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        scale_x = (x2 - x1) / width
+        scale_y = (y2 - y1) / height
+        matrix[0, 0] = scale_x
+        matrix[0, 2] = x1 + 0.5 * scale_x - 0.5
+        matrix[1, 1] = scale_y
+        matrix[1, 2] = y1 + 0.5 * scale_y - 0.5
+        dst = out[i] if channels > 1 else out[i, :, :, 0]
+        cv2.warpAffine(src, matrix, (width, height), dst=dst, flags=interpolation | cv2.WARP_INVERSE_MAP,
+                       borderMode=cv2.BORDER_CONSTANT, borderValue=(extrapolation_value,) * 4)
+    return out
 
 def na_to_mediapipe_image(nA, width=None, height=None):
     return mp.Image(image_format=mp.ImageFormat.SRGB, data=nA)
@@ -58,6 +301,220 @@ def imagenet_normalize(nA):
     """Apply ImageNet normalization: (x / 255 - mean) / std.
     Assumes input is 0-255 range uint8 or float32."""
     nA = nA.astype(numpy.float32)
-    mean = numpy.array([0.485, 0.456, 0.406], dtype=numpy.float32)
-    std = numpy.array([0.229, 0.224, 0.225], dtype=numpy.float32)
-    return (nA / 255.0 - mean) / std
\ No newline at end of file
+    return (nA / 255.0 - IMAGENET_MEAN) / IMAGENET_STD
+
+
+class PreprocessPlan:
+    """
+    Compiled preprocessing pipeline that replaces chained numpy_util calls
+    (flip_v -> rgba_to_rgb -> resize_image -> imagenet_normalize -> add_batch_dimension).
+
+    The spec is fixed up front, so scratch buffers are allocated once per input
+    shape and every step writes into them with `dst=` / `out=`:
+    - resize runs first on the full frame, into a preallocated buffer
+    - flip, channel drop and HWC->NCHW are free views of that buffer
+    - dtype conversion and the scale step happen in one multiply into the output
+    - mean/std become one precomputed subtract: (x * scale - mean) / std == x * a - b
+
+    Example:
+        plan = npu.PreprocessPlan(size=(256, 256), flip_v=True, channels=3,
+                                  scale=1 / 255, mean=npu.IMAGENET_MEAN, std=npu.IMAGENET_STD,
+                                  layout='NCHW')
+        input_tensor = plan(nA)
+
+    Returned tensors are reused: `num_buffers` outputs rotate, so hold on to at most
+    `num_buffers - 1` results at a time (e.g. frames queued in a pipeline).
+    """
+
+    def __init__(self, size=None, flip_v=False, channels=None, dtype=numpy.float32,
+                 scale=1.0, mean=None, std=None, layout='NHWC', batch=True,
+                 interpolation=cv2.INTER_LINEAR, num_buffers=2):
+        if layout not in ('NHWC', 'NCHW'):
+            raise ValueError(f"Unknown layout: {layout}")
+        self.size = size  # (width, height), like cv2.resize
+        self.flip_v = flip_v
+        self.channels = channels
+        self.dtype = numpy.dtype(dtype)
+        self.scale = scale
+        self.mean = mean
+        self.std = std
+        self.layout = layout
+        self.batch = batch
+        self.interpolation = interpolation
+        self.num_buffers = max(1, num_buffers)
+        self.input_key = None
+        self.resize_buffer = None
+        self.output_buffers = []
+        self.output_index = 0
+        self.multiplier = None
+        self.offset = None
+        self.has_multiplier = False
+        self.has_offset = False
+
+    def compile(self, nA):
+        """Allocate scratch/output buffers and per-channel constants for this input shape."""
+        in_h, in_w = nA.shape[:2]
+        in_c = nA.shape[2] if nA.ndim == 3 else 1
+        out_w, out_h = self.size if self.size else (in_w, in_h)
+        out_c = min(self.channels or in_c, in_c)
+
+        self.resize_buffer = None
+        if (out_w, out_h) != (in_w, in_h):
+            self.resize_buffer = numpy.empty((out_h, out_w) + nA.shape[2:], dtype=nA.dtype)
+
+        shape = (out_c, out_h, out_w) if self.layout == 'NCHW' else (out_h, out_w, out_c)
+        if self.batch:
+            shape = (1,) + shape
+        self.output_buffers = [numpy.empty(shape, dtype=self.dtype) for _ in range(self.num_buffers)]
+        self.output_index = 0
+
+        # Fold scale, mean and std into a single multiply + subtract per channel (in HWC order)
+        mean = numpy.zeros(out_c, dtype=numpy.float32) if self.mean is None else numpy.asarray(self.mean, dtype=numpy.float32)[:out_c]
+        std = numpy.ones(out_c, dtype=numpy.float32) if self.std is None else numpy.asarray(self.std, dtype=numpy.float32)[:out_c]
+        self.multiplier = (numpy.float32(self.scale) / std).astype(numpy.float32)
+        self.offset = (mean / std).astype(numpy.float32)
+        self.has_offset = bool(numpy.any(self.offset))
+        self.has_multiplier = not numpy.all(self.multiplier == 1)
+        self.input_key = (nA.shape, nA.dtype)
+
+    def __call__(self, nA):
+        return self.run(nA)
+
+    def run(self, nA):
+        if self.input_key != (nA.shape, nA.dtype):
+            self.compile(nA)
+
+        src = nA
+        if self.resize_buffer is not None:
+            out_h, out_w = self.resize_buffer.shape[:2]
+            src = cv2.resize(nA, (out_w, out_h), dst=self.resize_buffer, interpolation=self.interpolation)
+        if src.ndim == 2:
+            src = src[:, :, None]
+
+        # Free views: channel drop and vertical flip
+        out_c = self.multiplier.shape[0]
+        src = src[:, :, :out_c]
+        if self.flip_v:
+            src = src[::-1]
+
+        output = self.output_buffers[self.output_index]
+        self.output_index = (self.output_index + 1) % self.num_buffers
+
+        # View the output as HWC so one ufunc call does layout, dtype and scale together
+        dst = output[0] if self.batch else output
+        if self.layout == 'NCHW':
+            dst = dst.transpose(1, 2, 0)
+
+        if self.has_multiplier:
+            numpy.multiply(src, self.multiplier, out=dst, casting='unsafe')
+        else:
+            numpy.copyto(dst, src, casting='unsafe')
+        if self.has_offset:
+            numpy.subtract(dst, self.offset, out=dst, casting='unsafe')
+        return output
+
+
+# Raw frame files: replayable captures with zero decoding cost.
+# Layout: an 8-byte magic, a little-endian uint32 header length and a JSON header
+# ({shape, dtype, fps, count, metadata}), space-padded so the frames start on a
+# FRAME_FILE_ALIGNMENT boundary, then every frame's bytes back to back (C order).
+# read_frames() maps the frames as one (count, *shape) np.memmap, so replaying a
+# capture is just indexing into the page cache.
+
+FRAME_FILE_MAGIC = b'HAXFRAME'
+FRAME_FILE_ALIGNMENT = 4096
+FRAME_FILE_VERSION = 1
+
+class FrameFileWriter:
+    """
+    Append same-shaped frames to a raw frame file. The frame count is written into the
+    header on close(); a file that was never closed is still readable (its count is
+    taken from the file size).
+
+    Example:
+        with npu.FrameFileWriter('capture.frames', nA.shape, nA.dtype, fps=60) as writer:
+            writer.write(nA)  # every cook
+    """
+
+    def __init__(self, path, shape, dtype=numpy.float32, fps=60.0, metadata=None):
+        self.path = path
+        self.shape = tuple(int(d) for d in shape)
+        self.dtype = numpy.dtype(dtype)
+        self.fps = float(fps)
+        self.metadata = metadata or {}
+        self.count = 0
+        self.data_offset = None
+        self.file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        header = json.dumps({'version': FRAME_FILE_VERSION, 'shape': self.shape, 'dtype': self.dtype.str,
+                             'fps': self.fps, 'count': self.count, 'metadata': self.metadata}).encode('utf-8')
+        prefix = len(FRAME_FILE_MAGIC) + 4
+        if self.data_offset is None:
+            # Leave room for the count's digits to grow without moving the frames
+            self.data_offset = -(-(prefix + len(header) + 32) // FRAME_FILE_ALIGNMENT) * FRAME_FILE_ALIGNMENT
+        header = header.ljust(self.data_offset - prefix)
+        self.file.seek(0)
+        self.file.write(FRAME_FILE_MAGIC + numpy.uint32(len(header)).astype('<u4').tobytes() + header)
+
+    def write(self, nA):
+        """Append one frame (cast to the file's dtype if needed)."""
+        if nA.shape != self.shape:
+            raise ValueError(f"Frame shape {nA.shape} doesn't match the file's {self.shape}")
+        frame = numpy.ascontiguousarray(nA, dtype=self.dtype)
+        self.file.write(memoryview(frame).cast('B'))
+        self.count += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._write_header()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def write_frames(path, frames, fps=60.0, metadata=None):
+    """Write a sequence of same-shaped frames to a raw frame file. Returns the frame count."""
+    writer = None
+    try:
+        for nA in frames:
+            if writer is None:
+                writer = FrameFileWriter(path, nA.shape, nA.dtype, fps, metadata)
+            writer.write(nA)
+    finally:
+        if writer is not None:
+            writer.close()
+    return writer.count if writer is not None else 0
+
+def read_frame_header(path):
+    """Returns (header dict, data offset) of a raw frame file."""
+    with open(path, 'rb') as file:
+        prefix = file.read(len(FRAME_FILE_MAGIC) + 4)
+        if prefix[:len(FRAME_FILE_MAGIC)] != FRAME_FILE_MAGIC:
+            raise ValueError(f"Not a raw frame file: {path}")
+        header_length = int(numpy.frombuffer(prefix[len(FRAME_FILE_MAGIC):], dtype='<u4')[0])
+        header = json.loads(file.read(header_length).decode('utf-8'))
+    return header, len(prefix) + header_length
+
+def read_frames(path, mode='r'):
+    """
+    Map a raw frame file. Returns (frames, header): frames is a (count, *shape)
+    np.memmap (read-only unless `mode` is 'r+'), header holds fps and metadata.
+    """
+    header, data_offset = read_frame_header(path)
+    shape = tuple(header['shape'])
+    dtype = numpy.dtype(header['dtype'])
+    frame_bytes = int(numpy.prod(shape)) * dtype.itemsize
+    # The count is only final once the writer closed; otherwise trust the frames on disk
+    count = (os.path.getsize(path) - data_offset) // frame_bytes if frame_bytes else 0
+    if header['count'] and header['count'] <= count:
+        count = header['count']
+    if count == 0:
+        return numpy.empty((0,) + shape, dtype=dtype), header
+    frames = numpy.memmap(path, dtype=dtype, mode=mode, offset=data_offset, shape=(count,) + shape)
+    return frames, header
@@ -3,6 +3,8 @@ ONNXInferenceManager - Base class for TouchDesigner ONNX model inference with th
 
 This class encapsulates all the common patterns for loading and running ONNX models
 in TouchDesigner with threaded inference to avoid blocking the main render loop.
+A long-lived worker is started when the model loads; captured frames are copied once
+into a FrameRing slot that it reads in place, and results come back double-buffered.
 
 Usage:
     Create a subclass and implement:
@@ -13,9 +15,19 @@ Usage:
     Optional overrides:
     - get_session_options(): Customize ONNX session options
     - on_model_loaded(session): Called after model loads successfully
+    - get_model_graph(): Chain several models in one worker (see model_graph_util)
+    - on_result(result, info): Receive results with RESULT_DELIVERY = DELIVERY_CALLBACK
+
+    Modes and tuning are class attributes, documented where they're declared:
+    PIPELINED, USE_IO_BINDING, BATCHED, USE_PROCESS_WORKER (see onnx_process_worker),
+    TARGET_FPS / LATENCY_BUDGET_MS, MOTION_GATE, RESULT_DELIVERY, TELEMETRY, INPUT_SIZES,
+    USE_MODEL_VARIANTS and the session cache / warm-up settings. The helper classes live
+    in frame_ring_util, inference_schedule_util and model_graph_util.
 """
 
 import os
+import sys
+import time
 import threading
 import numpy as np
 import onnxruntime as ort
@@ -24,26 +36,191 @@ import math
 # Import util modules (will be available in TouchDesigner context)
 onnx_util = mod(f'{op.PyUtils}/onnx_util')
 npu = mod(f'{op.PyUtils}/numpy_util')
+onnx_process_worker = mod(f'{op.PyUtils}/onnx_process_worker')
+frame_ring_util = mod(f'{op.PyUtils}/frame_ring_util')
+inference_schedule_util = mod(f'{op.PyUtils}/inference_schedule_util')
+model_graph_util = mod(f'{op.PyUtils}/model_graph_util')
+
+# Helper classes, importable from this module as before
+StageQueue = frame_ring_util.StageQueue
+FrameRef = frame_ring_util.FrameRef
+FrameRing = frame_ring_util.FrameRing
+SharedFrameRing = frame_ring_util.SharedFrameRing
+InferenceTelemetry = inference_schedule_util.InferenceTelemetry
+CaptureScheduler = inference_schedule_util.CaptureScheduler
+MotionGate = inference_schedule_util.MotionGate
+GraphNode = model_graph_util.GraphNode
+ModelGraph = model_graph_util.ModelGraph
+
+
+class ResultInfo:
+	"""
+	Metadata published with each result: the id of the frame it came from and when
+	that frame was captured, its result published and then delivered (perf_counter_ns).
+	Delivery is onCook outputting the result, or on_result() in callback mode.
+	"""
+	
+	__slots__ = ('frame_id', 'capture_ns', 'publish_ns', 'deliver_ns')
+	
+	def __init__(self, frame_id, capture_ns, publish_ns):
+		self.frame_id = frame_id
+		self.capture_ns = capture_ns
+		self.publish_ns = publish_ns
+		self.deliver_ns = 0
+	
+	@property
+	def latency_ms(self):
+		"""Capture-to-display latency in ms, or None until delivered."""
+		if not self.deliver_ns:
+			return None
+		return (self.deliver_ns - self.capture_ns) / 1e6
+	
+	def as_dict(self):
+		return {'frame_id': self.frame_id, 'capture_ns': self.capture_ns, 'publish_ns': self.publish_ns,
+			'deliver_ns': self.deliver_ns, 'latency_ms': self.latency_ms}
+
+
+class BatchClient:
+	"""Per-operator state for batched mode: the waiting frame and its double-buffered result."""
+	
+	def __init__(self, path):
+		self.path = path
+		self.frame = None  # Latest captured frame waiting for the next batch
+		self.frame_ref = None  # FrameRef (id and capture time) of that frame
+		self.pending_result = None
+		self.pending_result_ns = 0  # perf_counter_ns when the result was published
+		self.pending_info = None  # ResultInfo of pending_result
+		self.result_info = None  # ResultInfo of the last delivered result
+		self.delivery_scheduled = False  # A run() delivery is queued on the main thread
+		self.script_op = None
+		self.motion_gate = None  # MotionGate for this operator's frames when MOTION_GATE is set
+		self.output_buffers = [None, None]
+		self.back_buffer_index = 0
+		self.callback_buffer = None
+		self.frames_skipped = 0
+		self.missed_batches = 0  # Consecutive batches run without a frame from this client
 
 
 class ONNXInferenceManager:
 	"""Base class for managing ONNX model loading and threaded inference in TouchDesigner."""
 	
+	# Pipelined mode (override in subclasses)
+	PIPELINED = False  # Overlap preprocess / session.run / postprocess across frames
+	PIPELINE_DEPTH = 1  # Max frames waiting in front of each stage
+	PIPELINE_DROP_POLICY = StageQueue.POLICY_NEWEST  # or StageQueue.POLICY_FIFO
+	
+	# IOBinding mode (override in subclasses)
+	USE_IO_BINDING = False  # Reuse preallocated input/output buffers across runs (a win on GPU providers, not CPU)
+	
+	# Session loading (override in subclasses)
+	USE_SESSION_CACHE = True  # Share sessions process-wide across reloads and managers
+	PERSIST_OPTIMIZED_MODEL = True  # Save ORT's optimized graph beside the model
+	WARMUP_RUNS = 3  # Dummy inferences before the session is published
+	TUNE_SESSION_OPTIONS = False  # Sweep threads / execution mode / optimization level if untuned
+	
+	# Input size (override in subclasses)
+	INPUT_SIZES = None  # Allowed (width, height) sizes (or ints for squares) for models with a dynamic input size
+	INPUT_SIZE_BUDGET_MS = None  # session.run budget when picking from INPUT_SIZES (default: LATENCY_BUDGET_MS or 1 frame at TARGET_FPS / 60fps)
+	
+	# Model variants (override in subclasses)
+	USE_MODEL_VARIANTS = False  # Load the fastest int8/fp16 sibling of the model that stays accurate
+	MAKE_MODEL_VARIANTS = False  # Generate missing int8/fp16 siblings first (needs `onnx`)
+	MODEL_VARIANT_TOLERANCE = 0.05  # Max output error, relative to the fp32 output's peak magnitude
+	
+	# Batched mode (override in subclasses)
+	BATCHED = False  # Share one session.run between several Script TOPs
+	BATCH_SIZE = 4  # Batch size for models with a dynamic batch dimension
+	BATCH_DEADLINE_MS = 8  # How long to wait for the remaining clients before padding
+	BATCH_IDLE_AFTER = 3  # Stop waiting for a client once it has missed this many batches in a row
+	
+	# Telemetry (override in subclasses)
+	TELEMETRY = False  # Record per-stage latency into an InferenceTelemetry ring buffer
+	TELEMETRY_SAMPLES = 512  # Ring buffer size per stage
+	TELEMETRY_WRITE_FRAMES = 30  # How often (in results) to write stats to self.opTelemetry
+	
+	# Adaptive scheduling (override in subclasses; ignored in batched mode)
+	TARGET_FPS = None  # Evenly spaced result rate to aim for
+	LATENCY_BUDGET_MS = None  # Capture-to-result budget (defaults to 1 / TARGET_FPS)
+	ADAPTIVE_RESOLUTION = False  # Scale the input down while the budget is blown (dynamic-size inputs only)
+	MIN_INPUT_SCALE = 0.5
+	INPUT_SCALE_MULTIPLE = 32  # Scaled input sizes snap down to multiples of this
+	
+	# Motion gating (override in subclasses)
+	MOTION_GATE = False  # Skip inference while the input is static, keeping the last result up
+	MOTION_THRESHOLD = 0.01  # Mean absolute thumbnail difference (0-1 values) that counts as motion
+	MOTION_MAX_STALE_MS = 1000  # Run anyway once the last result is this old (None: never)
+	MOTION_THUMBNAIL_SIZE = 32  # Thumbnail samples along the frame's longer side
+	
+	# Result delivery (override in subclasses)
+	DELIVERY_POLL = None  # onCook picks up results on its next cook
+	DELIVERY_COOK = 'cook'  # The worker force-cooks the Script TOP via run() as soon as a result lands
+	DELIVERY_CALLBACK = 'callback'  # The worker calls on_result() on the main thread via run()
+	RESULT_DELIVERY = DELIVERY_POLL
+	
+	# Process backend (override in subclasses; serial only)
+	USE_PROCESS_WORKER = False  # Run preprocess / session.run / postprocess in a worker process
+	PROCESS_WORKER_CLASS = None  # 'path/to/file.py:ClassName' for the worker (default: where the subclass is defined)
+	PROCESS_UTIL_PATH = None  # Folder of util .py files (default: beside onnx_util, or project.folder/python/util)
+	PROCESS_PYTHON_EXECUTABLE = None  # Worker interpreter (default: python beside sys.executable)
+	PROCESS_START_TIMEOUT = 120  # Seconds to wait for the worker to load the model
+	
 	def __init__(self):
+		if self.USE_PROCESS_WORKER and (self.PIPELINED or self.BATCHED):
+			raise ValueError("USE_PROCESS_WORKER can't be combined with PIPELINED or BATCHED")
+		
 		# Threaded model-loading state
 		self.loading_thread = None
 		self.is_loading = False
 		self.load_error = None
 		
 		# Threaded inference state
-		self.inference_thread = None
+		self.inference_thread = None  # Persistent worker, lives as long as the session
+		self.input_mailbox = None  # Single-slot StageQueue feeding the worker
 		self.is_inferencing = False
 		self.inference_lock = threading.Lock()
 		self.pending_result = None  # Results from background thread
-		self.input_tensor_cache = None  # Pre-processed input for thread
+		self.pending_result_ns = 0  # perf_counter_ns when pending_result was published
+		self.pending_info = None  # ResultInfo of pending_result
+		self.result_info = None  # ResultInfo of the last delivered result
+		self.delivery_scheduled = False  # A run() delivery is queued on the main thread
+		self.script_op = None  # Script TOP of the latest cook, force-cooked by DELIVERY_COOK
+		self.delivery_cook = False  # True while _deliver_result's forced cook runs
+		self.output_buffers = [None, None]  # Double-buffered float32 results
+		self.back_buffer_index = 0  # Buffer the worker writes into next
+		self.callback_buffer = None  # Copy of a result handed to on_result() outside the lock
+		self.io_binding_runner = None  # onnx_util.IOBindingRunner when USE_IO_BINDING is set
+		self.frame_ring = None  # FrameRing of captured frames, shared by onCook and the worker(s)
+		self.process_client = None  # onnx_process_worker.ProcessWorkerClient when USE_PROCESS_WORKER is set
+		
+		# Batched inference state
+		self.batch_clients = {}  # scriptOp.path -> BatchClient
+		self.batch_cond = threading.Condition(self.inference_lock)
+		self.batch_thread = None
+		self.batch_stopped = True
+		self.batch_input = None  # Preallocated stacked input tensor
+		self.batch_sequence = 0  # Frame ids for batched captures
+		self.model_details = None  # From onnx_util.InputSpec.details()
+		self.input_spec = None  # onnx_util.InputSpec of the model's first input
+		self.preprocess_plans = {}  # (width, height) -> numpy_util.PreprocessPlan
+		self.worker_input_scale = None  # Scale sent by the parent, in the process backend's worker
+		self.input_scale_ignored = False  # Logged that a static input can't be scaled
+		
+		# Telemetry
+		self.telemetry = InferenceTelemetry(self.TELEMETRY_SAMPLES) if self.TELEMETRY else None
+		
+		# Adaptive capture scheduling
+		self.scheduler = None
+		if self.TARGET_FPS or self.LATENCY_BUDGET_MS:
+			self.scheduler = CaptureScheduler(self.TARGET_FPS, self.LATENCY_BUDGET_MS, self.PIPELINED,
+				self.ADAPTIVE_RESOLUTION, self.MIN_INPUT_SCALE)
+		self.motion_gate = self.make_motion_gate() if self.MOTION_GATE else None
 		self.frames_skipped = 0  # Track how many frames we've skipped
 		self.frames_skipped_final = 0  # Final count of skipped frames to report
 		
+		# Pipelined inference state
+		self.pipeline_queues = []  # [capture -> preprocess, preprocess -> run, run -> postprocess]
+		self.pipeline_threads = []
+		
 		# ONNX setup
 		ort.preload_dlls(directory="")
 		self.session = None  # ONNX session
@@ -91,12 +268,28 @@ class ONNXInferenceManager:
 		"""
 		raise NotImplementedError("Subclass must implement postprocess()")
 	
+	def get_model_graph(self):
+		"""
+		Override to return a ModelGraph instead of running a single model. Its models are
+		loaded in place of get_model_path(), preprocess() output becomes the graph's
+		'input', and postprocess() receives the graph's context dict.
+		"""
+		return None
+	
+	def get_graph_session_options(self, model_path):
+		"""Session options for one of the graph's models (default: tuned for that model, as in get_session_options)."""
+		return self.onnx_util.tuned_session_options(model_path, self.onnx_util.providers(), tune=self.TUNE_SESSION_OPTIONS)
+	
 	def get_session_options(self):
 		"""
 		Override to customize ONNX session options.
-		Returns None by default.
+		By default, returns the options tuned for this model on this machine (see
+		onnx_util.tuned_session_options), sweeping them first when TUNE_SESSION_OPTIONS
+		is set, or None (ORT defaults) when the model hasn't been tuned here.
 		"""
-		return None
+		if not self.onnx_util:
+			return None
+		return self.onnx_util.tuned_session_options(self.get_model_path(), self.onnx_util.providers(), tune=self.TUNE_SESSION_OPTIONS)
 	
 	def on_model_loaded(self, session):
 		"""
@@ -105,6 +298,97 @@ class ONNXInferenceManager:
 		"""
 		pass
 	
+	def on_result(self, result, info):
+		"""
+		Called on the main thread as soon as a result lands when RESULT_DELIVERY is
+		DELIVERY_CALLBACK, with its ResultInfo. `result` is a copy that is reused by the
+		next callback, so copy out what you keep; the Script TOP still outputs it on its
+		next cook. inference_lock isn't held, so cooking the Script TOP from here is fine.
+		"""
+		pass
+	
+	def get_process_worker_class(self):
+		"""
+		'path/to/file.py:ClassName' the worker process loads: PROCESS_WORKER_CLASS, or the
+		file this subclass was defined in. Set PROCESS_WORKER_CLASS for subclasses that
+		live in a DAT without a synced file.
+		"""
+		if self.PROCESS_WORKER_CLASS:
+			return self.PROCESS_WORKER_CLASS
+		for cls in type(self).__mro__:
+			if cls is ONNXInferenceManager:
+				break
+			module = sys.modules.get(cls.__module__)
+			path = getattr(module, '__file__', None)
+			if path and getattr(module, cls.__name__, None) is cls:
+				return f"{os.path.abspath(path)}:{cls.__name__}"
+		raise RuntimeError("Set PROCESS_WORKER_CLASS = 'path/to/file.py:ClassName' to use the process backend")
+	
+	def get_process_util_path(self):
+		"""Folder of util .py files for the worker process."""
+		if self.PROCESS_UTIL_PATH:
+			return self.PROCESS_UTIL_PATH
+		path = getattr(self.onnx_util, '__file__', None)
+		if path and os.path.isfile(os.path.join(os.path.dirname(path), 'onnx_process_worker.py')):
+			return os.path.dirname(os.path.abspath(path))
+		return os.path.join(project.folder, 'python', 'util')
+	
+	def get_input_size(self):
+		"""
+		(width, height) the model runs at: its static size, or the one picked from INPUT_SIZES,
+		scaled down (to multiples of INPUT_SCALE_MULTIPLE) while ADAPTIVE_RESOLUTION lowers the
+		input scale on a dynamic-size model.
+		"""
+		if self.model_details is None:
+			return None
+		width, height = self.model_details['width'], self.model_details['height']
+		scale = self.get_input_scale()
+		if scale < 1.0 and self.input_spec is not None and self.input_spec.dynamic_size:
+			multiple = self.INPUT_SCALE_MULTIPLE
+			width = max(multiple, int(width * scale) // multiple * multiple)
+			height = max(multiple, int(height * scale) // multiple * multiple)
+		return width, height
+	
+	def get_input_size_budget_ms(self):
+		if self.INPUT_SIZE_BUDGET_MS:
+			return self.INPUT_SIZE_BUDGET_MS
+		if self.LATENCY_BUDGET_MS:
+			return self.LATENCY_BUDGET_MS
+		return 1000 / (self.TARGET_FPS or 60)
+	
+	def get_preprocess_plan(self, **plan_args):
+		"""
+		numpy_util.PreprocessPlan for the current input size, with the layout, channels and
+		dtype of self.input_spec. Plans are cached per size, so their buffers are reused
+		across frames and size changes; `plan_args` (flip_v, scale, mean, std...) only apply
+		when a size's plan is first built, so pass the same ones every call.
+		"""
+		size = self.get_input_size()
+		plan = self.preprocess_plans.get(size)
+		if plan is None:
+			spec = self.input_spec
+			plan = self.npu.PreprocessPlan(size=size, channels=spec.channels, dtype=spec.dtype, layout=spec.layout or 'NHWC', **plan_args)
+			self.preprocess_plans[size] = plan
+		return plan
+	
+	def make_motion_gate(self):
+		"""MotionGate for one stream of frames. Override to tune it beyond the MOTION_* settings."""
+		return MotionGate(self.MOTION_THRESHOLD, self.MOTION_MAX_STALE_MS, self.MOTION_THUMBNAIL_SIZE)
+	
+	def apply_input_scale(self, nA, scale):
+		"""
+		Called before preprocess while the scheduler has lowered the input scale. The scale
+		itself is applied through get_input_size() / get_preprocess_plan(), so preprocess
+		resizes the capture straight to the smaller model input; this returns nA untouched.
+		Static-size inputs can't shrink, so the scale is logged once and ignored.
+		Override to downscale the capture for a preprocess that doesn't use get_input_size(),
+		resizing into a preallocated buffer (numpy_util.resize_image(..., out=buffer)).
+		"""
+		if (self.input_spec is None or not self.input_spec.dynamic_size) and not self.input_scale_ignored:
+			self.input_scale_ignored = True
+			self.printONNX(f"Input scale {scale:.2f} ignored: the model's input size is static")
+		return nA
+	
 	# ========== Model Loading ==========
 	
 	def loadONNX(self, scriptOp):
@@ -129,9 +413,24 @@ class ONNXInferenceManager:
 			self.printONNX('=============================================')
 			self.printONNX("Starting ONNX model loading in background...")
 			
-			# Get model path from subclass
-			model_path = self.get_model_path()
-			self.printONNX("model:", model_path)
+			# Get model path (or graph of models) from subclass
+			graph = self.get_model_graph()
+			if graph is not None:
+				self.printONNX("graph:", ' -> '.join(node.name for node in graph.nodes))
+				for node in graph.model_nodes:
+					self.printONNX(f"model ({node.name}):", node.model_path)
+			else:
+				model_path = self.get_model_path()
+				self.printONNX("model:", model_path)
+			
+			# The worker process loads (and warms up) its own session
+			if self.USE_PROCESS_WORKER:
+				self._load_process_worker()
+				return
+			
+			if graph is not None:
+				self._load_model_graph(graph)
+				return
 			
 			# Get session options (if customized)
 			sess_options = self.get_session_options()
@@ -143,8 +442,18 @@ class ONNXInferenceManager:
 			else:
 				providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
 			
+			# Swap in a faster int8/fp16 variant (benchmarked once per machine, then cached)
+			if self.onnx_util and self.USE_MODEL_VARIANTS:
+				model_path = self.onnx_util.resolve_model_variant(model_path, providers, self.MODEL_VARIANT_TOLERANCE,
+					self.MAKE_MODEL_VARIANTS, sess_options)
+			
 			# Load model
-			if sess_options:
+			was_cached = False
+			if self.onnx_util and self.USE_SESSION_CACHE:
+				temp_session, was_cached = self.onnx_util.get_session(model_path, providers, sess_options, self.PERSIST_OPTIMIZED_MODEL)
+			elif self.onnx_util:
+				temp_session = self.onnx_util.create_session(model_path, providers, sess_options, self.PERSIST_OPTIMIZED_MODEL)
+			elif sess_options:
 				temp_session = ort.InferenceSession(model_path, sess_options=sess_options, providers=providers)
 			else:
 				temp_session = ort.InferenceSession(model_path, providers=providers)
@@ -154,10 +463,23 @@ class ONNXInferenceManager:
 			
 			if self.onnx_util:
 				self.onnx_util.log_model_details(temp_session)
+				# Parse the input once, and pick its size when the model allows several
+				self.input_spec = self.onnx_util.InputSpec.from_session(temp_session)
+				self.preprocess_plans = {}
+				if self.INPUT_SIZES:
+					self.onnx_util.select_input_size(temp_session, self.input_spec, self.INPUT_SIZES, self.get_input_size_budget_ms())
+				self.model_details = self.input_spec.details()
 			
 			# Call subclass hook
 			self.on_model_loaded(temp_session)
 			
+			# Cached sessions are already warm
+			if self.onnx_util and not was_cached:
+				self.onnx_util.warm_up_session(temp_session, self.WARMUP_RUNS, self.input_spec.buffer())
+			
+			# Workers must be running before onCook sees the session
+			self._start_workers(temp_session)
+			
 			# Only assign to global session when fully loaded
 			self.session = temp_session
 			self.printONNX("ONNX model loaded successfully!")
@@ -169,6 +491,63 @@ class ONNXInferenceManager:
 		finally:
 			self.is_loading = False
 	
+	def _load_model_graph(self, graph):
+		"""Load and warm up every model in the graph, then publish the graph as the session."""
+		if self.BATCHED:
+			raise ValueError("BATCHED can't be combined with a model graph")
+		self.onnx_util.log_onnx_options()
+		providers = self.onnx_util.providers()
+		graph.load(lambda model_path: self._load_graph_session(model_path, providers))
+		
+		# The first model's input is what preprocess produces, so it drives the input spec
+		first_node = graph.model_nodes[0]
+		self.printONNX('ONNX Device activated:', ort.get_device())
+		self.printONNX('### session props -----------------------------------')
+		self.onnx_util.log_model_details(first_node.session)
+		self.input_spec = first_node.input_spec
+		self.preprocess_plans = {}
+		if self.INPUT_SIZES:
+			self.onnx_util.select_input_size(first_node.session, self.input_spec, self.INPUT_SIZES, self.get_input_size_budget_ms())
+		self.model_details = self.input_spec.details()
+		
+		# Call subclass hook
+		self.on_model_loaded(graph)
+		
+		# Workers must be running before onCook sees the graph
+		self._start_workers(graph)
+		self.session = graph
+		self.printONNX(f"ONNX model graph loaded successfully! ({len(graph.model_nodes)} models)")
+		self.printONNX('=============================================')
+	
+	def _load_graph_session(self, model_path, providers):
+		"""Session for one graph model, from the session cache when enabled, warmed up if new."""
+		sess_options = self.get_graph_session_options(model_path)
+		was_cached = False
+		if self.USE_SESSION_CACHE:
+			session, was_cached = self.onnx_util.get_session(model_path, providers, sess_options, self.PERSIST_OPTIMIZED_MODEL)
+		else:
+			session = self.onnx_util.create_session(model_path, providers, sess_options, self.PERSIST_OPTIMIZED_MODEL)
+		if not was_cached:
+			self.onnx_util.warm_up_session(session, self.WARMUP_RUNS, self.onnx_util.InputSpec.from_session(session).buffer())
+		return session
+	
+	def _load_process_worker(self):
+		"""Start the worker process, wait for its model to load, then start the thread that feeds it."""
+		# The parent's settings win over the class defaults in the worker's copy of the subclass
+		overrides = {name: getattr(self, name) for name in ('USE_IO_BINDING', 'USE_SESSION_CACHE', 'PERSIST_OPTIMIZED_MODEL', 'WARMUP_RUNS',
+			'USE_MODEL_VARIANTS', 'MAKE_MODEL_VARIANTS', 'MODEL_VARIANT_TOLERANCE', 'TUNE_SESSION_OPTIONS', 'INPUT_SIZES')}
+		# The worker runs without a scheduler, so it gets the resolved budget
+		overrides['INPUT_SIZE_BUDGET_MS'] = self.get_input_size_budget_ms()
+		client = onnx_process_worker.ProcessWorkerClient(self.get_process_worker_class(), self.get_process_util_path(),
+			self.PROCESS_PYTHON_EXECUTABLE, overrides)
+		self.model_details = client.start(self.PROCESS_START_TIMEOUT)
+		
+		# Workers must be running before onCook sees the session
+		self._start_workers(client)
+		self.session = client
+		self.printONNX("ONNX model loaded successfully in inference process!")
+		self.printONNX('=============================================')
+	
 	def get_loading_status(self):
 		"""Returns status of model loading."""
 		if self.session is not None:
@@ -182,32 +561,529 @@ class ONNXInferenceManager:
 	
 	# ========== Threaded Inference ==========
 	
-	def _inference_thread(self):
-		"""Background thread for preprocessing, ONNX inference, and post-processing."""
+	def _run_session(self, session, input_tensor):
+		"""Run the model (or model graph) on a single preprocessed input tensor."""
+		if isinstance(session, ModelGraph):
+			return session.run(input_tensor)
+		runner = self.io_binding_runner
+		if runner is not None and runner.session is session:
+			return runner.run(input_tensor)
+		return session.run(None, {session.get_inputs()[0].name: input_tensor})
+	
+	def _publish_result(self, output_img, target=None, ref=None):
+		"""
+		Hand a postprocessed result to onCook.
+		`target` is a BatchClient in batched mode, otherwise the manager itself.
+		`ref` is the FrameRef of the frame the result came from, for its ResultInfo.
+		
+		Results are written into a preallocated float32 back buffer, then swapped
+		to the front under the lock, so steady-state publishing allocates nothing.
+		onCook copies the front buffer out while holding the lock, which keeps the
+		next write (into the other buffer) from racing it. With RESULT_DELIVERY set,
+		the main thread is then asked (once per pending result) to deliver it.
+		"""
+		target = target or self
+		back_buffer = target.output_buffers[target.back_buffer_index]
+		if back_buffer is None or back_buffer.shape != output_img.shape:
+			back_buffer = np.empty(output_img.shape, dtype=np.float32)
+			target.output_buffers[target.back_buffer_index] = back_buffer
+		
+		# Ensure output is float32 for TouchDesigner
+		np.copyto(back_buffer, output_img, casting='unsafe')
+		
+		# Store results thread-safely
+		with self.inference_lock:
+			now = time.perf_counter_ns()
+			target.pending_result = back_buffer
+			target.pending_result_ns = now
+			target.pending_info = ResultInfo(ref.sequence, ref.capture_ns, now) if ref is not None else ResultInfo(None, now, now)
+			target.back_buffer_index = 1 - target.back_buffer_index
+			deliver = self.RESULT_DELIVERY is not None and not target.delivery_scheduled
+			if deliver:
+				target.delivery_scheduled = True
+		
+		if deliver:
+			run(self._deliver_result, target)
+	
+	def _deliver_result(self, target):
+		"""Main thread (via run()): force-cook the Script TOP, or call on_result(), for a just-published result."""
+		with self.inference_lock:
+			target.delivery_scheduled = False
+			if target.pending_result is None:
+				return
+			if self.RESULT_DELIVERY == self.DELIVERY_CALLBACK:
+				if target.pending_info.deliver_ns:
+					return
+				# Copy out under the lock, call back outside it: on_result may cook the
+				# Script TOP or call anything else that takes inference_lock
+				self._mark_delivered(target)
+				result = target.pending_result
+				if target.callback_buffer is None or target.callback_buffer.shape != result.shape:
+					target.callback_buffer = np.empty(result.shape, dtype=np.float32)
+				np.copyto(target.callback_buffer, result)
+				info = target.result_info
+				on_result = self.on_result
+			else:
+				on_result = None
+				script_op = target.script_op
+		if on_result is not None:
+			on_result(target.callback_buffer, info)
+			return
+		if script_op is None:
+			return
+		# Only output the result: capturing here would tie the capture rate to the worker's
+		self.delivery_cook = True
 		try:
-			# Call subclass preprocessing
-			input_tensor = self.preprocess(self.input_tensor_cache)
-			
-			# Run inference
-			outputs = self.session.run(None, {self.session.get_inputs()[0].name: input_tensor})
-			
-			# Call subclass postprocessing
-			output_img = self.postprocess(outputs)
-			
-			# Ensure output is float32 for TouchDesigner
-			output_img = output_img.astype(np.float32)
-			
-			# Store results thread-safely
-			with self.inference_lock:
-				self.pending_result = output_img
-				
+			script_op.cook(force=True)
+		finally:
+			self.delivery_cook = False
+	
+	def _mark_delivered(self, target):
+		"""Stamp the pending result's delivery time, unless it was already delivered. Call with inference_lock held."""
+		info = target.pending_info
+		if info is not None and not info.deliver_ns:
+			info.deliver_ns = time.perf_counter_ns()
+		target.result_info = info
+	
+	def get_result_info(self, target=None):
+		"""ResultInfo (frame id, timestamps, capture-to-display latency) of the last delivered result."""
+		return (target or self).result_info
+	
+	def _record_stage(self, stage, start_ns):
+		"""Record time since `start_ns` for a stage (telemetry and scheduler)."""
+		if self.telemetry is None and self.scheduler is None:
+			return
+		self._record_duration(stage, time.perf_counter_ns() - start_ns)
+	
+	def _record_duration(self, stage, duration):
+		"""Record a stage duration in ns (telemetry and scheduler)."""
+		if self.telemetry is not None:
+			self.telemetry.record(stage, duration)
+		if self.scheduler is not None:
+			self.scheduler.observe(stage, duration)
+	
+	def _preprocess_input(self, nA):
+		"""Apply the scheduler's input scale (if lowered), then the subclass preprocess."""
+		if self.scheduler is not None and self.scheduler.input_scale < 1.0:
+			nA = self.apply_input_scale(nA, self.scheduler.input_scale)
+		return self.preprocess(nA)
+	
+	def get_input_scale(self):
+		"""Current input resolution scale chosen by the scheduler (1.0 when not adapting)."""
+		if self.scheduler is not None:
+			return self.scheduler.input_scale
+		return self.worker_input_scale or 1.0
+	
+	def _record_handoff(self, target):
+		"""Record result hand-off latency and throughput. Call with inference_lock held."""
+		if self.telemetry is None:
+			return
+		now = time.perf_counter_ns()
+		self.telemetry.record('handoff', now - target.pending_result_ns)
+		self.telemetry.record_result(now)
+		if self.telemetry.result_count % self.TELEMETRY_WRITE_FRAMES == 0:
+			self.write_telemetry()
+	
+	def get_telemetry(self):
+		"""
+		Per-stage latency percentiles (ms) and result throughput, or None when TELEMETRY is off.
+		With a model graph, 'graph' holds the same percentiles per graph node, and with
+		MOTION_GATE, 'motion' holds the passed / gated frame counts.
+		"""
+		if self.telemetry is None:
+			return None
+		stats = self.telemetry.stats()
+		if isinstance(self.session, ModelGraph):
+			stats['graph'] = self.session.stats()
+		if self.motion_gate is not None:
+			stats['motion'] = self.motion_gate.stats()
+		return stats
+	
+	def write_telemetry(self, target=None):
+		"""Write telemetry stats to a Table DAT or Constant CHOP (default: self.opTelemetry)."""
+		target = target or getattr(self, 'opTelemetry', None)
+		if self.telemetry is None or target is None:
+			return
+		try:
+			if hasattr(target, 'appendRow'):
+				self.telemetry.write_table(target)
+			else:
+				self.telemetry.write_chop(target)
 		except Exception as e:
-			self.printONNX(f"Inference error: {e}")
-			import traceback
-			self.printONNX(traceback.format_exc())
+			self.printONNX(f"Error writing telemetry: {e}")
+	
+	def _start_workers(self, session):
+		"""Start the long-lived inference worker(s) for a newly loaded session."""
+		self._stop_workers()
+		# A new session has no result to reuse yet
+		for gate in [self.motion_gate] + [client.motion_gate for client in self.batch_clients.values()]:
+			if gate is not None:
+				gate.reset()
+		if self.USE_PROCESS_WORKER:
+			# `session` is the ProcessWorkerClient; frames reach it through shared memory slots
+			self.process_client = session
+			self.frame_ring = SharedFrameRing(2)
+			self.input_mailbox = StageQueue(1, StageQueue.POLICY_NEWEST)
+			self.inference_thread = threading.Thread(target=self._process_inference_worker, args=(session, self.input_mailbox, self.frame_ring))
+			self.inference_thread.daemon = True
+			self.inference_thread.start()
+			return
+		self._start_io_binding(session)
+		if self.BATCHED:
+			self._start_batching(session)
+			return
+		if self.PIPELINED:
+			# Room for every queued frame, the one being preprocessed and the one being captured
+			self.frame_ring = FrameRing(self.PIPELINE_DEPTH + 2)
+			self._start_pipeline(session, self.frame_ring)
+			return
+		self.frame_ring = FrameRing(2)
+		self.input_mailbox = StageQueue(1, StageQueue.POLICY_NEWEST)
+		self.inference_thread = threading.Thread(target=self._inference_worker, args=(session, self.input_mailbox, self.frame_ring))
+		self.inference_thread.daemon = True
+		self.inference_thread.start()
+	
+	def _start_io_binding(self, session):
+		if self.USE_IO_BINDING and not isinstance(session, ModelGraph):
+			# Outputs stay referenced while queued for (or inside) postprocess, so
+			# pipelined mode needs enough output sets to cover everything in flight
+			num_output_sets = self.PIPELINE_DEPTH + 2 if self.PIPELINED else 1
+			self.io_binding_runner = self.onnx_util.IOBindingRunner(session, num_output_sets)
+			if self.io_binding_runner.device == 'cpu':
+				self.printONNX("IOBinding on CPU: often no faster than session.run, check with benchmarks/onnx_iobinding_benchmark.py")
+	
+	def _stop_workers(self):
+		"""Stop all inference workers. Called before a reload."""
+		self._stop_pipeline()
+		self._stop_batching()
+		if self.input_mailbox is not None:
+			self.input_mailbox.close()
+		if self.inference_thread is not None:
+			self.inference_thread.join(timeout=1.0)
+		if self.process_client is not None:
+			self.process_client.stop()
+		if self.frame_ring is not None:
+			self.frame_ring.close()
+		self.input_mailbox = None
+		self.inference_thread = None
+		self.process_client = None
+		self.frame_ring = None
+		self.io_binding_runner = None
+		self.is_inferencing = False
+	
+	def _inference_worker(self, session, mailbox, ring):
+		"""Persistent worker: preprocess, ONNX inference and post-processing for each mailbox frame."""
+		while True:
+			ref = mailbox.get()
+			if ref is None:
+				break
+			# Read the frame in place; the slot stays pinned until the result is published
+			nA = ring.acquire(ref)
+			if nA is None:
+				self.is_inferencing = False
+				continue
+			stage = 'preprocess'
+			try:
+				# Call subclass preprocessing
+				start = time.perf_counter_ns()
+				input_tensor = self._preprocess_input(nA)
+				self._record_stage(stage, start)
+				
+				# Run inference
+				stage = 'run'
+				start = time.perf_counter_ns()
+				outputs = self._run_session(session, input_tensor)
+				self._record_stage(stage, start)
+				
+				# Call subclass postprocessing
+				stage = 'postprocess'
+				start = time.perf_counter_ns()
+				self._publish_result(self.postprocess(outputs), ref=ref)
+				self._record_stage(stage, start)
+				
+			except Exception as e:
+				if self.telemetry is not None:
+					self.telemetry.record_error(stage)
+				self.printONNX(f"Inference error: {e}")
+				import traceback
+				self.printONNX(traceback.format_exc())
+			finally:
+				ring.release(ref)
+				self.is_inferencing = False
+				self.frames_skipped_final = self.frames_skipped
+	
+	# ========== Process Backend ==========
+	
+	def _process_inference_worker(self, client, mailbox, ring):
+		"""Persistent worker for USE_PROCESS_WORKER: hand each ring slot to the worker process and publish its result."""
+		while True:
+			ref = mailbox.get()
+			if ref is None:
+				break
+			nA = ring.acquire(ref)
+			if nA is None:
+				self.is_inferencing = False
+				continue
+			try:
+				self._publish_result(self._process_frame(client, ring.slot_name(ref.index), nA), ref=ref)
+			except onnx_process_worker.ProcessStageError as e:
+				if self.telemetry is not None:
+					self.telemetry.record_error(e.stage)
+				self.printONNX(f"Inference error: {e}")
+			except Exception as e:
+				# The worker process is gone; onCook reports it until Reloadonnx
+				self.load_error = str(e)
+				self.printONNX(f"Inference process error: {e}")
+				break
+			finally:
+				ring.release(ref)
+				self.is_inferencing = False
+				self.frames_skipped_final = self.frames_skipped
+	
+	def _process_frame(self, client, frame_name, nA):
+		"""Run one shared memory frame through the worker process and record its stage timings."""
+		result, timings = client.infer(frame_name, nA.shape, nA.dtype, self.get_input_scale(), self.frame_ring.slot_set())
+		for stage, duration in timings.items():
+			self._record_duration(stage, duration)
+		return result
+	
+	# ========== Pipelined Inference ==========
+	
+	def _start_pipeline(self, session, ring):
+		"""Start one worker thread per stage, connected by bounded queues."""
+		self._stop_pipeline()
+		capture_queue, run_queue, post_queue = [
+			StageQueue(self.PIPELINE_DEPTH, self.PIPELINE_DROP_POLICY) for _ in range(3)
+		]
+		# Items travel as (FrameRef, payload), so each result is published with its frame's id
+		stages = [
+			('preprocess', lambda ref, _: self._preprocess_frame(ring, ref), capture_queue, run_queue),
+			('run', lambda ref, input_tensor: self._run_session(session, input_tensor), run_queue, post_queue),
+			('postprocess', self._postprocess_stage, post_queue, None),
+		]
+		self.pipeline_queues = [capture_queue, run_queue, post_queue]
+		self.pipeline_threads = []
+		for name, work, in_queue, out_queue in stages:
+			thread = threading.Thread(target=self._stage_loop, args=(name, work, in_queue, out_queue))
+			thread.daemon = True
+			thread.start()
+			self.pipeline_threads.append(thread)
+		self.printONNX(f"Pipeline started (depth: {self.PIPELINE_DEPTH}, policy: {self.PIPELINE_DROP_POLICY})")
+	
+	def _stop_pipeline(self):
+		"""Close the stage queues and wait briefly for the workers to exit."""
+		for queue in self.pipeline_queues:
+			queue.close()
+		for thread in self.pipeline_threads:
+			thread.join(timeout=1.0)
+		self.pipeline_queues = []
+		self.pipeline_threads = []
+	
+	def _stage_loop(self, name, work, in_queue, out_queue):
+		"""Worker loop for one pipeline stage. Exits when its input queue is closed."""
+		while True:
+			item = in_queue.get()
+			if item is None:
+				break
+			ref, payload = item
+			try:
+				start = time.perf_counter_ns()
+				result = work(ref, payload)
+				self._record_stage(name, start)
+			except Exception as e:
+				if self.telemetry is not None:
+					self.telemetry.record_error(name)
+				self.printONNX(f"Pipeline {name} error: {e}")
+				import traceback
+				self.printONNX(traceback.format_exc())
+				continue
+			if out_queue is not None and result is not None:
+				out_queue.put((ref, result), block=True)
+	
+	def _preprocess_frame(self, ring, ref):
+		"""Preprocess a frame straight out of its ring slot. Returns None if the slot went stale."""
+		nA = ring.acquire(ref)
+		if nA is None:
+			return None
+		try:
+			input_tensor = self._preprocess_input(nA)
+			# The slot is recycled once released, so a tensor that still views it needs its own copy
+			if isinstance(input_tensor, dict):
+				for key, value in input_tensor.items():
+					if isinstance(value, np.ndarray) and ring.owns(value):
+						input_tensor[key] = value.copy()
+			elif ring.owns(input_tensor):
+				input_tensor = input_tensor.copy()
+			return input_tensor
 		finally:
-			self.is_inferencing = False
-			self.frames_skipped_final = self.frames_skipped
+			ring.release(ref)
+	
+	def _postprocess_stage(self, ref, outputs):
+		"""Final pipeline stage: postprocess and publish the result."""
+		self._publish_result(self.postprocess(outputs), ref=ref)
+		self.frames_skipped_final = self.frames_skipped
+	
+	# ========== Batched Inference ==========
+	
+	def register_batch_client(self, scriptOp):
+		"""Register a Script TOP as a batch client. Safe to call every cook."""
+		with self.inference_lock:
+			client = self.batch_clients.get(scriptOp.path)
+			if client is None:
+				client = BatchClient(scriptOp.path)
+				self.batch_clients[scriptOp.path] = client
+				self.printONNX(f"Batch client registered: {scriptOp.path} ({len(self.batch_clients)} total)")
+			client.script_op = scriptOp
+			return client
+	
+	def unregister_batch_client(self, scriptOp):
+		"""Remove a Script TOP from batching, e.g. before deleting it. Idle clients stop holding up batches anyway."""
+		with self.inference_lock:
+			if self.batch_clients.pop(scriptOp.path, None) is not None:
+				self.printONNX(f"Batch client unregistered: {scriptOp.path} ({len(self.batch_clients)} total)")
+			self.batch_cond.notify_all()
+	
+	def get_batch_size(self):
+		"""Batch size to run: the model's static batch dim, or BATCH_SIZE when it's dynamic."""
+		details = self.model_details
+		if details and not details['dynamic_batch']:
+			return details['batch_size']
+		return self.BATCH_SIZE
+	
+	def _start_batching(self, session):
+		batch_size = self.get_batch_size()
+		# Each client's result is sliced off axis 0, which only works if every output carries the batch there
+		split_outputs = self.input_spec.outputs_follow_batch(session)
+		if not split_outputs and batch_size != 1:
+			if not self.input_spec.dynamic_batch:
+				raise ValueError(f"BATCHED: the model has a fixed batch of {batch_size} and outputs without a batch axis, "
+					"so results can't be split between clients")
+			self.printONNX("BATCHED: model outputs don't carry the batch on axis 0, running one frame per session.run")
+			batch_size = 1
+		self.batch_stopped = False
+		self.batch_thread = threading.Thread(target=self._batch_worker, args=(session, batch_size, split_outputs))
+		self.batch_thread.daemon = True
+		self.batch_thread.start()
+		self.printONNX(f"Batching started (batch size: {batch_size}, deadline: {self.BATCH_DEADLINE_MS}ms)")
+	
+	def _stop_batching(self):
+		with self.batch_cond:
+			self.batch_stopped = True
+			self.batch_cond.notify_all()
+		if self.batch_thread is not None:
+			self.batch_thread.join(timeout=1.0)
+		self.batch_thread = None
+	
+	def _submit_batch_frame(self, client, nA, capture_ns=0):
+		"""Queue a client's frame for the next batch. Newest frame wins per client."""
+		with self.batch_cond:
+			if client.frame is not None:
+				client.frames_skipped += 1
+			self.batch_sequence += 1
+			client.missed_batches = 0
+			client.frame = nA
+			client.frame_ref = FrameRef(None, self.batch_sequence, capture_ns)
+			self.batch_cond.notify_all()
+	
+	def _collect_batch(self):
+		"""
+		Wait for frames: returns as soon as every active client has one, or once the
+		deadline after the first arrival passes. Returns None when batching is stopped.
+		A client that missed BATCH_IDLE_AFTER batches in a row (bypassed or deleted TOP)
+		is idle: its frames still join batches, but they no longer wait for it.
+		"""
+		with self.batch_cond:
+			while not self.batch_stopped and not any(c.frame is not None for c in self.batch_clients.values()):
+				self.batch_cond.wait()
+			deadline = time.perf_counter() + self.BATCH_DEADLINE_MS / 1000
+			while not self.batch_stopped and not all(c.frame is not None or c.missed_batches >= self.BATCH_IDLE_AFTER
+					for c in self.batch_clients.values()):
+				remaining = deadline - time.perf_counter()
+				if remaining <= 0:
+					break
+				self.batch_cond.wait(remaining)
+			if self.batch_stopped:
+				return None
+			ready = []
+			for client in self.batch_clients.values():
+				if client.frame is not None:
+					ready.append((client, client.frame, client.frame_ref))
+					client.frame = None
+				else:
+					client.missed_batches += 1
+					if client.missed_batches == self.BATCH_IDLE_AFTER:
+						self.printONNX(f"Batch client idle, no longer waiting for it: {client.path}")
+			return ready
+	
+	def _batch_worker(self, session, batch_size, split_outputs=True):
+		"""
+		Persistent worker: stack client frames, run them together, split the results back.
+		Without `split_outputs` (batch size 1), each client gets the run's outputs whole.
+		"""
+		while True:
+			ready = self._collect_batch()
+			if ready is None:
+				break
+			for start in range(0, len(ready), batch_size):
+				try:
+					self._run_batch(session, ready[start:start + batch_size], batch_size, split_outputs)
+				except Exception as e:
+					self.printONNX(f"Batch inference error: {e}")
+					import traceback
+					self.printONNX(traceback.format_exc())
+	
+	def _run_batch(self, session, chunk, batch_size, split_outputs=True):
+		# Subclass preprocess returns a batch-of-one tensor per frame
+		start = time.perf_counter_ns()
+		tensors = [self.preprocess(nA) for _, nA, _ in chunk]
+		batch_shape = (batch_size,) + tensors[0].shape[1:]
+		if self.batch_input is None or self.batch_input.shape != batch_shape or self.batch_input.dtype != tensors[0].dtype:
+			self.batch_input = np.zeros(batch_shape, dtype=tensors[0].dtype)
+		
+		# Stack into the preallocated batch and zero-pad the unused slots
+		count = len(chunk)
+		np.concatenate(tensors, axis=0, out=self.batch_input[:count])
+		self.batch_input[count:] = 0
+		self._record_stage('preprocess', start)
+		
+		start = time.perf_counter_ns()
+		outputs = self._run_session(session, self.batch_input)
+		self._record_stage('run', start)
+		
+		start = time.perf_counter_ns()
+		for i, (client, _, ref) in enumerate(chunk):
+			client_outputs = [output[i:i + 1] for output in outputs] if split_outputs else outputs
+			self._publish_result(self.postprocess(client_outputs), client, ref)
+		self._record_stage('postprocess', start)
+	
+	def _capture_input(self, scriptOp, ring=None, gate=None):
+		"""
+		Read the input TOP on the main thread. Returns None if unavailable, or if `gate`
+		(a MotionGate) finds the frame unchanged, before any copy is made.
+		With a FrameRing, the frame is copied into its next slot and a FrameRef is returned instead,
+		or None (counted as a dropped capture) when every slot is still being read.
+		"""
+		try:
+			start = time.perf_counter_ns()
+			inputTex = scriptOp.inputs[0]
+			nA = inputTex.numpyArray(delayed=True)
+			if gate is not None and not gate.should_run(nA, start):
+				return None
+			if ring is not None:
+				nA = ring.write(nA)
+				if nA is None:
+					# Every slot is still being read: nothing was captured
+					if self.telemetry is not None:
+						self.telemetry.record_drop('capture')
+					return None
+				nA.capture_ns = start
+			self._record_stage('capture', start)
+			return nA
+		except Exception as e:
+			if self.telemetry is not None:
+				self.telemetry.record_error('capture')
+			self.printONNX(f"Error capturing input: {e}")
+			return None
 	
 	# ========== TouchDesigner Callbacks ==========
 	
@@ -224,6 +1100,7 @@ class ONNXInferenceManager:
 	def onPulse(self, par):
 		"""Handle custom pulse parameter triggers."""
 		if par.name == 'Reloadonnx':
+			self._stop_workers()
 			self.session = None  # Reset the session
 		return
 	
@@ -248,52 +1125,119 @@ class ONNXInferenceManager:
 			self.printONNX(f"Cannot process: {self.load_error}")
 			return
 		
+		if self.BATCHED:
+			self._cook_batched(scriptOp)
+			return
+		
 		# Check if we have results from background thread
 		with self.inference_lock:
+			self.script_op = scriptOp
 			if self.pending_result is not None:
 				output_img = self.pending_result
 				self.pending_result = None
 				self.frames_skipped = 0
+				self._record_handoff(self)
 				
 				# Update performance metrics if available
 				try:
 					self.opPerformance.par.const0value = self.frames_skipped_final
-					if self.frames_skipped_final > 0:  # Prevent div by zero
+					if self.telemetry is not None:
+						self.opPerformance.par.const1value = math.floor(self.telemetry.throughput())
+					elif self.frames_skipped_final > 0:  # Prevent div by zero
 						self.opPerformance.par.const1value = math.floor(60 / self.frames_skipped_final)
 				except:
 					pass  # Performance constants not available
 				
 				# Output result directly (already fully processed)
 				scriptOp.copyNumpyArray(output_img)
-				return  # Early return after outputting result
+				self._mark_delivered(self)
+				if not self.PIPELINED and self.scheduler is None:
+					return  # Early return after outputting result (the scheduler may capture this cook)
+		
+		if self.delivery_cook:
+			return
+		
+		if self.PIPELINED:
+			self._dispatch_pipelined(scriptOp)
+			return
 		
 		# If inference is still running, skip this frame (natural frame skipping via threading)
 		if self.is_inferencing:
 			self.frames_skipped += 1
 			return
 		
-		# Capture input on main thread (GPU texture access only)
-		try:
-			inputTex = scriptOp.inputs[0]
-			nA = inputTex.numpyArray(delayed=True)
-			if nA is None:
-				return
-			
-			# Store raw array for background thread to process
-			# could do nA.copy() if worried about mutability
-			self.input_tensor_cache = nA 
-			
-		except Exception as e:
-			self.printONNX(f"Error capturing input: {e}")
+		# Hold the capture until the scheduler's next slot
+		if not self._scheduled_capture():
+			self.frames_skipped += 1
+			return
+		
+		if self.input_mailbox is None:
+			return
+		
+		# Capture input on main thread, copied once into a ring slot TD can't touch
+		ref = self._capture_input(scriptOp, self.frame_ring, self.motion_gate)
+		if ref is None:
+			self.frames_skipped += 1
 			return
 		
-		# Start inference in background thread
+		# Hand the slot to the persistent worker
 		self.is_inferencing = True
-		self.inference_thread = threading.Thread(target=self._inference_thread)
-		self.inference_thread.daemon = True
-		self.inference_thread.start()
+		if not self.input_mailbox.put(ref):
+			self.is_inferencing = False
+	
+	def _scheduled_capture(self):
+		"""True when there's no scheduler or it's time for the next capture (and books the slot)."""
+		if self.scheduler is None:
+			return True
+		now = time.perf_counter_ns()
+		if not self.scheduler.should_capture(now):
+			return False
+		self.scheduler.on_capture(now)
+		return True
+	
+	def _dispatch_pipelined(self, scriptOp):
+		"""Capture a frame into the head of the pipeline, honoring the drop policy."""
+		if not self.pipeline_queues:
+			return
+		capture_queue = self.pipeline_queues[0]
+		
+		# FIFO applies back-pressure: don't capture until the preprocess stage has room
+		if capture_queue.is_full():
+			self.frames_skipped += 1
+			if capture_queue.policy == StageQueue.POLICY_FIFO:
+				return
+		
+		if not self._scheduled_capture():
+			self.frames_skipped += 1
+			return
+		
+		# Several frames can be in flight at once, each in its own ring slot
+		ref = self._capture_input(scriptOp, self.frame_ring, self.motion_gate)
+		if ref is None:
+			self.frames_skipped += 1
+			return
+		capture_queue.put((ref, None))
+	
+	def _cook_batched(self, scriptOp):
+		"""Output this operator's latest batched result, then submit its next frame."""
+		client = self.register_batch_client(scriptOp)
+		with self.inference_lock:
+			if client.pending_result is not None:
+				scriptOp.copyNumpyArray(client.pending_result)
+				self._mark_delivered(client)
+				client.pending_result = None
+				client.frames_skipped = 0
+				self._record_handoff(client)
+		
+		if self.delivery_cook:
+			return
+		
+		if self.MOTION_GATE and client.motion_gate is None:
+			client.motion_gate = self.make_motion_gate()
+		capture_ns = time.perf_counter_ns()
+		nA = self._capture_input(scriptOp, gate=client.motion_gate)
+		if nA is None:
+			return
 		
-		# Debug: Check thread count
-		active_threads = threading.active_count()
-		if active_threads > 10:
-			self.printONNX(f"Warning: {active_threads} active threads!")
+		# The frame waits for other clients, so the worker needs its own copy
+		self._submit_batch_frame(client, nA.copy(), capture_ns)
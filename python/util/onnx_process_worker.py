@@ -0,0 +1,343 @@
+"""
+Process backend for ONNXInferenceManager (USE_PROCESS_WORKER = True)
+
+Runs a manager subclass's preprocess, session.run and postprocess in a separate
+Python process, so heavy NumPy work there doesn't compete with TouchDesigner's main
+thread for the GIL. Frames and results travel through multiprocessing.shared_memory
+blocks; the pipe between the processes only carries block names, shapes and timings.
+
+The worker process is started with the 'spawn' method through runpy.run_path on this
+file, so it needs no importable package: it installs stand-ins for the TD globals the
+util modules use (`op.PyUtils` and `mod`), loads the subclass from its .py file and
+drives it like onCook would. Anything the subclass does in __init__, on_model_loaded,
+preprocess or postprocess must therefore work outside TouchDesigner.
+"""
+
+import os
+import sys
+import time
+import runpy
+import builtins
+import importlib
+import importlib.util
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy
+
+WORKER_RUN_NAME = '__onnx_process_worker__'
+
+
+def printONNX(*args):
+    print("[ONNX]", *args)
+
+
+###################################################
+# Shared memory helpers
+###################################################
+
+def create_shared_array(shape, dtype):
+    """Create a shared memory block and an ndarray over it. Returns (shm, array)."""
+    dtype = numpy.dtype(dtype)
+    nbytes = max(1, int(numpy.prod(shape)) * dtype.itemsize)
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    return shm, numpy.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def attach_shared_memory(name):
+    """
+    Attach to a block created by the other process, which owns (and unlinks) it.
+    The worker is spawned by the parent, so both share one resource tracker and an
+    attach doesn't need unregistering; it just cleans up if the parent dies.
+    """
+    return shared_memory.SharedMemory(name=name)
+
+
+def release_shared_memory(shm, unlink=False):
+    """
+    Unlink (if asked) and unmap a block. Returns False if an ndarray view of it is still
+    alive, in which case the mapping stays open: keep the block and retry later.
+    """
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+    try:
+        shm.close()
+    except BufferError:
+        return False
+    return True
+
+
+class SharedBlockCache:
+    """
+    Attached blocks by name, so each block is mapped once per process and stays
+    mapped until the other side reports it has reallocated.
+    """
+
+    def __init__(self):
+        self.blocks = {}
+        self.releasing = []  # Detached blocks whose close() waits for a live view to go
+        self.attach_count = 0
+
+    def array(self, name, shape, dtype):
+        shm = self.blocks.get(name)
+        if shm is None:
+            shm = attach_shared_memory(name)
+            self.blocks[name] = shm
+            self.attach_count += 1
+        return numpy.ndarray(shape, dtype=numpy.dtype(dtype), buffer=shm.buf)
+
+    def retain(self, names):
+        """Detach every block not in `names`, the other side's current set of blocks."""
+        keep = set(names)
+        for name in [n for n in self.blocks if n not in keep]:
+            self.releasing.append(self.blocks.pop(name))
+        self.releasing = [shm for shm in self.releasing if not release_shared_memory(shm)]
+
+    def forget(self, keep_name):
+        """Detach every block except `keep_name` (for a single block the other side reallocates)."""
+        if len(self.blocks) > 1 or keep_name not in self.blocks:
+            self.retain((keep_name,))
+
+    def close(self):
+        self.retain(())
+        if self.releasing:
+            printONNX(f"{len(self.releasing)} shared memory blocks still in use at close; they unmap when their views go")
+        self.releasing.clear()
+
+
+###################################################
+# Parent side
+###################################################
+
+class ProcessWorkerClient:
+    """
+    Parent-side handle to the worker process. One frame is in flight at a time:
+    infer() sends a shared frame's name and shape, then blocks (without the GIL)
+    until the worker has written the result into its own shared output block.
+
+    Args:
+        class_spec: 'path/to/file.py:ClassName' of the manager subclass
+        util_path: Folder holding the haxlib util modules (onnx_util, numpy_util, ...)
+        python_executable: Interpreter for the worker. Inside TD, sys.executable is
+            TouchDesigner itself, so this defaults to a python executable beside it.
+        overrides: Class attribute overrides applied to the subclass in the worker
+    """
+
+    def __init__(self, class_spec, util_path, python_executable=None, overrides=None):
+        self.class_spec = class_spec
+        self.util_path = util_path
+        self.python_executable = python_executable or default_python_executable()
+        self.overrides = overrides or {}
+        self.process = None
+        self.conn = None
+        self.outputs = SharedBlockCache()
+        self.slot_generation = None  # Frame ring generation the worker last heard about
+
+    def start(self, timeout=120):
+        """Start the worker and wait for its model to load. Returns its model details."""
+        context = multiprocessing.get_context('spawn')
+        self.slot_generation = None
+        if self.python_executable:
+            context.set_executable(self.python_executable)
+        self.conn, child_conn = context.Pipe()
+        worker_globals = {
+            'worker_conn': child_conn,
+            'worker_util_path': self.util_path,
+            'worker_class_spec': self.class_spec,
+            'worker_overrides': self.overrides,
+        }
+        self.process = context.Process(target=runpy.run_path, args=(os.path.join(self.util_path, 'onnx_process_worker.py'),),
+                                       kwargs={'init_globals': worker_globals, 'run_name': WORKER_RUN_NAME})
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+
+        if not self.conn.poll(timeout):
+            self.stop()
+            raise TimeoutError(f"Inference process didn't load the model within {timeout}s")
+        message = self._recv()
+        if message[0] == 'error':
+            self.stop()
+            raise RuntimeError(f"Inference process failed to load the model: {message[1]}")
+        printONNX(f"Inference process started (pid {self.process.pid})")
+        return message[1]
+
+    def _recv(self):
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            raise RuntimeError('Inference process exited')
+
+    def infer(self, frame_name, shape, dtype, input_scale=1.0, slot_set=None):
+        """
+        Run one shared frame through the worker.
+        `slot_set` is the frame ring's (generation, block names): when its generation
+        changes (the ring reallocated a slot), the worker detaches blocks no longer in
+        it. Otherwise every slot stays attached in the worker for its lifetime.
+
+        Returns:
+            (result, timings): result is a float32 view of the worker's output block, valid
+            until the next infer() call; timings maps stage name -> duration in ns.
+        """
+        slot_names = None
+        if slot_set is not None and slot_set[0] != self.slot_generation:
+            self.slot_generation, slot_names = slot_set
+        self.conn.send(('frame', frame_name, shape, numpy.dtype(dtype).str, input_scale, slot_names))
+        message = self._recv()
+        if message[0] == 'error':
+            _, stage, details, timings = message
+            raise ProcessStageError(stage, details, timings)
+        _, output_name, output_shape, timings = message
+        self.outputs.forget(output_name)
+        return self.outputs.array(output_name, output_shape, numpy.float32), timings
+
+    def stop(self, timeout=2.0):
+        if self.conn is not None:
+            try:
+                self.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        if self.conn is not None:
+            self.conn.close()
+        self.outputs.close()
+        self.process = None
+        self.conn = None
+
+
+class ProcessStageError(Exception):
+    """A stage failed inside the worker process."""
+
+    def __init__(self, stage, details, timings=None):
+        super().__init__(f"{stage} failed in inference process:\n{details}")
+        self.stage = stage
+        self.timings = timings or {}
+
+
+def default_python_executable():
+    """sys.executable outside TD; inside TD, a python executable in TD's bin folder."""
+    name = os.path.basename(sys.executable).lower()
+    if name.startswith('python'):
+        return sys.executable
+    folder = os.path.dirname(sys.executable)
+    for candidate in ('python.exe', 'python3', 'python'):
+        path = os.path.join(folder, candidate)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+###################################################
+# Worker side
+###################################################
+
+class HeadlessOp:
+    """Stand-in for TD's global `op`: only the shortcuts the util modules read."""
+
+    def __init__(self, util_path):
+        self.PyUtils = util_path
+
+
+def headless_mod(path):
+    """Stand-in for TD's `mod()`: import a util module by its DAT path's last segment."""
+    return importlib.import_module(path.replace('\\', '/').rstrip('/').rsplit('/', 1)[-1])
+
+
+def load_class(spec):
+    """Load `path/to/file.py:ClassName`."""
+    file_path, class_name = spec.rsplit(':', 1)
+    module_name = os.path.splitext(os.path.basename(file_path))[0]
+    module_spec = importlib.util.spec_from_file_location(module_name, file_path)
+    module = importlib.util.module_from_spec(module_spec)
+    sys.modules[module_name] = module
+    module_spec.loader.exec_module(module)
+    return getattr(module, class_name)
+
+
+def run_worker(conn, util_path, class_spec, overrides):
+    """Worker process main loop: load the model, then answer frame requests until told to stop."""
+    if util_path not in sys.path:
+        sys.path.insert(0, util_path)
+    builtins.op = HeadlessOp(util_path)
+    builtins.mod = headless_mod
+
+    try:
+        manager_class = load_class(class_spec)
+        # The worker runs frames one at a time on this thread: no nested workers or scheduling
+        attributes = dict(overrides, USE_PROCESS_WORKER=False, PIPELINED=False, BATCHED=False, TELEMETRY=False,
+                          TARGET_FPS=None, LATENCY_BUDGET_MS=None)
+        attributes['_start_workers'] = lambda self, session: self._start_io_binding(session)
+        manager = type(f"Process{manager_class.__name__}", (manager_class,), attributes)()
+        manager._load_model_thread()
+        if manager.load_error:
+            raise RuntimeError(manager.load_error)
+        session = manager.session
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+        conn.close()
+        return
+    conn.send(('ready', manager.model_details))
+
+    frames = SharedBlockCache()
+    output_shm = None
+    output = None
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        _, frame_name, shape, dtype, input_scale, slot_names = message
+        if slot_names is not None:
+            frames.retain(slot_names)
+        timings = {}
+        stage = 'preprocess'
+        try:
+            start = time.perf_counter_ns()
+            nA = frames.array(frame_name, shape, dtype)
+            manager.worker_input_scale = input_scale
+            if input_scale < 1.0:
+                nA = manager.apply_input_scale(nA, input_scale)
+            input_tensor = manager.preprocess(nA)
+            timings[stage] = time.perf_counter_ns() - start
+
+            stage = 'run'
+            start = time.perf_counter_ns()
+            outputs = manager._run_session(session, input_tensor)
+            timings[stage] = time.perf_counter_ns() - start
+
+            stage = 'postprocess'
+            start = time.perf_counter_ns()
+            result = manager.postprocess(outputs)
+            if output is None or output.shape != result.shape:
+                if output_shm is not None:
+                    output = None
+                    release_shared_memory(output_shm, unlink=True)
+                output_shm, output = create_shared_array(result.shape, numpy.float32)
+            # Ensure output is float32 for TouchDesigner
+            numpy.copyto(output, result, casting='unsafe')
+            timings[stage] = time.perf_counter_ns() - start
+        except Exception:
+            conn.send(('error', stage, traceback.format_exc(), timings))
+            continue
+        finally:
+            # Drop views of the frame block, so it can be unmapped once the ring reallocates it
+            nA = input_tensor = outputs = result = None
+        conn.send(('result', output_shm.name, output.shape, timings))
+
+    frames.close()
+    if output_shm is not None:
+        output = None
+        release_shared_memory(output_shm, unlink=True)
+    conn.close()
+
+
+if __name__ == WORKER_RUN_NAME:
+    run_worker(worker_conn, worker_util_path, worker_class_spec, worker_overrides)
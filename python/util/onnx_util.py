@@ -1,3 +1,9 @@
+import os
+import json
+import hashlib
+import platform
+import threading
+import time
 import numpy
 import cv2
 import onnxruntime as ort
@@ -13,9 +19,19 @@ def log_onnx_options():
 	# 	print('-', provider)
 
 def providers():
-    return ['CUDAExecutionProvider', 'CPUExecutionProvider'] # 'TensorrtExecutionProvider'
+    # Only request providers this onnxruntime build has, so CPU-only machines fall back cleanly
+    preferred = ['CUDAExecutionProvider', 'CPUExecutionProvider'] # 'TensorrtExecutionProvider'
+    available = ort.get_available_providers()
+    return [p for p in preferred if p in available] or ['CPUExecutionProvider']
 
-def log_model_details(session):
+def session_device(session):
+    # Device that session inputs should live on for IOBinding
+    if 'CUDAExecutionProvider' in session.get_providers():
+        return 'cuda'
+    return 'cpu'
+
+def log_model_details(session, default_size=256):
+    """Log the session's inputs and outputs, and return its first input's InputSpec.details()."""
     printONNX('Session providers:', session.get_providers())
     # printONNX('- Model description:', session.get_modelmeta().description)
     # printONNX('- Model version:', session.get_modelmeta().version)
@@ -26,14 +42,683 @@ def log_model_details(session):
     for o in session.get_outputs():
         printONNX('-', o.name, o.shape, o.type)
     printONNX("Input shape: ------------")
-    input_shape = session.get_inputs()[0].shape
-    has_dynamic_dims = any(isinstance(dim, str) for dim in input_shape)
-    if has_dynamic_dims:
-        # Use default size for MoveNet multipose (256x256)
-        height, width = 256, 256
-        printONNX(f"Model input shape is dynamic! Using default size: {height}x{width}")
+    spec = InputSpec.from_session(session, default_size=default_size)
+    printONNX(f"Model expects input shape: {spec.shape} ({spec.layout or 'non-image'}, {spec.dtype.name})")
+    if spec.dynamic_size:
+        # e.g. MoveNet multipose: pick a size with select_input_size(), or use the default
+        printONNX(f"Model input size is dynamic! Default size: {spec.height}x{spec.width}")
+    if spec.dynamic_batch:
+        printONNX(f"Model has a dynamic batch dimension: {spec.shape[0]}")
+    return spec.details()
+
+
+def is_static_dim(dim):
+    return isinstance(dim, int) and dim > 0
+
+
+class InputSpec:
+    """
+    A model input parsed once: layout (NCHW / NHWC for 4D image inputs), numpy dtype and
+    which dims are static, so preprocess doesn't have to guess from the raw shape.
+
+    Layout comes from where the channel dim (1-4) sits; when both positions could be
+    channels (or neither is static), NCHW is assumed, as most exported vision models use it.
+    Dynamic height/width fall back to `default_size` until a size is chosen (see
+    select_input_size). Tensors for each concrete shape are cached, so switching between
+    sizes doesn't allocate every frame.
+
+    Example (in an ONNXInferenceManager subclass):
+        spec = self.input_spec  # e.g. MoveNet multipose: NHWC, int32, dynamic height/width
+        width, height = self.get_input_size()
+        tensor = spec.buffer(width, height)
+    """
+
+    def __init__(self, name, shape, onnx_type, default_size=256):
+        self.name = name
+        self.shape = list(shape)
+        self.onnx_type = onnx_type
+        self.dtype = numpy.dtype(ONNX_NUMPY_TYPES.get(onnx_type, numpy.float32))
+        self.default_size = default_size
+        self.buffers = {}
+
+        self.layout = None
+        self.channels = None
+        self.height = None
+        self.width = None
+        self.dynamic_batch = bool(self.shape) and not is_static_dim(self.shape[0])
+        self.batch_size = None if self.dynamic_batch or not self.shape else self.shape[0]
+        if len(self.shape) == 4:
+            self.layout = self.detect_layout(self.shape)
+            c, h, w = (1, 2, 3) if self.layout == 'NCHW' else (3, 1, 2)
+            self.channels = self.shape[c] if is_static_dim(self.shape[c]) else None
+            self.height = self.shape[h] if is_static_dim(self.shape[h]) else default_size
+            self.width = self.shape[w] if is_static_dim(self.shape[w]) else default_size
+            self.dynamic_size = not (is_static_dim(self.shape[h]) and is_static_dim(self.shape[w]))
+        else:
+            self.dynamic_size = False
+        self.has_dynamic_dims = not all(is_static_dim(dim) for dim in self.shape)
+
+    @classmethod
+    def from_session(cls, session, index=0, default_size=256):
+        model_input = session.get_inputs()[index]
+        return cls(model_input.name, model_input.shape, model_input.type, default_size)
+
+    @staticmethod
+    def detect_layout(shape):
+        def is_channels(dim):
+            return is_static_dim(dim) and dim <= 4
+        if is_channels(shape[3]) and not is_channels(shape[1]):
+            return 'NHWC'
+        return 'NCHW'
+
+    def shape_for(self, width=None, height=None, batch=None):
+        """Concrete input shape at a size (default: the current width/height)."""
+        width = width or self.width
+        height = height or self.height
+        batch = batch or self.batch_size or 1
+        shape = [batch] + [dim if is_static_dim(dim) else 1 for dim in self.shape[1:]]
+        if self.layout == 'NCHW':
+            shape[2], shape[3] = height, width
+        elif self.layout == 'NHWC':
+            shape[1], shape[2] = height, width
+        return tuple(shape)
+
+    def supports_size(self, width, height):
+        """False if the model has a static size other than width x height."""
+        return self.dynamic_size or (width, height) == (self.width, self.height)
+
+    def buffer(self, width=None, height=None, batch=None):
+        """Zeroed input tensor for a size, allocated once per shape and reused after that."""
+        shape = self.shape_for(width, height, batch)
+        buffer = self.buffers.get(shape)
+        if buffer is None:
+            buffer = numpy.zeros(shape, dtype=self.dtype)
+            self.buffers[shape] = buffer
+        return buffer
+
+    def outputs_follow_batch(self, session):
+        """True if every output's axis 0 is this input's batch dim (the same size, or the same dynamic dim)."""
+        batch_dim = self.shape[0] if self.shape else None
+        for output in session.get_outputs():
+            if not output.shape:
+                return False
+            dim = output.shape[0]
+            if self.dynamic_batch:
+                # A named dim must match the input's; an unnamed one (None) is trusted
+                if is_static_dim(dim) or (isinstance(dim, str) and isinstance(batch_dim, str) and dim != batch_dim):
+                    return False
+            elif dim != self.batch_size:
+                return False
+        return True
+
+    def details(self):
+        """Summary dict (as returned by log_model_details)."""
+        return {
+            'input_name': self.name,
+            'input_shape': self.shape,
+            'input_type': self.onnx_type,
+            'layout': self.layout,
+            'dtype': self.dtype.name,
+            'channels': self.channels,
+            'has_dynamic_dims': self.has_dynamic_dims,
+            'dynamic_size': self.dynamic_size,
+            'dynamic_batch': self.dynamic_batch,
+            'batch_size': self.batch_size,
+            'height': self.height,
+            'width': self.width,
+        }
+
+def parse_sizes(sizes):
+    """Allowed sizes as (width, height) tuples; plain ints mean square sizes."""
+    return [(size, size) if isinstance(size, int) else (int(size[0]), int(size[1])) for size in sizes]
+
+def select_input_size(session, spec, sizes, budget_ms, runs=10):
+    """
+    Pick the largest allowed size (by area) whose median session.run time fits `budget_ms`,
+    or the fastest one when none fit. Models with a static size always get their own size.
+    The chosen size becomes spec.width / spec.height.
+
+    Returns:
+        (width, height)
+    """
+    candidates = [size for size in parse_sizes(sizes) if spec.supports_size(*size)]
+    if not spec.dynamic_size or not candidates:
+        return spec.width, spec.height
+
+    timings = {}
+    for width, height in sorted(candidates, key=lambda size: size[0] * size[1]):
+        timings[(width, height)] = time_session(session, spec.buffer(width, height), runs)
+        printONNX(f"- input {width}x{height}: {timings[(width, height)]:.2f}ms")
+    fitting = [size for size, ms in timings.items() if ms <= budget_ms]
+    if fitting:
+        width, height = max(fitting, key=lambda size: size[0] * size[1])
     else:
-        # Use the model's expected dimensions if they're specified
-        batch_size, channels, height, width = input_shape
-        printONNX(f"Model expects input shape: {input_shape}")
+        width, height = min(timings, key=timings.get)
+    spec.width, spec.height = width, height
+    printONNX(f"Input size: {width}x{height} ({timings[(width, height)]:.2f}ms, budget {budget_ms:.1f}ms)")
+    return width, height
+
+
+# ========== Session Cache & Warm-up ==========
+
+# Process-wide cache of loaded sessions, shared across managers and reloads:
+# (model path, providers, options) -> (model hash, session)
+session_cache = {}
+session_cache_lock = threading.Lock()
+
+ONNX_NUMPY_TYPES = {
+    'tensor(float)': numpy.float32,
+    'tensor(float16)': numpy.float16,
+    'tensor(double)': numpy.float64,
+    'tensor(uint8)': numpy.uint8,
+    'tensor(int8)': numpy.int8,
+    'tensor(int32)': numpy.int32,
+    'tensor(int64)': numpy.int64,
+}
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def session_options_key(sess_options):
+    # SessionOptions isn't hashable, so key on the settings that change how a session runs
+    if sess_options is None:
+        return None
+    return (
+        str(sess_options.graph_optimization_level),
+        str(sess_options.execution_mode),
+        sess_options.intra_op_num_threads,
+        sess_options.inter_op_num_threads,
+        sess_options.enable_mem_pattern,
+        sess_options.enable_cpu_mem_arena,
+    )
+
+def machine_model_path(model_path, model_hash, providers, suffix):
+    # Provider- and CPU-specific files beside the model: optimized graphs, variant choices
+    device = 'cuda' if 'CUDAExecutionProvider' in providers else 'cpu'
+    machine = platform.node() or 'local'
+    base, _ = os.path.splitext(model_path)
+    return f"{base}.{model_hash[:12]}.{device}.{machine}.{suffix}"
+
+def optimized_model_path(model_path, model_hash, providers, sess_options=None):
+    # Also keyed on the settings that shape the saved graph (optimization level, execution
+    # mode, thread counts), so a graph saved at one level never stands in for a tuned other
+    settings = session_options_key(sess_options or ort.SessionOptions())[:4]
+    tag = hashlib.sha1(repr(settings).encode()).hexdigest()[:8]
+    return machine_model_path(model_path, model_hash, providers, f'{tag}.opt.onnx')
+
+def create_session(model_path, providers, sess_options=None, persist_optimized=True, model_hash=None):
+    """
+    Create an InferenceSession, reusing a previously saved optimized graph when there is one.
+    On first load with `persist_optimized`, ORT writes its optimized graph next to the model
+    (via SessionOptions.optimized_model_filepath) so later launches skip graph optimization.
+    """
+    if not persist_optimized:
+        return ort.InferenceSession(model_path, sess_options=sess_options, providers=providers)
+
+    opt_path = optimized_model_path(model_path, model_hash or file_hash(model_path), providers, sess_options)
+    if sess_options is None:
+        sess_options = ort.SessionOptions()
+
+    # The session copies its options when it's created, so put the caller's object back
+    # afterwards: callers reuse it, and get_session keys its cache on these fields
+    default_level = sess_options.graph_optimization_level
+    default_opt_path = sess_options.optimized_model_filepath
+    try:
+        if os.path.exists(opt_path):
+            try:
+                sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                printONNX('Loading optimized model:', opt_path)
+                return ort.InferenceSession(opt_path, sess_options=sess_options, providers=providers)
+            except Exception as e:
+                # A partial or stale file shouldn't block loading the original model
+                printONNX(f"Optimized model failed to load, rebuilding: {e}")
+                os.remove(opt_path)
+                sess_options.graph_optimization_level = default_level
+
+        sess_options.optimized_model_filepath = opt_path
+        session = ort.InferenceSession(model_path, sess_options=sess_options, providers=providers)
+        printONNX('Saved optimized model:', opt_path)
+        return session
+    finally:
+        sess_options.graph_optimization_level = default_level
+        sess_options.optimized_model_filepath = default_opt_path
+
+def get_session(model_path, providers, sess_options=None, persist_optimized=True):
+    """
+    Return a cached session for this model file + providers + options, creating it if needed.
+    The cache holds one session per path + providers + options; once the file's content
+    changes, every session of its old content is dropped, so edit-and-reload cycles on a
+    long-running install don't keep old sessions (and their GPU memory) alive.
+
+    Returns:
+        (session, was_cached)
+    """
+    model_hash = file_hash(model_path)
+    path = os.path.abspath(model_path)
+    key = (path, tuple(providers), session_options_key(sess_options))
+    with session_cache_lock:
+        stale = [k for k, (cached_hash, _) in session_cache.items() if k[0] == path and cached_hash != model_hash]
+        for k in stale:
+            del session_cache[k]
+        entry = session_cache.get(key)
+    if stale:
+        printONNX(f"Model changed, dropped {len(stale)} cached session(s):", model_path)
+    if entry is not None:
+        printONNX('Session cache hit:', model_path)
+        return entry[1], True
+
+    session = create_session(model_path, providers, sess_options, persist_optimized, model_hash)
+    with session_cache_lock:
+        session_cache[key] = (model_hash, session)
+    return session, False
+
+def clear_session_cache(model_path=None):
+    """Drop cached sessions (all of them, or just `model_path`'s), releasing their memory once no manager uses them."""
+    with session_cache_lock:
+        if model_path is None:
+            session_cache.clear()
+            return
+        path = os.path.abspath(model_path)
+        for k in [k for k in session_cache if k[0] == path]:
+            del session_cache[k]
+
+def dummy_input(session, default_size=256):
+    # Dynamic dims become 1 for batch and `default_size` for everything else
+    model_input = session.get_inputs()[0]
+    shape = []
+    for i, dim in enumerate(model_input.shape):
+        if isinstance(dim, int) and dim > 0:
+            shape.append(dim)
+        else:
+            shape.append(1 if i == 0 else default_size)
+    dtype = ONNX_NUMPY_TYPES.get(model_input.type, numpy.float32)
+    return numpy.zeros(shape, dtype=dtype)
+
+def warm_up_session(session, runs=3, input_tensor=None):
+    # The first few runs pay for kernel selection and memory arena growth; do that before publishing
+    if runs <= 0:
+        return
+    if input_tensor is None:
+        input_tensor = dummy_input(session)
+    input_name = session.get_inputs()[0].name
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        session.run(None, {input_name: input_tensor})
+        timings.append((time.perf_counter() - start) * 1000)
+    printONNX(f"Warm-up ({runs} runs at {list(input_tensor.shape)}):", ', '.join(f"{t:.1f}ms" for t in timings))
+
+
+# ========== Session Options Tuning ==========
+
+EXECUTION_MODES = {
+    'sequential': ort.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': ort.ExecutionMode.ORT_PARALLEL,
+}
+OPTIMIZATION_LEVELS = {
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+def default_thread_counts():
+    # Powers of two, half the cores, and all but one core (TD's main thread needs one)
+    cpus = os.cpu_count() or 1
+    counts = {1, max(1, cpus // 2), max(1, cpus - 1)}
+    count = 2
+    while count < cpus:
+        counts.add(count)
+        count *= 2
+    return sorted(counts)
+
+def session_options_from_config(config):
+    """
+    Build SessionOptions from a plain config dict (as saved by tuned_session_options):
+    intra_op_num_threads, inter_op_num_threads, execution_mode ('sequential' / 'parallel'),
+    graph_optimization_level ('basic' / 'extended' / 'all').
+    """
+    sess_options = ort.SessionOptions()
+    sess_options.intra_op_num_threads = config.get('intra_op_num_threads', 0)
+    sess_options.inter_op_num_threads = config.get('inter_op_num_threads', 0)
+    sess_options.execution_mode = EXECUTION_MODES[config.get('execution_mode', 'sequential')]
+    sess_options.graph_optimization_level = OPTIMIZATION_LEVELS[config.get('graph_optimization_level', 'all')]
+    return sess_options
+
+def sweep_session_options(model_path, providers, thread_counts=None, execution_modes=('sequential', 'parallel'),
+                          optimization_levels=('basic', 'extended', 'all'), runs=20):
+    """
+    Time the model under every combination of intra-op threads, execution mode and graph
+    optimization level. Parallel mode gets two inter-op threads; sequential ignores them.
+
+    Returns:
+        [{'config': {...}, 'ms', 'p95'}] sorted fastest first
+    """
+    input_tensor = None
+    results = []
+    for level in optimization_levels:
+        for mode in execution_modes:
+            for threads in thread_counts or default_thread_counts():
+                config = {
+                    'intra_op_num_threads': threads,
+                    'inter_op_num_threads': 2 if mode == 'parallel' else 0,
+                    'execution_mode': mode,
+                    'graph_optimization_level': level,
+                }
+                try:
+                    session = ort.InferenceSession(model_path, sess_options=session_options_from_config(config), providers=providers)
+                    if input_tensor is None:
+                        input_tensor = random_input(session)
+                    feed = {session.get_inputs()[0].name: input_tensor}
+                    for _ in range(3):
+                        session.run(None, feed)
+                    timings = []
+                    for _ in range(runs):
+                        start = time.perf_counter()
+                        session.run(None, feed)
+                        timings.append((time.perf_counter() - start) * 1000)
+                except Exception as e:
+                    printONNX(f"Sweep config failed {config}: {e}")
+                    continue
+                results.append({
+                    'config': config,
+                    'ms': float(numpy.median(timings)),
+                    'p95': float(numpy.percentile(timings, 95)),
+                })
+    return sorted(results, key=lambda r: r['ms'])
+
+def tuned_config_path(model_path, providers):
+    return machine_model_path(model_path, file_hash(model_path), providers, 'sessopts.json')
+
+def load_tuned_config(model_path, providers):
+    """The saved best config for this model, machine and providers, or None."""
+    path = tuned_config_path(model_path, providers)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)['best']['config']
+    except (OSError, ValueError, KeyError) as e:
+        printONNX(f"Ignoring tuned session options: {e}")
+        return None
+
+def save_tuned_config(model_path, providers, results):
+    """Save sweep results (fastest first) for load_tuned_config. Returns the file path."""
+    path = tuned_config_path(model_path, providers)
+    try:
+        # Write then rename, so a crash never leaves a half-written file behind
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'best': results[0], 'results': results}, f, indent=2)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        printONNX(f"Couldn't save tuned session options: {e}")
+    return path
+
+def tuned_session_options(model_path, providers, tune=True, refresh=False, **sweep_args):
+    """
+    SessionOptions for the fastest config found by sweep_session_options() on this machine.
+
+    The sweep results are saved beside the model per machine and provider, so only the first
+    call (or `refresh`) pays for the sweep. Without `tune`, returns the saved config's
+    options or None when the model hasn't been tuned here yet.
+    """
+    config = None if refresh else load_tuned_config(model_path, providers)
+    if config is None and tune:
+        printONNX('Tuning session options:', model_path)
+        results = sweep_session_options(model_path, providers, **sweep_args)
+        if results:
+            config = results[0]['config']
+            save_tuned_config(model_path, providers, results)
+    if config is None:
+        return None
+    printONNX('Session options:', ', '.join(f"{k}={v}" for k, v in config.items()))
+    return session_options_from_config(config)
+
+
+# ========== Model Variants ==========
+
+MODEL_VARIANTS = ('int8', 'fp16')
+
+def variant_path(model_path, variant):
+    base, ext = os.path.splitext(model_path)
+    return f"{base}.{variant}{ext}"
+
+def find_variants(model_path):
+    """The model plus any int8/fp16 siblings on disk (`model.int8.onnx` or `model_int8.onnx`)."""
+    base, ext = os.path.splitext(model_path)
+    variants = {'fp32': model_path}
+    for variant in MODEL_VARIANTS:
+        for path in (f"{base}.{variant}{ext}", f"{base}_{variant}{ext}"):
+            if os.path.exists(path):
+                variants[variant] = path
+                break
+    return variants
+
+def make_variant(model_path, variant):
+    """
+    Write an int8 (dynamic quantization) or fp16 copy of the model beside it, keeping
+    fp32 inputs and outputs so preprocess/postprocess don't change. Needs the `onnx` package.
+    Returns the new path, or None if conversion failed.
+    """
+    out_path = variant_path(model_path, variant)
+    try:
+        if variant == 'int8':
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(model_path, out_path, weight_type=QuantType.QInt8)
+        elif variant == 'fp16':
+            import onnx
+            from onnxruntime.transformers.float16 import convert_float_to_float16
+            onnx.save(convert_float_to_float16(onnx.load(model_path), keep_io_types=True), out_path)
+        else:
+            raise ValueError(f"Unknown model variant: {variant}")
+    except Exception as e:
+        printONNX(f"Couldn't make {variant} variant: {e}")
+        return None
+    printONNX(f"Made {variant} variant: {out_path}")
+    return out_path
+
+def random_input(session, seed=0, default_size=256):
+    # Like dummy_input, but with seeded values so outputs are worth comparing
+    zeros = dummy_input(session, default_size)
+    rng = numpy.random.default_rng(seed)
+    if numpy.issubdtype(zeros.dtype, numpy.integer):
+        return rng.integers(0, 128, zeros.shape).astype(zeros.dtype)
+    return rng.random(zeros.shape).astype(zeros.dtype)
+
+def output_error(reference, outputs):
+    """Worst max-abs difference across outputs, relative to each reference output's peak magnitude."""
+    error = 0.0
+    for ref, out in zip(reference, outputs):
+        ref = numpy.asarray(ref, dtype=numpy.float64)
+        out = numpy.asarray(out, dtype=numpy.float64)
+        if ref.shape != out.shape:
+            return float('inf')
+        error = max(error, float(numpy.abs(ref - out).max() / max(numpy.abs(ref).max(), 1e-6)))
+    return error
+
+def time_session(session, input_tensor, runs=20, warmup=3):
+    """Median session.run time in ms."""
+    feed = {session.get_inputs()[0].name: input_tensor}
+    for _ in range(warmup):
+        session.run(None, feed)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        session.run(None, feed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(numpy.median(timings))
+
+def benchmark_variants(variants, providers, sess_options=None, runs=20):
+    """
+    Time every variant on `providers` and measure its error against the fp32 output.
+
+    Returns:
+        {variant: {'path', 'ms', 'error'}} for the variants that load and share the fp32 input type
+    """
+    reference_session = ort.InferenceSession(variants['fp32'], sess_options=sess_options, providers=providers)
+    input_tensor = random_input(reference_session)
+    reference = reference_session.run(None, {reference_session.get_inputs()[0].name: input_tensor})
+    input_type = reference_session.get_inputs()[0].type
+
+    results = {}
+    for variant, path in variants.items():
+        try:
+            session = reference_session if variant == 'fp32' else ort.InferenceSession(path, sess_options=sess_options, providers=providers)
+            if session.get_inputs()[0].type != input_type:
+                # preprocess feeds the fp32 model's input type, so a variant with other IO can't drop in
+                printONNX(f"Skipping {variant} variant: input is {session.get_inputs()[0].type}, not {input_type}")
+                continue
+            outputs = session.run(None, {session.get_inputs()[0].name: input_tensor})
+            results[variant] = {
+                'path': path,
+                'ms': time_session(session, input_tensor, runs),
+                'error': output_error(reference, outputs),
+            }
+        except Exception as e:
+            printONNX(f"Skipping {variant} variant: {e}")
+    return results
+
+def resolve_model_variant(model_path, providers, tolerance=0.05, make_missing=False, sess_options=None, runs=20, refresh=False):
+    """
+    Pick the fastest of a model and its int8/fp16 siblings whose output stays within
+    `tolerance` (relative max error) of the fp32 model on the current providers.
+
+    The choice is saved beside the model per machine and provider (see machine_model_path),
+    so later launches skip the benchmark until the model or its variants change.
+    With `make_missing`, absent variants are generated first (needs the `onnx` package).
+
+    Returns:
+        Path of the model file to load
+    """
+    model_hash = file_hash(model_path)
+    cache_path = machine_model_path(model_path, model_hash, providers, 'variant.json')
+    variants = find_variants(model_path)
+
+    if os.path.exists(cache_path) and not refresh:
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            chosen = cached['path']
+            fresh = cached['candidates'] == sorted(variants.values()) and cached['tolerance'] == tolerance
+            if fresh and os.path.exists(chosen) and file_hash(chosen) == cached['hash']:
+                printONNX(f"Model variant: {cached['variant']} (cached choice) {chosen}")
+                return chosen
+        except (OSError, ValueError, KeyError) as e:
+            printONNX(f"Ignoring model variant cache: {e}")
+
+    if make_missing:
+        for variant in MODEL_VARIANTS:
+            if variant not in variants:
+                path = make_variant(model_path, variant)
+                if path:
+                    variants[variant] = path
+
+    results = benchmark_variants(variants, providers, sess_options, runs) if len(variants) > 1 else {}
+    for variant, result in results.items():
+        printONNX(f"- {variant:<5} {result['ms']:7.2f}ms  error {result['error']:.4f}  {result['path']}")
+    eligible = {v: r for v, r in results.items() if r['error'] <= tolerance}
+    variant = min(eligible, key=lambda v: eligible[v]['ms']) if eligible else 'fp32'
+    chosen = variants[variant]
+    printONNX(f"Model variant: {variant} {chosen}")
+
+    # Write then rename, so a crash never leaves a half-written choice behind
+    cached = {
+        'variant': variant,
+        'path': chosen,
+        'hash': file_hash(chosen),
+        'candidates': sorted(variants.values()),
+        'tolerance': tolerance,
+        'results': results,
+    }
+    try:
+        with open(cache_path + '.tmp', 'w') as f:
+            json.dump(cached, f, indent=2)
+        os.replace(cache_path + '.tmp', cache_path)
+    except OSError as e:
+        printONNX(f"Couldn't save model variant choice: {e}")
+    return chosen
+
+
+class IOBindingRunner:
+    """
+    Runs a session through IOBinding with buffers that are allocated once per input shape.
+
+    On CPU, the caller's contiguous input array is bound directly each run, so there
+    is no input copy. On a device provider (CUDA), the input lives in a preallocated
+    OrtValue on the device and each run uploads the new frame into it in place.
+    Outputs are bound to preallocated host NumPy arrays, so ORT writes results
+    straight into them instead of allocating new arrays every call. On CPU that
+    saves little: plain session.run is about as fast for small models, so measure
+    with benchmarks/onnx_iobinding_benchmark.py before turning it on there.
+
+    Output shapes are assumed to depend only on the input shape. Returned
+    output arrays are reused: `num_output_sets` controls how many runs
+    can be in flight downstream (e.g. queued for postprocessing) before a set
+    is overwritten.
+    """
+
+    def __init__(self, session, num_output_sets=2):
+        self.session = session
+        self.device = session_device(session)
+        self.input_name = session.get_inputs()[0].name
+        self.output_names = [o.name for o in session.get_outputs()]
+        self.binding = session.io_binding()
+        self.num_output_sets = max(1, num_output_sets)
+        self.input_shape = None
+        self.input_dtype = None
+        self.input_value = None
+        self.output_sets = None
+        self.output_set_index = 0
+        self.bind_count = 0  # Times buffers were (re)allocated for a new input shape
+        self.run_count = 0
+        self.input_copy_count = 0  # Frames copied into the device OrtValue (device providers only)
+
+    def bind_input(self, input_tensor):
+        """Set up for a new input shape: drop stale output buffers and, on a device, allocate the input OrtValue."""
+        self.binding.clear_binding_inputs()
+        self.binding.clear_binding_outputs()
+        self.input_shape = input_tensor.shape
+        self.input_dtype = input_tensor.dtype
+        if self.device != 'cpu':
+            self.input_value = ort.OrtValue.ortvalue_from_shape_and_type(
+                list(input_tensor.shape), input_tensor.dtype, self.device, 0)
+            self.binding.bind_ortvalue_input(self.input_name, self.input_value)
+        self.output_sets = None
+        self.bind_count += 1
+        printONNX(f"IOBinding: bound input {self.input_name} {list(self.input_shape)} on {self.device}")
+
+    def bind_outputs(self, output_set):
+        for name, buffer in zip(self.output_names, output_set):
+            self.binding.bind_output(name, 'cpu', 0, buffer.dtype, list(buffer.shape), buffer.ctypes.data)
+
+    def run(self, input_tensor):
+        """Run the model on `input_tensor` and return the list of output arrays."""
+        input_tensor = numpy.ascontiguousarray(input_tensor)
+        if input_tensor.shape != self.input_shape or input_tensor.dtype != self.input_dtype:
+            self.bind_input(input_tensor)
+        if self.input_value is None:
+            # CPU: ORT reads the array where it is; it only has to outlive this run
+            self.binding.bind_cpu_input(self.input_name, input_tensor)
+        else:
+            self.input_value.update_inplace(input_tensor)
+            self.input_copy_count += 1
+        self.run_count += 1
+
+        if self.output_sets is None:
+            # First run at this shape: let ORT allocate, then size our own buffers from the result
+            for name in self.output_names:
+                self.binding.bind_output(name, 'cpu')
+            self.session.run_with_iobinding(self.binding)
+            outputs = self.binding.copy_outputs_to_cpu()
+            self.output_sets = [[numpy.empty_like(o) for o in outputs] for _ in range(self.num_output_sets)]
+            self.output_set_index = 0
+            return outputs
 
+        output_set = self.output_sets[self.output_set_index]
+        self.output_set_index = (self.output_set_index + 1) % self.num_output_sets
+        self.bind_outputs(output_set)
+        self.session.run_with_iobinding(self.binding)
+        return output_set
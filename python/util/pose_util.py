@@ -0,0 +1,267 @@
+import math
+import time
+import numpy
+
+# MoveNet keypoint order (COCO)
+KEYPOINT_NAMES = [
+    'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
+    'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
+    'left_knee', 'right_knee', 'left_ankle', 'right_ankle',
+]
+NUM_KEYPOINTS = 17
+MULTIPOSE_MAX_PEOPLE = 6
+MULTIPOSE_STRIDE = 56  # 17 * (y, x, score) + (ymin, xmin, ymax, xmax, score)
+
+# Decoded keypoints are (people, 17, 3) float32 arrays of (x, y, score),
+# with x/y normalized to the model input. Low-score keypoints get a score of 0.
+
+def decode_movenet_singlepose(output, score_threshold=0.2, out=None):
+    """Decode a MoveNet single-pose output of shape [1, 1, 17, 3] (y, x, score)."""
+    raw = numpy.asarray(output, dtype=numpy.float32).reshape(1, NUM_KEYPOINTS, 3)
+    if out is None:
+        out = numpy.empty((1, NUM_KEYPOINTS, 3), dtype=numpy.float32)
+    out[..., 0] = raw[..., 1]
+    out[..., 1] = raw[..., 0]
+    out[..., 2] = raw[..., 2]
+    out[..., 2][out[..., 2] < score_threshold] = 0
+    return out
+
+def decode_movenet_multipose(output, score_threshold=0.2, person_threshold=0.2, out=None, boxes_out=None):
+    """
+    Decode a MoveNet multi-pose output of shape [1, 6, 56].
+
+    Returns:
+        keypoints: (6, 17, 3) float32 (x, y, score); people under `person_threshold` are all zeros
+        boxes: (6, 5) float32 (xmin, ymin, xmax, ymax, score)
+    """
+    raw = numpy.asarray(output, dtype=numpy.float32).reshape(-1, MULTIPOSE_STRIDE)
+    people = raw.shape[0]
+    if out is None:
+        out = numpy.empty((people, NUM_KEYPOINTS, 3), dtype=numpy.float32)
+    if boxes_out is None:
+        boxes_out = numpy.empty((people, 5), dtype=numpy.float32)
+
+    keypoints = raw[:, :NUM_KEYPOINTS * 3].reshape(people, NUM_KEYPOINTS, 3)
+    out[..., 0] = keypoints[..., 1]
+    out[..., 1] = keypoints[..., 0]
+    out[..., 2] = keypoints[..., 2]
+    box = raw[:, NUM_KEYPOINTS * 3:]
+    boxes_out[:, 0] = box[:, 1]
+    boxes_out[:, 1] = box[:, 0]
+    boxes_out[:, 2] = box[:, 3]
+    boxes_out[:, 3] = box[:, 2]
+    boxes_out[:, 4] = box[:, 4]
+
+    out[..., 2][out[..., 2] < score_threshold] = 0
+    out[boxes_out[:, 4] < person_threshold] = 0
+    return out, boxes_out
+
+def person_mask(keypoints):
+    """True for people with at least one keypoint above threshold."""
+    return keypoints[..., 2].max(axis=1) > 0
+
+def to_chop_array(keypoints, out=None):
+    """
+    Flatten (people, 17, 3) keypoints into a (3, people * 17) float32 array for
+    scriptOp.copyNumpyArray(): channels tx, ty, score with one sample per keypoint.
+    """
+    count = keypoints.shape[0] * keypoints.shape[1]
+    if out is None:
+        out = numpy.empty((3, count), dtype=numpy.float32)
+    numpy.copyto(out, keypoints.reshape(count, 3).T)
+    return out
+
+def match_tracks(prev_centers, prev_valid, centers, valid, max_distance=0.2):
+    """
+    Greedily assign detections to existing tracks by box-center distance.
+
+    Returns an index array: order[track] = detection index, or -1 when unmatched.
+    Unmatched detections are then placed into free tracks.
+    """
+    tracks = prev_centers.shape[0]
+    order = numpy.full(tracks, -1, dtype=numpy.int64)
+    distances = numpy.linalg.norm(prev_centers[:, None, :] - centers[None, :, :], axis=2)
+    distances[~prev_valid, :] = numpy.inf
+    distances[:, ~valid] = numpy.inf
+    distances[distances > max_distance] = numpy.inf
+    for _ in range(tracks):
+        track, detection = numpy.unravel_index(numpy.argmin(distances), distances.shape)
+        if not numpy.isfinite(distances[track, detection]):
+            break
+        order[track] = detection
+        distances[track, :] = numpy.inf
+        distances[:, detection] = numpy.inf
+    assigned = set(order[order >= 0].tolist())
+    free_tracks = [t for t in range(tracks) if order[t] < 0]
+    for detection in numpy.flatnonzero(valid):
+        if detection not in assigned and free_tracks:
+            order[free_tracks.pop(0)] = detection
+    return order
+
+
+class ExponentialSmoother:
+    """Per-track exponential smoothing of keypoint x/y with state held in preallocated arrays."""
+
+    def __init__(self, people=1, alpha=0.5):
+        self.alpha = alpha
+        self.state = numpy.zeros((people, NUM_KEYPOINTS, 2), dtype=numpy.float32)
+        self.initialized = numpy.zeros(people, dtype=bool)
+
+    def reset(self, track=None):
+        if track is None:
+            self.initialized[:] = False
+        else:
+            self.initialized[track] = False
+
+    def __call__(self, keypoints, valid=None, timestamp=None):
+        return self.filter(keypoints, valid, timestamp)
+
+    def filter(self, keypoints, valid=None, timestamp=None):
+        """Smooth keypoints[..., :2] in place. `valid` marks tracks with a person this frame."""
+        if valid is None:
+            valid = numpy.ones(keypoints.shape[0], dtype=bool)
+        xy = keypoints[..., :2]
+        fresh = valid & ~self.initialized
+        self.state[fresh] = xy[fresh]
+        self.state += self.alpha * (xy - self.state)
+        self.initialized[:] = valid
+        xy[valid] = self.state[valid]
+        return keypoints
+
+
+class OneEuroSmoother:
+    """
+    Vectorized One-Euro filter (Casiez et al.) over every keypoint of every track.
+
+    Jitter is smoothed heavily while a keypoint is still (min_cutoff) and lag drops
+    as it speeds up (beta). All state lives in preallocated (people, 17, 2) arrays.
+    """
+
+    def __init__(self, people=1, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        shape = (people, NUM_KEYPOINTS, 2)
+        self.x_prev = numpy.zeros(shape, dtype=numpy.float32)
+        self.dx_prev = numpy.zeros(shape, dtype=numpy.float32)
+        self.scratch = numpy.zeros(shape, dtype=numpy.float32)
+        self.alpha = numpy.zeros(shape, dtype=numpy.float32)
+        self.initialized = numpy.zeros(people, dtype=bool)
+        self.t_prev = None
+
+    def reset(self, track=None):
+        if track is None:
+            self.initialized[:] = False
+        else:
+            self.initialized[track] = False
+
+    @staticmethod
+    def smoothing_factor(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, keypoints, valid=None, timestamp=None):
+        return self.filter(keypoints, valid, timestamp)
+
+    def filter(self, keypoints, valid=None, timestamp=None):
+        """Smooth keypoints[..., :2] in place. `valid` marks tracks with a person this frame."""
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        if valid is None:
+            valid = numpy.ones(keypoints.shape[0], dtype=bool)
+        dt = 1 / 60 if self.t_prev is None else max(timestamp - self.t_prev, 1e-6)
+        self.t_prev = timestamp
+
+        xy = keypoints[..., :2]
+        fresh = valid & ~self.initialized
+        self.x_prev[fresh] = xy[fresh]
+        self.dx_prev[fresh] = 0
+
+        # Derivative, smoothed with a fixed cutoff
+        numpy.subtract(xy, self.x_prev, out=self.scratch)
+        self.scratch *= 1.0 / dt
+        self.scratch -= self.dx_prev
+        self.scratch *= self.smoothing_factor(self.d_cutoff, dt)
+        self.dx_prev += self.scratch
+
+        # Speed-dependent cutoff -> per-keypoint alpha = 1 / (1 + tau / dt)
+        numpy.abs(self.dx_prev, out=self.alpha)
+        self.alpha *= self.beta
+        self.alpha += self.min_cutoff
+        self.alpha *= 2 * math.pi * dt
+        numpy.divide(self.alpha, self.alpha + 1, out=self.alpha)
+
+        numpy.subtract(xy, self.x_prev, out=self.scratch)
+        self.scratch *= self.alpha
+        self.x_prev += self.scratch
+
+        self.initialized[:] = valid
+        xy[valid] = self.x_prev[valid]
+        return keypoints
+
+
+class PoseDecoder:
+    """
+    MoveNet postprocessing for ONNXInferenceManager: decode, track, smooth and
+    flatten to a CHOP array, reusing the same output buffers every frame.
+
+    Example (in an ONNXInferenceManager subclass):
+        pose_util = mod(f'{op.PyUtils}/pose_util')
+        self.pose_decoder = pose_util.PoseDecoder(multipose=True, smoother='one_euro')
+
+        def postprocess(self, outputs):
+            return self.pose_decoder(outputs)
+
+    Pass a numpy_util.LetterboxTransform as `transform` to output TD UVs instead of
+    model-normalized coordinates.
+    """
+
+    SMOOTHER_NONE = None
+    SMOOTHER_EXPONENTIAL = 'exponential'
+    SMOOTHER_ONE_EURO = 'one_euro'
+
+    def __init__(self, multipose=False, score_threshold=0.2, person_threshold=0.2,
+                 smoother=SMOOTHER_ONE_EURO, transform=None, **smoother_args):
+        self.multipose = multipose
+        self.score_threshold = score_threshold
+        self.person_threshold = person_threshold
+        self.transform = transform
+        self.people = MULTIPOSE_MAX_PEOPLE if multipose else 1
+        self.keypoints = numpy.zeros((self.people, NUM_KEYPOINTS, 3), dtype=numpy.float32)
+        self.tracked = numpy.zeros_like(self.keypoints)
+        self.boxes = numpy.zeros((self.people, 5), dtype=numpy.float32)
+        self.track_centers = numpy.zeros((self.people, 2), dtype=numpy.float32)
+        self.track_valid = numpy.zeros(self.people, dtype=bool)
+        self.chop_array = numpy.zeros((3, self.people * NUM_KEYPOINTS), dtype=numpy.float32)
+        if smoother == self.SMOOTHER_ONE_EURO:
+            self.smoother = OneEuroSmoother(self.people, **smoother_args)
+        elif smoother == self.SMOOTHER_EXPONENTIAL:
+            self.smoother = ExponentialSmoother(self.people, **smoother_args)
+        else:
+            self.smoother = None
+
+    def __call__(self, outputs):
+        return self.decode(outputs)
+
+    def decode(self, outputs, timestamp=None):
+        """Returns the (3, people * 17) CHOP array (tx, ty, score)."""
+        if self.multipose:
+            decode_movenet_multipose(outputs[0], self.score_threshold, self.person_threshold, self.keypoints, self.boxes)
+            valid = person_mask(self.keypoints)
+            centers = (self.boxes[:, 0:2] + self.boxes[:, 2:4]) * 0.5
+            order = match_tracks(self.track_centers, self.track_valid, centers, valid)
+            matched = order >= 0
+            self.tracked[:] = 0
+            self.tracked[matched] = self.keypoints[order[matched]]
+            self.track_centers[matched] = centers[order[matched]]
+            self.track_valid[:] = matched
+        else:
+            decode_movenet_singlepose(outputs[0], self.score_threshold, self.tracked)
+            matched = person_mask(self.tracked)
+
+        if self.smoother is not None:
+            self.smoother(self.tracked, matched, timestamp)
+        if self.transform is not None:
+            self.transform.to_uv(self.tracked[..., :2], normalized=True, out=self.tracked[..., :2])
+            self.tracked[~matched] = 0
+        return to_chop_array(self.tracked, self.chop_array)
@@ -1,4 +1,5 @@
 import json
+import os
 import threading
 import time
 import uuid
@@ -13,6 +14,16 @@ class AppStore:
 
 	Provides a centralized key-value store with type-aware getters/setters,
 	WebSocket synchronization, and Python callback listeners.
+
+	Journal mode (JOURNAL_MODE = True, or a `Journalmode` toggle par on the
+	component) persists the store incrementally instead of rewriting the whole
+	table on every SaveFile(): each SetValue/RemoveValue appends one JSON line
+	to `{Backupfile}.journal`, and the journal is compacted into
+	`{Backupfile}.snapshot.json` on a background thread every
+	JOURNAL_COMPACT_EVERY entries (and on SaveFile). LoadFile() reads the
+	snapshot, replays the journal and starts journaling; snapshots are written
+	to a temp file and atomically renamed over the old one, so a crash at any
+	point leaves a loadable store.
 	"""
 
 	# Value type constants
@@ -20,11 +31,18 @@ class AppStore:
 	TYPE_STRING = 'string'
 	TYPE_BOOLEAN = 'boolean'
 
+	# Journal persistence
+	JOURNAL_MODE = False
+	JOURNAL_COMPACT_EVERY = 1000 # Journal entries before a background compaction
+	JOURNAL_FSYNC = False # fsync each journal entry (survives power loss, costs a disk flush per change)
+	JOURNAL_VERSION = 1
+
 	def __init__(self, ownerComp: baseCOMP) -> None:
 		self.ownerComp: baseCOMP = ownerComp
 		self.initListeners()
 		self.initStore()
 		self.initDependencies() # Initialize granular dependencies
+		self.initJournal()
 		self.initWebSocket()
 
 	def initListeners(self) -> None:
@@ -132,6 +150,8 @@ class AppStore:
 			else:
 				self.storeTable.appendRow(
 					[key, value, valueType, sender, eventId])
+			if self.journalFile is not None:
+				self.journalSet(key)
 			self.NotifyListeners(key, value, valueType)
 
 	def SetFloat(self, key: str, value: float, broadcast: bool = False) -> None:
@@ -266,6 +286,9 @@ class AppStore:
 		"""Clear all data from the store."""
 		self.storeTable.clear()
 		self.dependencies.clear()
+		if self.journalFile is not None:
+			self.journalRows.clear()
+			self.appendJournal({'op': 'clear'})
 
 	def RemoveValue(self, key: str, broadcast: bool = False) -> None:
 		"""Remove a value from the store."""
@@ -275,6 +298,8 @@ class AppStore:
 		if self.storeTable.row(key) is not None:
 			valueType = self.storeTable[key, 2].val
 			self.storeTable.deleteRow(key)
+			if self.journalFile is not None:
+				self.journalRemove(key)
 			if broadcast:
 				self.broadcastValue(key, None, valueType)
 
@@ -411,7 +436,10 @@ class AppStore:
 	###################################################
 
 	def SaveFile(self) -> None:
-		"""Save the store to a backup file."""
+		"""Save the store to a backup file (in journal mode: compact the journal)."""
+		if self.journalFile is not None:
+			self.CompactJournal()
+			return
 		if absTime.seconds < 5:
 			print('[AppStore] SaveFile skipped - app just started')
 			return
@@ -425,9 +453,240 @@ class AppStore:
 		filePath = self.ownerComp.par.Backupfile.eval()
 		if filePath:
 			print(f'[AppStore] LoadFile: {filePath}')
-			self.fileInTable.par.refreshpulse.pulse()
-			self.storeTable.copy(self.fileInTable)
-			self.SyncFromTable() # Refresh granular dependencies from the loaded table
+			if self.journalModeEnabled():
+				self.loadJournal(filePath)
+				return
+			self.loadTableFile()
+
+	def loadTableFile(self) -> None:
+		"""Load the full-table backup through the File In DAT."""
+		self.fileInTable.par.refreshpulse.pulse()
+		self.storeTable.copy(self.fileInTable)
+		self.SyncFromTable() # Refresh granular dependencies from the loaded table
+
+	###################################################
+	# Journal
+	###################################################
+
+	def initJournal(self) -> None:
+		"""Journal state. Journaling starts in LoadFile(), once the store holds the saved data."""
+		self.journalFile = None
+		self.journalRows: Dict[str, List[str]] = {} # Mirror of the table rows, snapshotted off the main thread
+		self.journalSeq: int = 0
+		self.journalEntries: int = 0 # Entries since the last compaction
+		self.journalBasePath: str = ''
+		self.compactThread: Optional[threading.Thread] = None
+		self.compactError: Optional[str] = None
+
+	def journalModeEnabled(self) -> bool:
+		par = getattr(self.ownerComp.par, 'Journalmode', None)
+		if par is not None:
+			return bool(par.eval())
+		return self.JOURNAL_MODE
+
+	def journalPaths(self, basePath: str) -> Dict[str, str]:
+		return {
+			'snapshot': f'{basePath}.snapshot.json',
+			'journal': f'{basePath}.journal',
+			'compacting': f'{basePath}.journal.compacting', # Segment being folded into the next snapshot
+		}
+
+	def journalSet(self, key: str) -> None:
+		"""Journal a key's row as the table now holds it."""
+		row = [cell.val for cell in self.storeTable.row(key)]
+		self.journalRows[key] = row
+		self.appendJournal({'op': 'set', 'row': row})
+
+	def journalRemove(self, key: str) -> None:
+		self.journalRows.pop(key, None)
+		self.appendJournal({'op': 'remove', 'key': key})
+
+	def appendJournal(self, entry: Dict[str, Any]) -> None:
+		"""Append one entry as a JSON line. A torn last line (crash mid-write) is skipped on load."""
+		self.journalSeq += 1
+		entry['seq'] = self.journalSeq
+		self.journalFile.write(json.dumps(entry) + '\n')
+		self.journalFile.flush()
+		if self.JOURNAL_FSYNC:
+			os.fsync(self.journalFile.fileno())
+		self.journalEntries += 1
+		if self.journalEntries >= self.JOURNAL_COMPACT_EVERY:
+			self.CompactJournal()
+
+	def openJournal(self) -> None:
+		self.journalFile = open(self.journalPaths(self.journalBasePath)['journal'], 'a', encoding='utf-8', newline='\n')
+
+	def closeJournal(self) -> None:
+		if self.journalFile is not None:
+			self.journalFile.close()
+			self.journalFile = None
+
+	def loadJournal(self, basePath: str) -> None:
+		"""Load snapshot + journal replay into the table, then start journaling."""
+		self.closeJournal()
+		self.waitForCompaction()
+		self.journalBasePath = basePath
+		paths = self.journalPaths(basePath)
+		if not any(os.path.isfile(path) for path in paths.values()):
+			# First launch in journal mode: start from the full-table backup, if there is one
+			if os.path.isfile(basePath):
+				self.loadTableFile()
+			self.journalRows = {row[0].val: [cell.val for cell in row] for row in self.storeTable.rows()}
+			self.journalSeq = 0
+			replayed = 0
+		else:
+			for path in (paths['compacting'], paths['journal']):
+				self.truncateTornLine(path)
+			self.journalRows, self.journalSeq, replayed = self.readJournalState(paths)
+			self.storeTable.clear()
+			for row in self.journalRows.values():
+				self.storeTable.appendRow(row)
+			for key in [key for key in self.dependencies if key not in self.journalRows]:
+				del self.dependencies[key]
+			self.SyncFromTable()
+			print(f'[AppStore] Journal loaded: {len(self.journalRows)} keys, {replayed} journal entries replayed')
+		os.makedirs(os.path.dirname(os.path.abspath(basePath)), exist_ok=True)
+		self.openJournal()
+		self.journalEntries = replayed
+		# Fold what was replayed (and any first-launch table) into a fresh snapshot
+		self.CompactJournal()
+
+	def truncateTornLine(self, filePath: str) -> None:
+		"""
+		Cut a journal segment back to its last complete line. A crash mid-write
+		leaves a partial last line; appending after it would join the next entry
+		onto the fragment and lose both on the following load.
+		"""
+		if not os.path.isfile(filePath):
+			return
+		with open(filePath, 'rb+') as f:
+			end = f.seek(0, os.SEEK_END)
+			pos = end
+			while pos > 0:
+				chunkStart = max(0, pos - 65536)
+				f.seek(chunkStart)
+				newline = f.read(pos - chunkStart).rfind(b'\n')
+				if newline >= 0:
+					pos = chunkStart + newline + 1
+					break
+				pos = chunkStart
+			if pos < end:
+				print(f'[AppStore] Truncating torn journal line ({end - pos} bytes) in {filePath}')
+				f.truncate(pos)
+
+	def readJournalState(self, paths: Dict[str, str]):
+		"""
+		Read the snapshot and replay journal segments over it.
+		Entries the snapshot already includes (seq <= its seq) are skipped, so a
+		crash between writing a snapshot and deleting its segment replays cleanly.
+
+		Returns:
+			(rows, lastSeq, replayedCount)
+		"""
+		rows: Dict[str, List[str]] = {}
+		snapshotSeq = 0
+		if os.path.isfile(paths['snapshot']):
+			with open(paths['snapshot'], 'r', encoding='utf-8') as f:
+				snapshot = json.load(f)
+			snapshotSeq = snapshot['seq']
+			for row in snapshot['rows']:
+				rows[row[0]] = row
+		lastSeq = snapshotSeq
+		replayed = 0
+		for path in (paths['compacting'], paths['journal']):
+			if not os.path.isfile(path):
+				continue
+			with open(path, 'r', encoding='utf-8') as f:
+				for line in f:
+					try:
+						entry = json.loads(line)
+					except ValueError:
+						print(f'[AppStore] Skipping unreadable journal line in {path}')
+						continue
+					seq = entry['seq']
+					lastSeq = max(lastSeq, seq)
+					if seq <= snapshotSeq:
+						continue
+					if entry['op'] == 'set':
+						rows[entry['row'][0]] = entry['row']
+					elif entry['op'] == 'remove':
+						rows.pop(entry['key'], None)
+					elif entry['op'] == 'clear':
+						rows.clear()
+					replayed += 1
+		return rows, lastSeq, replayed
+
+	def CompactJournal(self) -> None:
+		"""
+		Fold the journal into a new snapshot on a background thread.
+		The current journal segment is renamed aside and a fresh one opened, so
+		changes keep appending while the snapshot is written.
+		"""
+		if self.journalFile is None:
+			return
+		if self.compactThread is not None and self.compactThread.is_alive():
+			return # The next compaction picks up the entries journaled meanwhile
+		if self.compactError:
+			print(f'[AppStore] Last journal compaction failed: {self.compactError}')
+			self.compactError = None
+		paths = self.journalPaths(self.journalBasePath)
+		if self.journalEntries == 0 and os.path.isfile(paths['snapshot']) and not os.path.isfile(paths['compacting']):
+			return # Nothing new since the last snapshot
+		self.closeJournal()
+		if os.path.isfile(paths['journal']):
+			if os.path.isfile(paths['compacting']):
+				# A failed compaction left its segment behind: keep both until a snapshot covers them
+				with open(paths['journal'], 'r', encoding='utf-8') as src, open(paths['compacting'], 'a', encoding='utf-8', newline='\n') as dst:
+					dst.write(src.read())
+				os.remove(paths['journal'])
+			else:
+				os.replace(paths['journal'], paths['compacting'])
+		self.openJournal()
+		self.journalEntries = 0
+		# Rows are replaced, never mutated, so a shallow copy is a consistent snapshot
+		snapshot = {'version': self.JOURNAL_VERSION, 'seq': self.journalSeq, 'rows': list(self.journalRows.values())}
+		self.compactThread = threading.Thread(target=self.compactJournalThread, args=(snapshot, paths), daemon=True)
+		self.compactThread.start()
+
+	def compactJournalThread(self, snapshot: Dict[str, Any], paths: Dict[str, str]) -> None:
+		"""Background thread: write the snapshot crash-safely, then drop the folded segment."""
+		try:
+			self.writeFileAtomic(paths['snapshot'], json.dumps(snapshot))
+			if os.path.isfile(paths['compacting']):
+				os.remove(paths['compacting'])
+		except Exception as e:
+			self.compactError = str(e)
+
+	def waitForCompaction(self, timeout: float = 10.0) -> None:
+		if self.compactThread is not None:
+			self.compactThread.join(timeout)
+			self.compactThread = None
+
+	def writeFileAtomic(self, filePath: str, text: str) -> None:
+		"""Write to a temp file, fsync it and rename it over `filePath`: readers see the old or new file, never a partial one."""
+		tempPath = f'{filePath}.tmp'
+		with open(tempPath, 'w', encoding='utf-8', newline='\n') as f:
+			f.write(text)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(tempPath, filePath)
+		if os.name == 'posix':
+			# Persist the rename itself
+			dirFd = os.open(os.path.dirname(os.path.abspath(filePath)), os.O_RDONLY)
+			try:
+				os.fsync(dirFd)
+			finally:
+				os.close(dirFd)
+
+	def JournalStats(self) -> Dict[str, Any]:
+		"""Journal state for debugging."""
+		return {
+			'enabled': self.journalFile is not None,
+			'keys': len(self.journalRows),
+			'seq': self.journalSeq,
+			'entriesSinceCompaction': self.journalEntries,
+			'compacting': self.compactThread is not None and self.compactThread.is_alive(),
+		}
 
 	###################################################
 	# Debug